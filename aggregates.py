@@ -0,0 +1,407 @@
+"""Corpus-wide statistics over the history, maintained as articles are stored
+
+Running sums per day and sentiment category and per source domain, plus
+t-digest sketches of word count, reading time and polarity, live next to
+the articles in the history database. Every insert updates them, so
+summary() reads a few small tables no matter how many articles are
+stored. A store created before these tables existed is scanned once, the
+first time a summary is asked for.
+
+Usage: python aggregates.py [--history saved_data/history.sqlite] [--days 14]
+"""
+import argparse
+import bisect
+import json
+import math
+import os
+import sys
+from urllib.parse import urlsplit
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS agg_daily (
+    day TEXT NOT NULL,
+    category TEXT NOT NULL,
+    articles INTEGER NOT NULL,
+    scored INTEGER NOT NULL,
+    polarity_sum REAL NOT NULL,
+    PRIMARY KEY (day, category)
+);
+CREATE TABLE IF NOT EXISTS agg_domains (
+    domain TEXT PRIMARY KEY,
+    articles INTEGER NOT NULL,
+    scored INTEGER NOT NULL,
+    polarity_sum REAL NOT NULL,
+    subjectivity_sum REAL NOT NULL,
+    words INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS agg_sketches (
+    name TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+"""
+
+# Bump when the aggregates change meaning; stores are then rebuilt once
+AGGREGATES_VERSION = '1'
+SKETCHES = ('word_count', 'reading_time', 'polarity')
+UNKNOWN = 'Unknown'
+LOCAL = '(local files)'
+
+
+class TDigest:
+    """Mergeable quantile sketch (the merging t-digest of Dunning and Ertl)
+
+    Values are kept as weighted centroids, small near both tails and
+    larger in the middle, so extreme quantiles stay accurate while the
+    size is bounded by about ``compression`` centroids.
+    """
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.means = []
+        self.weights = []
+        self.buffer = []
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value, weight=1):
+        self.buffer.append((value, weight))
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self.buffer) >= self.compression * 5:
+            self._compress()
+
+    def merge(self, other):
+        """Fold another digest into this one"""
+        other._compress()
+        self.buffer.extend(zip(other.means, other.weights))
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def _k(self, q):
+        # Scale function k1: centroid size shrinks toward q = 0 and q = 1
+        return self.compression / (2 * math.pi) * math.asin(2 * min(max(q, 0.0), 1.0) - 1)
+
+    def _q(self, k):
+        limit = self.compression / 4
+        return (math.sin(min(max(k, -limit), limit) * 2 * math.pi / self.compression) + 1) / 2
+
+    def _compress(self):
+        if not self.buffer:
+            return
+        items = sorted(list(zip(self.means, self.weights)) + self.buffer)
+        self.buffer = []
+        total = sum(weight for _, weight in items)
+        means, weights = [], []
+        mean, weight = items[0]
+        before = 0.0
+        limit = self._q(self._k(0.0) + 1) * total
+        for value, w in items[1:]:
+            if before + weight + w <= limit:
+                weight += w
+                mean += (value - mean) * w / weight
+            else:
+                means.append(mean)
+                weights.append(weight)
+                before += weight
+                limit = self._q(self._k(before / total) + 1) * total
+                mean, weight = value, w
+        means.append(mean)
+        weights.append(weight)
+        self.means, self.weights = means, weights
+
+    def quantile(self, q):
+        """Estimated value at quantile ``q`` (0-1), or None when empty"""
+        self._compress()
+        if not self.count:
+            return None
+        if len(self.means) == 1:
+            return self.means[0]
+        rank = q * self.count
+        means, weights = self.means, self.weights
+        if rank < weights[0] / 2:
+            return self.min + (means[0] - self.min) * rank / (weights[0] / 2)
+        cumulative = weights[0] / 2
+        for i in range(len(means) - 1):
+            step = (weights[i] + weights[i + 1]) / 2
+            if cumulative + step >= rank:
+                return means[i] + (means[i + 1] - means[i]) * (rank - cumulative) / step
+            cumulative += step
+        tail = min(1.0, (rank - cumulative) / (weights[-1] / 2))
+        return means[-1] + (self.max - means[-1]) * tail
+
+    def cdf(self, value):
+        """Estimated share of the values at or below ``value``, or None when empty"""
+        self._compress()
+        if not self.count:
+            return None
+        if value < self.min:
+            return 0.0
+        if value >= self.max:
+            return 1.0
+        means, weights = self.means, self.weights
+        if value < means[0]:
+            span = means[0] - self.min
+            return (weights[0] / 2) * ((value - self.min) / span if span else 1) / self.count
+        cumulative = weights[0] / 2
+        index = bisect.bisect_right(means, value) - 1
+        cumulative += sum((weights[i] + weights[i + 1]) / 2 for i in range(index))
+        if index == len(means) - 1:
+            span = self.max - means[-1]
+            return (cumulative + weights[-1] / 2 * ((value - means[-1]) / span if span else 1)
+                    ) / self.count
+        step = (weights[index] + weights[index + 1]) / 2
+        return (cumulative + step * (value - means[index]) / (means[index + 1] - means[index])
+                ) / self.count
+
+    def to_dict(self):
+        return {'compression': self.compression, 'count': self.count,
+                'min': self.min if self.count else None,
+                'max': self.max if self.count else None,
+                'centroids': [[m, w] for m, w in zip(self.means, self.weights)],
+                'buffer': self.buffer}
+
+    @classmethod
+    def from_dict(cls, data):
+        digest = cls(data['compression'])
+        digest.count = data['count']
+        if digest.count:
+            digest.min, digest.max = data['min'], data['max']
+        digest.means = [m for m, _ in data['centroids']]
+        digest.weights = [w for _, w in data['centroids']]
+        digest.buffer = [tuple(item) for item in data['buffer']]
+        return digest
+
+
+def domain_of(url):
+    """Host name without ``www.``, grouping saved files and pasted HTML together"""
+    host = urlsplit(url or '').hostname
+    if not host:
+        return LOCAL
+    return host[4:] if host.startswith('www.') else host
+
+
+class CorpusAggregates:
+    """Incrementally maintained statistics over all stored articles
+
+    Shares the history store's SQLite connection and lock; callers commit.
+    Nothing is cached in memory, because the GUI and ingest.py may add
+    to the same history at the same time: the sketches are read and
+    written back inside the transaction that stores the article.
+    """
+
+    def __init__(self, db, lock):
+        self.db = db
+        self.lock = lock
+        self.db.executescript(SCHEMA)
+
+    @property
+    def built(self):
+        with self.lock:
+            row = self.db.execute("SELECT value FROM meta WHERE key = 'aggregates'").fetchone()
+        return bool(row) and row[0] == AGGREGATES_VERSION
+
+    def _load_sketches(self, names=SKETCHES):
+        stored = dict(self.db.execute(
+            f"SELECT name, data FROM agg_sketches WHERE name IN ({','.join('?' * len(names))})",
+            names))
+        return {name: TDigest.from_dict(json.loads(stored[name])) if name in stored
+                else TDigest() for name in names}
+
+    def add(self, url, published, saved_at, category, polarity, subjectivity, stats):
+        """Count one stored article; a no-op until the first rebuild has happened
+
+        Call it after inserting the article, so the transaction already
+        holds SQLite's write lock while the sketches are updated.
+        """
+        self.add_many([(url, published, saved_at, category, polarity, subjectivity, stats)])
+
+    def add_many(self, entries):
+        """add() for a list of argument tuples, updating the sketches once"""
+        with self.lock:
+            if not entries or not self.built:
+                return
+            sketches = self._load_sketches()
+            for entry in entries:
+                self._add(sketches, *entry)
+            self._save_sketches(sketches)
+
+    def _add(self, sketches, url, published, saved_at, category, polarity, subjectivity,
+             stats):
+        day = (published or saved_at or '')[:10] or UNKNOWN
+        scored = 1 if polarity is not None else 0
+        polarity = polarity or 0.0
+        words = int((stats or {}).get('word_count') or 0)
+        self.db.execute(
+            """INSERT INTO agg_daily (day, category, articles, scored, polarity_sum)
+               VALUES (?, ?, 1, ?, ?)
+               ON CONFLICT (day, category) DO UPDATE SET
+                   articles = articles + 1, scored = scored + excluded.scored,
+                   polarity_sum = polarity_sum + excluded.polarity_sum""",
+            (day, category or UNKNOWN, scored, polarity))
+        self.db.execute(
+            """INSERT INTO agg_domains (domain, articles, scored, polarity_sum,
+                                        subjectivity_sum, words)
+               VALUES (?, 1, ?, ?, ?, ?)
+               ON CONFLICT (domain) DO UPDATE SET
+                   articles = articles + 1, scored = scored + excluded.scored,
+                   polarity_sum = polarity_sum + excluded.polarity_sum,
+                   subjectivity_sum = subjectivity_sum + excluded.subjectivity_sum,
+                   words = words + excluded.words""",
+            (domain_of(url), scored, polarity, subjectivity or 0.0, words))
+        if stats:
+            sketches['word_count'].add(words)
+            sketches['reading_time'].add(float(stats.get('reading_time') or 0.0))
+        if scored:
+            sketches['polarity'].add(polarity)
+
+    def _save_sketches(self, sketches):
+        self.db.executemany("INSERT OR REPLACE INTO agg_sketches (name, data) VALUES (?, ?)",
+                            [(name, json.dumps(digest.to_dict()))
+                             for name, digest in sketches.items()])
+
+    def rebuild(self):
+        """Recompute everything with one pass over the stored articles"""
+        with self.lock:
+            self.db.execute("DELETE FROM agg_daily")
+            self.db.execute("DELETE FROM agg_domains")
+            sketches = {name: TDigest() for name in SKETCHES}
+            # Only the stats are read from the JSON, and SQLite extracts them
+            rows = self.db.execute(
+                """SELECT url, published, saved_at, sentiment, polarity, subjectivity,
+                          json_extract(data, '$.stats.word_count'),
+                          json_extract(data, '$.stats.reading_time')
+                   FROM articles""")
+            for url, published, saved_at, category, polarity, subjectivity, words, minutes in rows:
+                stats = ({'word_count': words, 'reading_time': minutes}
+                         if words is not None else None)
+                self._add(sketches, url, published, saved_at, category, polarity, subjectivity,
+                          stats)
+            self._save_sketches(sketches)
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('aggregates', ?)",
+                            (AGGREGATES_VERSION,))
+            self.db.commit()
+
+    def percentile_rank(self, name, value):
+        """Share (0-1) of stored articles with ``name`` at or below ``value``, or None"""
+        with self.lock:
+            if not self.built:
+                return None
+            return self._load_sketches((name,))[name].cdf(value)
+
+    def summary(self, days=14, domains=10):
+        """Dashboard figures: totals, recent days, top domains and percentiles"""
+        with self.lock:
+            if not self.built:
+                self.rebuild()
+            categories = dict(self.db.execute(
+                "SELECT category, SUM(articles) FROM agg_daily GROUP BY category"))
+            daily = self.db.execute(
+                """SELECT day, category, articles, scored, polarity_sum FROM agg_daily
+                   WHERE day IN (SELECT DISTINCT day FROM agg_daily WHERE day != ?
+                                 ORDER BY day DESC LIMIT ?)
+                   ORDER BY day""", (UNKNOWN, days)).fetchall()
+            top = self.db.execute(
+                """SELECT domain, articles, scored, polarity_sum, subjectivity_sum, words
+                   FROM agg_domains ORDER BY articles DESC, domain LIMIT ?""",
+                (domains,)).fetchall()
+            percentiles = {name: {f'p{round(q * 100)}': digest.quantile(q)
+                                  for q in (0.1, 0.5, 0.9, 0.99)}
+                           for name, digest in self._load_sketches().items()}
+
+        by_day = {}
+        for day, category, articles, scored, polarity_sum in daily:
+            entry = by_day.setdefault(day, {'day': day, 'articles': 0, 'scored': 0,
+                                            'polarity_sum': 0.0, 'categories': {}})
+            entry['articles'] += articles
+            entry['scored'] += scored
+            entry['polarity_sum'] += polarity_sum
+            entry['categories'][category] = articles
+        return {
+            'articles': sum(categories.values()),
+            'sentiment': categories,
+            'days': [{'day': entry['day'], 'articles': entry['articles'],
+                      'polarity': entry['polarity_sum'] / entry['scored']
+                      if entry['scored'] else None,
+                      'categories': entry['categories']} for entry in by_day.values()],
+            'domains': [{'domain': domain, 'articles': articles,
+                         'polarity': polarity_sum / scored if scored else None,
+                         'subjectivity': subjectivity_sum / scored if scored else None,
+                         'words': words / articles}
+                        for domain, articles, scored, polarity_sum, subjectivity_sum, words
+                        in top],
+            'percentiles': percentiles,
+        }
+
+
+def _signed(value):
+    return f"{value:+.2f}" if value is not None else "  n/a"
+
+
+def format_aggregates(summary):
+    """Text for the Statistics tab"""
+    if not summary['articles']:
+        return "No articles in the history yet."
+    lines = [f"Articles in history: {summary['articles']}"]
+    lines.append("Sentiment: " + ", ".join(
+        f"{category} {count}" for category, count in
+        sorted(summary['sentiment'].items(), key=lambda item: -item[1])))
+
+    percentiles = summary['percentiles']
+    words, minutes = percentiles['word_count'], percentiles['reading_time']
+    if words['p50'] is not None:
+        lines.append(f"Word count: median {words['p50']:.0f}, 10-90% {words['p10']:.0f}-"
+                     f"{words['p90']:.0f}, 99% {words['p99']:.0f}")
+        lines.append(f"Reading time: median {minutes['p50']:.1f} min, "
+                     f"90% {minutes['p90']:.1f} min, 99% {minutes['p99']:.1f} min")
+
+    if summary['days']:
+        lines.append("")
+        lines.append("By day (published, or saved when unknown):")
+        most = max(day['articles'] for day in summary['days'])
+        for day in summary['days']:
+            bar = '#' * max(1, round(day['articles'] * 20 / most))
+            lines.append(f"  {day['day']}  {day['articles']:>5}  polarity "
+                         f"{_signed(day['polarity'])}  {bar}")
+
+    if summary['domains']:
+        lines.append("")
+        lines.append("Top sources:")
+        for domain in summary['domains']:
+            lines.append(f"  {domain['domain'][:32]:<32} {domain['articles']:>5} articles  "
+                         f"polarity {_signed(domain['polarity'])}  "
+                         f"{domain['words']:.0f} words avg")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show statistics over the article history")
+    parser.add_argument('--history', default=os.path.join("saved_data", "history.sqlite"),
+                        help="history database (default: saved_data/history.sqlite)")
+    parser.add_argument('--days', type=int, default=14,
+                        help="most recent days to list (default: 14)")
+    parser.add_argument('--domains', type=int, default=10,
+                        help="sources to list (default: 10)")
+    parser.add_argument('--rebuild', action='store_true',
+                        help="recompute the statistics from every stored article")
+    parser.add_argument('--json', action='store_true', help="print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    from history_store import HistoryStore
+
+    store = HistoryStore(args.history)
+    try:
+        if args.rebuild:
+            store.aggregates.rebuild()
+        summary = store.aggregates.summary(args.days, args.domains)
+    finally:
+        store.close()
+    print(json.dumps(summary, indent=2) if args.json else format_aggregates(summary))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
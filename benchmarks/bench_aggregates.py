@@ -0,0 +1,114 @@
+"""Corpus statistics: rescanning every stored article versus the maintained aggregates
+
+Fills a throwaway history store with synthetic rows, then times a summary
+computed by loading and scanning every article (what a dashboard without
+aggregates has to do), the aggregates' one-time rebuild, their summary,
+and the extra cost they add to each insert.
+
+Usage: python benchmarks/bench_aggregates.py [--articles 100000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_store import HistoryStore  # noqa: E402
+
+DOMAINS = [f"news{i}.example.com" for i in range(40)]
+CATEGORIES = ('Very Positive', 'Positive', 'Neutral', 'Negative', 'Very Negative')
+
+
+def fill(store, count, seed=1):
+    """Insert ``count`` rows in bulk, bypassing the per-article work of add()"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    rows = []
+    for i in range(count):
+        saved_at = (start + timedelta(minutes=rng.randrange(60 * 24 * 700))).isoformat()
+        words = int(rng.lognormvariate(6.5, 0.6))
+        polarity = round(rng.uniform(-1, 1), 3)
+        data = {'url': f"https://{rng.choice(DOMAINS)}/story/{i}", 'title': f"Story {i}",
+                'stats': {'word_count': words, 'reading_time': words / 200}}
+        rows.append((data['url'], data['title'], saved_at, saved_at[:10], saved_at,
+                     rng.choice(CATEGORIES), polarity, rng.random(), json.dumps(data)))
+    with store._lock:
+        store._db.executemany(
+            """INSERT INTO articles (url, title, date, published, saved_at, sentiment,
+                                     polarity, subjectivity, data)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""", rows)
+        store._db.commit()
+
+
+def rescan_summary(store):
+    """The same kind of summary by reading every article back"""
+    daily = defaultdict(Counter)
+    domains = defaultdict(list)
+    words = []
+    with store._lock:
+        rows = store._db.execute(
+            "SELECT published, sentiment, polarity, data FROM articles").fetchall()
+    for published, category, polarity, data in rows:
+        record = json.loads(data)
+        daily[published[:10]][category] += 1
+        domains[record['url'].split('/')[2]].append(polarity)
+        words.append(record['stats']['word_count'])
+    words.sort()
+    return len(daily), len(domains), words[len(words) // 2], words[int(len(words) * 0.99)]
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--articles', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--adds', type=int, default=200,
+                        help="single inserts timed for the per-add cost (default: 200)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as folder:
+        store = HistoryStore(os.path.join(folder, 'history.sqlite'))
+        fill(store, args.articles)
+        aggregates = store.aggregates
+
+        rescan = best_of(args.repeat, lambda: rescan_summary(store))
+        rebuild = best_of(1, aggregates.rebuild)
+        summary = best_of(args.repeat, aggregates.summary)
+        rank = best_of(args.repeat, lambda: aggregates.percentile_rank('word_count', 800))
+
+        rng = random.Random(2)
+        entries = [(f"https://{rng.choice(DOMAINS)}/new/{i}", '2026-10-01', '2026-10-01T12:00:00',
+                    'Neutral', 0.0, 0.5, {'word_count': 700, 'reading_time': 3.5})
+                   for i in range(args.adds)]
+        started = time.perf_counter()
+        for entry in entries:
+            with store._lock:
+                aggregates.add(*entry)
+                store._db.commit()
+        per_add = (time.perf_counter() - started) / args.adds
+        store.close()
+
+    print(f"{args.articles} articles")
+    print(f"{'rescan summary':<22} {rescan * 1000:>10.1f} ms")
+    print(f"{'aggregates rebuild':<22} {rebuild * 1000:>10.1f} ms  (once per store)")
+    print(f"{'aggregates summary':<22} {summary * 1000:>10.1f} ms  ({rescan / summary:.0f}x faster)")
+    print(f"{'percentile rank':<22} {rank * 1000:>10.2f} ms")
+    print(f"{'aggregates per add':<22} {per_add * 1000:>10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""HTML extraction: the original BeautifulSoup parse versus the pluggable extractors
+
+Runs over the saved pages in benchmarks/corpus (or any files/folders given,
+e.g. saved_data/http_cache) plus a few synthetic articles.
+
+Usage: python benchmarks/bench_extract.py [paths ...] [--repeat 10] [--synthetic 5]
+"""
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from extractor import EXTRACTORS  # noqa: E402
+from synthetic import make_article_html  # noqa: E402
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+
+def legacy_parse(html):
+    # ArticleAnalyzer.parse as it was before extractor.py, kept for comparison
+    soup = BeautifulSoup(html, 'html.parser')
+    h1 = soup.find('h1')
+    title = h1.text if h1 else (soup.title.string if soup.title else '')
+    author = date = None
+    for element in soup.find_all(['a', 'span', 'div'], class_=re.compile(r'author|byline', re.I)):
+        if element.text.strip():
+            author = element.text.strip()
+            break
+    for element in soup.find_all(['time', 'span', 'div'],
+                                 class_=re.compile(r'date|time|published', re.I)):
+        if element.text.strip():
+            date = element.text.strip()
+            break
+    for tag in soup(['script', 'style', 'nav', 'header', 'footer', 'aside']):
+        tag.decompose()
+    content = ' '.join(p.get_text() for p in soup.find_all('p'))
+    content = re.sub(r'\s+', ' ', content).strip()
+    return {'title': title, 'author': author or "Unknown", 'date': date or "Unknown",
+            'content': content}
+
+
+def load_pages(paths, synthetic):
+    files = []
+    for path in paths or [CORPUS]:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '**', '*.html'), recursive=True)))
+        else:
+            files.append(path)
+    pages = []
+    for path in files:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            pages.append((os.path.basename(path), f.read()))
+    pages.extend((f'synthetic-{seed}', make_article_html(seed)) for seed in range(synthetic))
+    return pages
+
+
+def best_of(repeat, func, html):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(html)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='*', help="saved pages or folders (default: benchmarks/corpus)")
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--synthetic', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    pages = load_pages(args.paths, args.synthetic)
+    if not pages:
+        print("No pages found", file=sys.stderr)
+        return 1
+
+    extractors = {name: cls() for name, cls in sorted(EXTRACTORS.items())}
+    columns = ['legacy'] + list(extractors)
+    funcs = [legacy_parse] + [extractor.extract for extractor in extractors.values()]
+    totals = dict.fromkeys(columns, 0.0)
+    mismatches = 0
+
+    print(f"{'page':<28} {'KB':>6} " + ' '.join(f"{name + ' ms':>10}" for name in columns))
+    for name, html in pages:
+        results = [extractor.extract(html) for extractor in extractors.values()]
+        if any(result != results[0] for result in results[1:]):
+            mismatches += 1
+            print(f"  warning: extractors disagree on {name}", file=sys.stderr)
+
+        timings = [best_of(args.repeat, func, html) for func in funcs]
+        for column, timing in zip(columns, timings):
+            totals[column] += timing
+        print(f"{name[:28]:<28} {len(html) / 1024:>6.1f} "
+              + ' '.join(f"{timing * 1000:>10.2f}" for timing in timings))
+
+    print(f"{'total':<28} {'':>6} " + ' '.join(f"{totals[c] * 1000:>10.2f}" for c in columns))
+    for column in columns[1:]:
+        print(f"{column}: {totals['legacy'] / totals[column]:.2f}x the legacy parse")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
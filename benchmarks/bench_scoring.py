@@ -0,0 +1,86 @@
+"""Sentence scoring: the original per-sentence loops versus the single-pass scorer
+
+Usage: python benchmarks/bench_scoring.py [--paragraphs 200] [--repeat 20]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scoring import SentenceScorer  # noqa: E402
+from synthetic import make_article_text  # noqa: E402
+
+
+def legacy_important_sentences(text, num_sentences=5):
+    # The scoring as it was before scoring.py, kept verbatim for comparison
+    sentences = re.split(r'[.!?]+', text)
+    sentences = [s.strip() for s in sentences if len(s.strip()) > 20]
+    scored_sentences = []
+    for sentence in sentences:
+        score = len(sentence.split()) * 0.1
+        if re.search(r'\d+', sentence):
+            score += 2
+        if '"' in sentence or '"' in sentence:
+            score += 2
+        keywords = ['important', 'significant', 'crucial', 'findings', 'results',
+                    'concluded', 'research', 'study', 'analysis', 'report']
+        for keyword in keywords:
+            if keyword in sentence.lower():
+                score += 1.5
+        scored_sentences.append((score, sentence))
+    scored_sentences.sort(reverse=True)
+    return "\n\n".join(s[1] for s in scored_sentences[:num_sentences])
+
+
+def legacy_key_points(text):
+    sentences = text.split('.')
+    indicators = ['most important', 'significant', 'crucial', 'key', 'major',
+                  'essential', 'fundamental', 'primary']
+    scored_sentences = []
+    for sentence in sentences:
+        score = 0
+        for indicator in indicators:
+            if indicator in sentence.lower():
+                score += 1
+        if score > 0:
+            scored_sentences.append((score, sentence.strip()))
+    scored_sentences.sort(reverse=True)
+    key_points = [s[1] for s in scored_sentences[:5]]
+    return "• " + "\n• ".join(key_points) if key_points else "No key points identified."
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--paragraphs', type=int, nargs='+', default=[10, 50, 200, 1000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    scorer = SentenceScorer()
+    print(f"{'paragraphs':>10} {'sentences':>10} {'legacy ms':>10} {'scorer ms':>10} {'speedup':>8}")
+    for paragraphs in args.paragraphs:
+        text = ' '.join(make_article_text(seed=paragraphs, paragraphs=paragraphs))
+        if scorer.score(text)['summary'] != legacy_important_sentences(text):
+            print("  warning: summaries differ", file=sys.stderr)
+
+        legacy = best_of(args.repeat, lambda: (legacy_important_sentences(text),
+                                               legacy_key_points(text)))
+        single = best_of(args.repeat, lambda: scorer.score(text))
+        count = len(scorer.segment(text))
+        print(f"{paragraphs:>10} {count:>10} {legacy * 1000:>10.2f} {single * 1000:>10.2f} "
+              f"{legacy / single:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Startup cost: import-time breakdown and the GUI's time to first frame
+
+Each measurement runs in a fresh interpreter:
+
+- ``python -X importtime`` for ``import main`` (the GUI) and ``import
+  pipeline`` (headless use), reporting the total and the slowest modules
+  imported directly by them
+- time to first frame: from interpreter start until the window has been
+  drawn, then until history is listed and the analyzer is warmed up
+
+The GUI part needs a display and is skipped without one. It runs in a
+temporary folder, so the real saved_data is not touched.
+
+Usage: python benchmarks/bench_startup.py [--repeat 5] [--top 10] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_FRAME = """
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+import main
+imported = time.perf_counter()
+app = main.ModernNewsSummarizer()
+app.window.update()
+shown = time.perf_counter()
+marks = {{}}
+
+def check():
+    # Background jobs report through the main loop, so it has to run
+    if 'history' not in marks and app.history_loaded.is_set():
+        marks['history'] = time.perf_counter()
+    if app.history_loaded.is_set() and app.analyzer_ready.is_set():
+        marks['ready'] = time.perf_counter()
+        app.window.quit()
+    else:
+        app.window.after(5, check)
+
+app.window.after(5, check)
+app.window.mainloop()
+app._on_close()
+print(json.dumps({{'import': imported - started, 'first_frame': shown - started,
+                  'history': marks['history'] - started,
+                  'analyzer_ready': marks['ready'] - started, 'error': app.analyzer_error}}))
+"""
+
+
+def import_times(module):
+    """(total seconds, {directly imported module: cumulative seconds}) for one import"""
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True, check=True).stderr
+    total, children, pending = 0.0, {}, {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        # Nesting is shown by two spaces of indentation per level, and
+        # every module is listed after the modules it imported
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        seconds = int(cumulative) / 1e6
+        if depth == 1:
+            pending[name.strip()] = seconds
+        elif depth == 0:
+            if name.strip() == module:
+                total, children = seconds, pending
+            pending = {}
+    return total, children
+
+
+def first_frame():
+    """Timings of one GUI start, or None without a display"""
+    with tempfile.TemporaryDirectory() as folder:
+        completed = subprocess.run([sys.executable, '-c', FIRST_FRAME.format(root=ROOT)],
+                                   cwd=folder, capture_output=True, text=True)
+    if completed.returncode:
+        return None
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--json', action='store_true', help="print the medians as JSON")
+    args = parser.parse_args(argv)
+
+    report = {}
+    for module in ('main', 'pipeline'):
+        runs = [import_times(module) for _ in range(args.repeat)]
+        report[f'import_{module}'] = statistics.median(total for total, _ in runs)
+        if not args.json:
+            print(f"import {module}: {report[f'import_{module}'] * 1000:.1f} ms "
+                  f"(median of {args.repeat})")
+            children = runs[len(runs) // 2][1]
+            for name, seconds in sorted(children.items(), key=lambda c: -c[1])[:args.top]:
+                print(f"  {seconds * 1000:>8.1f} ms  {name}")
+
+    frames = [first_frame() for _ in range(args.repeat)]
+    frames = [frame for frame in frames if frame]
+    if frames:
+        for key in ('first_frame', 'history', 'analyzer_ready'):
+            report[key] = statistics.median(frame[key] for frame in frames)
+        if not args.json:
+            print(f"time to first frame:   {report['first_frame'] * 1000:.0f} ms")
+            print(f"history listed:        {report['history'] * 1000:.0f} ms")
+            print(f"analyzer warmed up:    {report['analyzer_ready'] * 1000:.0f} ms")
+    elif not args.json:
+        print("time to first frame: skipped (no display)")
+
+    if args.json:
+        print(json.dumps({key: round(value, 4) for key, value in report.items()}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
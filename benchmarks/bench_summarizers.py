@@ -0,0 +1,60 @@
+"""Summary latency: the keyword sentence scorer versus TextRank, with and without windowing
+
+Times a whole summary per article length: the scorer's single pass for
+the keyword mode, and that pass plus TextRank for the graph mode (with
+the default window and sentence cap, and comparing every sentence with
+every other). Also reports how many of the five summary sentences the
+two modes agree on.
+
+Usage: python benchmarks/bench_summarizers.py [--paragraphs 10 50 200 1000] [--repeat 10]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scoring import SentenceScorer  # noqa: E402
+from synthetic import make_article_text  # noqa: E402
+from textrank import TextRankSummarizer  # noqa: E402
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--paragraphs', type=int, nargs='+', default=[10, 50, 200, 1000])
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    scorer = SentenceScorer()
+    windowed = TextRankSummarizer()
+    full = TextRankSummarizer(window=None, max_sentences=float('inf'))
+    windowed.summarize(scorer.score(make_article_text(seed=0, paragraphs=5)[0])['sentences'])
+
+    print(f"{'paragraphs':>10} {'sentences':>10} {'keywords ms':>12} {'textrank ms':>12} "
+          f"{'unwindowed ms':>14} {'overlap':>8}")
+    for paragraphs in args.paragraphs:
+        text = ' '.join(make_article_text(seed=paragraphs, paragraphs=paragraphs))
+        scored = scorer.score(text)
+        overlap = len(set(scored['summary'].split("\n\n"))
+                      & set(windowed.summarize(scored['sentences']).split("\n\n")))
+
+        keywords = best_of(args.repeat, lambda: scorer.score(text))
+        textrank = best_of(args.repeat, lambda: windowed.summarize(scorer.score(text)['sentences']))
+        unwindowed = best_of(max(1, args.repeat // 5),
+                             lambda: full.summarize(scorer.score(text)['sentences']))
+        print(f"{paragraphs:>10} {len(scored['sentences']):>10} {keywords * 1000:>12.2f} "
+              f"{textrank * 1000:>12.2f} {unwindowed * 1000:>14.2f} {overlap:>6}/5")
+
+
+if __name__ == "__main__":
+    main()
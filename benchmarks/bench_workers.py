@@ -0,0 +1,47 @@
+"""Articles/sec of the parse and analyze stages versus process-pool size
+
+Usage: python benchmarks/bench_workers.py [--articles 200] [--max-workers N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import analyze_documents  # noqa: E402
+from synthetic import make_article_html  # noqa: E402
+
+
+def run(pages, workers):
+    documents = ((f'synthetic-{i}', html, None) for i, html in enumerate(pages))
+    started = time.perf_counter()
+    failed = sum(1 for _, _, error in analyze_documents(documents, workers=workers) if error)
+    elapsed = time.perf_counter() - started
+    if failed:
+        print(f"  {failed} articles failed", file=sys.stderr)
+    return len(pages) / elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--articles', type=int, default=200)
+    parser.add_argument('--paragraphs', type=int, default=20)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    pages = [make_article_html(seed, args.paragraphs) for seed in range(args.articles)]
+    counts = sorted({1, 2, 4, 8, 16, args.max_workers} & set(range(1, args.max_workers + 1)))
+
+    print(f"{args.articles} articles, {args.paragraphs} paragraphs each")
+    print(f"{'workers':>8} {'articles/s':>12} {'speedup':>8}")
+    run(pages[:5], 1)  # warm up lazily loaded corpora before timing
+    baseline = None
+    for workers in counts:
+        rate = run(pages, workers)
+        baseline = baseline or rate
+        print(f"{workers:>8} {rate:>12.1f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
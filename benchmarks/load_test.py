@@ -0,0 +1,140 @@
+"""Load test for service.py: latency percentiles and throughput under concurrency
+
+Posts synthetic article pages to /analyze from ``--concurrency`` client
+threads, each on its own keep-alive connection, and reports throughput,
+p50/p90/p99 latency and how many requests were rejected with 503.
+With --start a service is launched for the run and stopped afterwards.
+
+Usage: python benchmarks/load_test.py [--url http://127.0.0.1:8080] [--start -j 2]
+                                      [--requests 500] [--concurrency 32]
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from service import percentile  # noqa: E402
+from synthetic import make_article_html  # noqa: E402
+
+
+def wait_until_up(host, port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection(host, port, timeout=2)
+            connection.request('GET', '/health')
+            if connection.getresponse().status == 200:
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def get_json(host, port, path):
+    connection = http.client.HTTPConnection(host, port, timeout=10)
+    connection.request('GET', path)
+    return json.loads(connection.getresponse().read())
+
+
+def client(host, port, bodies, latencies, statuses, lock):
+    connection = http.client.HTTPConnection(host, port, timeout=120)
+    for body in bodies:
+        started = time.perf_counter()
+        try:
+            connection.request('POST', '/analyze', body,
+                               {'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=120)
+            status = 'error'
+        elapsed = time.perf_counter() - started
+        with lock:
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 200:
+                latencies.append(elapsed)
+    connection.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8080')
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--distinct', type=int, default=0,
+                        help="distinct pages to cycle through (default: one per request, "
+                             "so the result cache never hits)")
+    parser.add_argument('--paragraphs', type=int, default=12)
+    parser.add_argument('--start', action='store_true',
+                        help="start service.py for the run (without its result cache)")
+    parser.add_argument('-j', '--processes', type=int, default=1,
+                        help="with --start: service worker processes")
+    parser.add_argument('--max-batch', type=int, default=16,
+                        help="with --start: pages per batch")
+    args = parser.parse_args(argv)
+
+    parts = urlsplit(args.url)
+    host, port = parts.hostname, parts.port or 80
+    server = None
+    if args.start:
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'service.py'),
+                                   '--host', host, '--port', str(port),
+                                   '-j', str(args.processes), '--max-batch', str(args.max_batch),
+                                   '--no-result-cache', '--no-cache'], cwd=ROOT)
+    try:
+        if not wait_until_up(host, port):
+            print(f"No service answering at {args.url}", file=sys.stderr)
+            return 1
+
+        distinct = args.distinct or args.requests
+        pages = [json.dumps({'html': make_article_html(seed, args.paragraphs),
+                             'url': f'synthetic-{seed}'})
+                 for seed in range(distinct)]
+        bodies = [pages[i % distinct] for i in range(args.requests)]
+        # Warm up lazy imports in the workers before timing
+        client(host, port, bodies[:(args.processes or os.cpu_count() or 1) * 2], [], {},
+               threading.Lock())
+        before = get_json(host, port, '/metrics?format=json')
+
+        latencies, statuses, lock = [], {}, threading.Lock()
+        threads = [threading.Thread(target=client,
+                                    args=(host, port, bodies[i::args.concurrency],
+                                          latencies, statuses, lock))
+                   for i in range(args.concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        after = get_json(host, port, '/metrics?format=json')
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    batches = after['batches'] - before['batches']
+    pages_batched = after['batched_pages'] - before['batched_pages']
+    print(f"{args.requests} requests, {args.concurrency} concurrent, {elapsed:.2f}s")
+    print(f"Throughput:   {statuses.get(200, 0) / elapsed:.1f} articles/s")
+    print(f"Latency p50:  {percentile(latencies, 0.50) * 1000:.1f} ms")
+    print(f"Latency p90:  {percentile(latencies, 0.90) * 1000:.1f} ms")
+    print(f"Latency p99:  {percentile(latencies, 0.99) * 1000:.1f} ms")
+    print(f"Mean batch:   {pages_batched / batches if batches else 0:.1f} pages")
+    print(f"Responses:    " + ', '.join(f"{status}: {count}" for status, count in
+                                          sorted(statuses.items(), key=str)))
+    return 0 if statuses.get(200) == args.requests else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""Offline benchmark suite for the extraction and analysis steps, with a baseline
+
+Runs each step over the saved pages in benchmarks/corpus plus a few long
+synthetic articles, without any network access or caches:
+
+    extract      ArticleAnalyzer.parse (title, author, date and body)
+    summary      get_important_sentences
+    sentiment    analyze_sentiment
+    key_points   extract_key_points
+    statistics   generate_statistics
+    entities     topics.extract_entities
+    analyze      the whole analysis of one document (analyze_batch)
+
+For every step it reports documents per second, p50/p90/p99 latency per
+document and the peak memory traced during one pass. The results are
+compared with benchmarks/baseline.json: a step whose time per document
+in its fastest pass, or whose peak memory, grew by more than the
+tolerance is reported as a regression and the exit status is 1.
+
+Times are compared relative to a short pure-Python calibration loop run
+right before and after each step, so a baseline recorded on a faster or
+slower (or busier) machine still compares roughly like for like. For
+reliable results record the baseline on the machine that checks it
+(--save-baseline).
+
+Usage: python benchmarks/run_suite.py [--repeat 10] [--tolerance 0.25]
+                                      [--save-baseline] [--json]
+"""
+import argparse
+import gc
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import ArticleAnalyzer  # noqa: E402
+from service import percentile  # noqa: E402
+from synthetic import make_article_html  # noqa: E402
+from topics import extract_entities  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPUS = os.path.join(HERE, 'corpus')
+BASELINE = os.path.join(HERE, 'baseline.json')
+
+
+def load_documents(synthetic, paragraphs):
+    """[(name, html)] for the checked-in corpus and the synthetic long articles"""
+    documents = []
+    for path in sorted(glob.glob(os.path.join(CORPUS, '*.html'))):
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            documents.append((os.path.basename(path), f.read()))
+    documents.extend((f'synthetic-{seed}', make_article_html(seed, paragraphs))
+                     for seed in range(synthetic))
+    return documents
+
+
+def steps(analyzer):
+    """{name: (function, True when it takes HTML rather than extracted text)}"""
+    return {
+        'extract': (analyzer.parse, True),
+        'summary': (analyzer.get_important_sentences, False),
+        'sentiment': (analyzer.analyze_sentiment, False),
+        'key_points': (analyzer.extract_key_points, False),
+        'statistics': (analyzer.generate_statistics, False),
+        'entities': (extract_entities, False),
+        'analyze': (analyzer.analyze, False),
+    }
+
+
+def calibrate(rounds=3):
+    """Seconds for a fixed pure-Python workload (best of ``rounds``)"""
+    best = float('inf')
+    for _ in range(rounds):
+        started = time.perf_counter()
+        counts = {}
+        for i in range(200000):
+            key = str(i % 997)
+            counts[key] = counts.get(key, 0) + len(key)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def measure(func, inputs, repeat):
+    """Latencies of ``repeat`` passes over ``inputs`` and the peak traced bytes of one"""
+    for value in inputs:
+        func(value)     # lazy imports and lexicon loading are not measured
+    calibration = calibrate()
+    latencies, passes = [], []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for value in inputs:
+            call = time.perf_counter()
+            func(value)
+            latencies.append(time.perf_counter() - call)
+        passes.append(time.perf_counter() - started)
+    calibration = min(calibration, calibrate())
+
+    # Start from a full collection: otherwise whether the collector runs
+    # during the traced pass, and so the peak, depends on what earlier
+    # steps and imports happened to allocate
+    gc.collect()
+    tracemalloc.start()
+    try:
+        for value in inputs:
+            func(value)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'docs_per_s': round(len(latencies) / sum(passes), 2),
+        'best_ms': round(min(passes) / len(inputs) * 1000, 4),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 4),
+        'p90_ms': round(percentile(latencies, 0.90) * 1000, 4),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 4),
+        'peak_kib': round(peak / 1024, 1),
+        'calibration_s': round(calibration, 5),
+    }
+
+
+def run(repeat, synthetic, paragraphs):
+    analyzer = ArticleAnalyzer()
+    documents = load_documents(synthetic, paragraphs)
+    pages = [html for _, html in documents]
+    texts = [analyzer.parse(html)['content'] for html in pages]
+    results = {}
+    for name, (func, takes_html) in steps(analyzer).items():
+        results[name] = measure(func, pages if takes_html else texts, repeat)
+    analyzer.fetcher.close()
+    return {
+        'config': {'documents': len(documents), 'synthetic': synthetic,
+                   'paragraphs': paragraphs},
+        'repeat': repeat,
+        'python': sys.version.split()[0],
+        'steps': results,
+    }
+
+
+def compare(report, baseline, tolerance, memory_tolerance):
+    """[(step, metric, baseline value, current value, ratio)] of the regressions"""
+    regressions = []
+    for name, current in report['steps'].items():
+        previous = baseline['steps'].get(name)
+        if previous is None:
+            continue
+        scale = current['calibration_s'] / previous['calibration_s']
+        checks = (('best_ms', previous['best_ms'] * scale, tolerance),
+                  ('peak_kib', previous['peak_kib'], memory_tolerance))
+        for metric, expected, allowed in checks:
+            if expected and current[metric] > expected * (1 + allowed):
+                regressions.append((name, metric, expected, current[metric],
+                                    current[metric] / expected))
+    return regressions
+
+
+def print_report(report):
+    config = report['config']
+    print(f"{config['documents']} documents ({config['synthetic']} synthetic with "
+          f"{config['paragraphs']} paragraphs), {report['repeat']} passes")
+    print(f"{'step':<12} {'docs/s':>10} {'best ms':>10} {'p50 ms':>10} {'p90 ms':>10} "
+          f"{'p99 ms':>10} {'peak KiB':>10}")
+    for name, result in report['steps'].items():
+        print(f"{name:<12} {result['docs_per_s']:>10.1f} {result['best_ms']:>10.3f} "
+              f"{result['p50_ms']:>10.3f} {result['p90_ms']:>10.3f} {result['p99_ms']:>10.3f} "
+              f"{result['peak_kib']:>10.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10,
+                        help="timed passes over the documents (default: 10)")
+    parser.add_argument('--synthetic', type=int, default=4,
+                        help="synthetic long articles added to the corpus (default: 4)")
+    parser.add_argument('--paragraphs', type=int, default=60,
+                        help="paragraphs per synthetic article (default: 60)")
+    parser.add_argument('--baseline', default=BASELINE,
+                        help="baseline file (default: benchmarks/baseline.json)")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="write this run as the new baseline instead of comparing")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed growth of the time per document (default: 0.25 = 25%%)")
+    parser.add_argument('--memory-tolerance', type=float, default=0.20,
+                        help="allowed peak memory growth (default: 0.20 = 20%%)")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = run(args.repeat, args.synthetic, args.paragraphs)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        print(f"Baseline saved to {args.baseline}", file=sys.stderr)
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; record one with --save-baseline",
+              file=sys.stderr)
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline['config'] != report['config']:
+        print(f"Baseline was recorded with {baseline['config']}; rerun with the same "
+              f"options to compare", file=sys.stderr)
+        return 1
+    regressions = compare(report, baseline, args.tolerance, args.memory_tolerance)
+    for name, metric, expected, current, ratio in regressions:
+        print(f"REGRESSION {name} {metric}: {current:.3f} vs {expected:.3f} expected "
+              f"({ratio:.2f}x)", file=sys.stderr)
+    if not regressions:
+        print(f"No regressions against {args.baseline}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""Deterministic synthetic news articles for benchmarks"""
+import random
+
+SUBJECTS = ['The ministry', 'Researchers', 'The central bank', 'Local officials',
+            'The company', 'Analysts', 'The space agency', 'Hospital staff',
+            'The committee', 'Investors', 'The court', 'Union leaders']
+VERBS = ['reported', 'announced', 'concluded', 'warned', 'confirmed', 'rejected',
+         'praised', 'criticised', 'questioned', 'welcomed']
+OBJECTS = ['a significant increase in costs', 'the results of a new study',
+           'a crucial change to the policy', 'the major findings of the review',
+           'an important analysis of the market', 'a terrible decline in exports',
+           'the excellent progress on the project', 'a fundamental shift in strategy',
+           'the primary cause of the delays', 'an essential upgrade to the network',
+           'a disappointing quarter for retailers', 'the key research on vaccines']
+TAILS = ['on Monday', 'after weeks of debate', 'despite strong opposition',
+         'according to a report', 'in a statement', 'earlier this year',
+         'by {n} percent', 'for the {n}th time', 'with {n} million in funding']
+
+
+def make_sentence(rng):
+    tail = rng.choice(TAILS).format(n=rng.randint(2, 950))
+    sentence = f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(OBJECTS)} {tail}"
+    if rng.random() < 0.15:
+        sentence = f'"{sentence}," an official said'
+    return sentence + '.'
+
+
+def make_article_text(seed=0, paragraphs=12, sentences_per_paragraph=5):
+    """Return a list of paragraph strings"""
+    rng = random.Random(seed)
+    return [' '.join(make_sentence(rng) for _ in range(sentences_per_paragraph))
+            for _ in range(paragraphs)]
+
+
+def make_article_html(seed=0, paragraphs=12, sentences_per_paragraph=5):
+    """Return a full news-like HTML page with boilerplate around the article"""
+    rng = random.Random(seed)
+    body = '\n'.join(f'<p>{p}</p>' for p in
+                     make_article_text(seed, paragraphs, sentences_per_paragraph))
+    links = '\n'.join(f'<li><a href="/section/{i}">Section {i}</a></li>' for i in range(40))
+    return f"""<!DOCTYPE html>
+<html><head><title>Synthetic story {seed}</title>
+<script>var tracking = {{"id": {seed}}};</script>
+<style>body {{ font-family: sans-serif; }}</style></head>
+<body><header><nav><ul>{links}</ul></nav></header>
+<article><h1>Synthetic story {seed}: {rng.choice(OBJECTS)}</h1>
+<span class="byline">By Staff Writer {rng.randint(1, 50)}</span>
+<time class="published-date">Jan {rng.randint(1, 28)}, 2025</time>
+{body}
+</article>
+<aside><p>Related: more coverage from our newsroom.</p></aside>
+<footer><p>Copyright 2025 Example News</p></footer></body></html>"""
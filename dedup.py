@@ -0,0 +1,143 @@
+"""Near-duplicate detection with MinHash signatures and an LSH index in SQLite
+
+Wire copies of one story are recognised by the Jaccard similarity of
+their word 4-shingles, estimated from MinHash signatures. Signatures are
+split into bands; articles sharing any band bucket become candidates, so
+a lookup reads a few index entries per band instead of scanning the
+history.
+"""
+import base64
+import hashlib
+import re
+import zlib
+
+NUM_PERM = 120
+BANDS = 24
+SHINGLE_SIZE = 4
+THRESHOLD = 0.7
+MAX_BUCKET = 200   # candidates read per band bucket, bounding hot buckets
+MIN_SHINGLES = 8   # texts shorter than this are too small to compare
+MERSENNE_PRIME = (1 << 61) - 1
+WORD = re.compile(r'\w+')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS minhash (
+    article_id INTEGER PRIMARY KEY,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lsh_buckets (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    article_id INTEGER NOT NULL,
+    PRIMARY KEY (band, bucket, article_id)
+) WITHOUT ROWID;
+"""
+
+
+def encode_signature(signature):
+    return base64.b64encode(signature.astype('<u4').tobytes()).decode('ascii')
+
+
+def decode_signature(value):
+    import numpy as np
+
+    if isinstance(value, str):
+        value = base64.b64decode(value)
+    return np.frombuffer(value, dtype='<u4')
+
+
+class MinHasher:
+    """MinHash signatures of word shingles, stable across runs and processes"""
+
+    def __init__(self, num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE, seed=1):
+        import numpy as np
+
+        self.np = np
+        state = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.a = state.randint(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.b = state.randint(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.mix = state.randint(1, 1 << 32, size=shingle_size, dtype=np.uint64) | 1
+
+    def shingles(self, text):
+        """32-bit hashes of every run of ``shingle_size`` words"""
+        np = self.np
+        words = np.array([zlib.crc32(w.encode('utf-8')) for w in WORD.findall(text.lower())],
+                         dtype=np.uint64)
+        count = len(words) - self.shingle_size + 1
+        if count < 1:
+            return np.empty(0, dtype=np.uint64)
+        hashes = np.zeros(count, dtype=np.uint64)
+        for offset in range(self.shingle_size):
+            hashes = hashes * self.mix[offset] + words[offset:offset + count]
+        return np.unique(hashes & np.uint64(0xffffffff))
+
+    def signature(self, text):
+        """The signature of ``text`` as a uint32 array, or None for very short texts"""
+        np = self.np
+        shingles = self.shingles(text)
+        if len(shingles) < MIN_SHINGLES:
+            return None
+        # (a * x + b) mod p, wrapping in 64 bits as the classic formulation does
+        permuted = (shingles[:, None] * self.a + self.b) % np.uint64(MERSENNE_PRIME)
+        return (permuted & np.uint64(0xffffffff)).min(axis=0).astype(np.uint32)
+
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of two signatures"""
+    return float((first == second).sum()) / len(first)
+
+
+class LshIndex:
+    """Banded MinHash index stored next to the articles it describes
+
+    Shares the history store's SQLite connection and lock; callers commit.
+    """
+
+    def __init__(self, db, lock, bands=BANDS, threshold=THRESHOLD):
+        self.db = db
+        self.lock = lock
+        self.bands = bands
+        self.threshold = threshold
+        self.db.executescript(SCHEMA)
+
+    def _buckets(self, signature):
+        rows = len(signature) // self.bands
+        for band in range(self.bands):
+            digest = hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(),
+                                     digest_size=8).digest()
+            yield band, int.from_bytes(digest, 'big', signed=True)
+
+    def candidates(self, signature):
+        """Ids of articles sharing at least one band bucket with ``signature``"""
+        found = set()
+        with self.lock:
+            for band, bucket in self._buckets(signature):
+                found.update(row[0] for row in self.db.execute(
+                    "SELECT article_id FROM lsh_buckets WHERE band = ? AND bucket = ? "
+                    "ORDER BY article_id DESC LIMIT ?", (band, bucket, MAX_BUCKET)))
+        return found
+
+    def query(self, signature):
+        """(article_id, similarity) of indexed articles at or above the threshold, best first"""
+        candidates = list(self.candidates(signature))
+        if not candidates:
+            return []
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT article_id, signature FROM minhash WHERE article_id IN "
+                f"({','.join('?' * len(candidates))})", candidates).fetchall()
+        matches = [(article_id, similarity(signature, decode_signature(blob)))
+                   for article_id, blob in rows]
+        return sorted((m for m in matches if m[1] >= self.threshold),
+                      key=lambda m: (-m[1], m[0]))
+
+    def insert(self, article_id, signature):
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO minhash (article_id, signature) VALUES (?, ?)",
+                            (article_id, signature.astype('<u4').tobytes()))
+            self.db.executemany("INSERT OR IGNORE INTO lsh_buckets (band, bucket, article_id) "
+                                "VALUES (?, ?, ?)",
+                                [(band, bucket, article_id)
+                                 for band, bucket in self._buckets(signature)])
@@ -0,0 +1,201 @@
+"""Streaming export of the article history to CSV, JSON lines, Parquet or Arrow"""
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import datetime
+
+from history_store import HistoryStore, SENTIMENT_CATEGORIES, parse_published, sentiment_fields
+
+EXPORT_FORMATS = {
+    'csv': '.csv',
+    'jsonl': '.jsonl',
+    'parquet': '.parquet',
+    'arrow': '.arrow',
+}
+
+# (record key, CSV header, Arrow type name)
+FIELDS = [
+    ('id', 'ID', 'int64'),
+    ('title', 'Title', 'string'),
+    ('url', 'URL', 'string'),
+    ('author', 'Author', 'string'),
+    ('date', 'Date', 'string'),
+    ('published', 'Published', 'string'),
+    ('saved_at', 'Saved At', 'string'),
+    ('summary', 'Summary', 'string'),
+    ('sentiment', 'Sentiment', 'string'),
+    ('polarity', 'Polarity', 'float64'),
+    ('subjectivity', 'Subjectivity', 'float64'),
+    ('key_points', 'Key Points', 'string'),
+    ('word_count', 'Word Count', 'int64'),
+    ('reading_time', 'Reading Time (min)', 'float64'),
+    ('cluster_id', 'Story Cluster', 'int64'),
+    ('duplicate_of', 'Duplicate Of', 'int64'),
+]
+
+
+def flatten(record):
+    """One export row from a stored record, with every text field untruncated"""
+    category, polarity, subjectivity = sentiment_fields(record)
+    stats = record.get('stats') or {}
+    row = {key: record.get(key) for key, _, _ in FIELDS}
+    row.update({
+        'published': parse_published(record.get('date')),
+        'sentiment': category,
+        'polarity': polarity,
+        'subjectivity': subjectivity,
+        'word_count': stats.get('word_count'),
+        'reading_time': stats.get('reading_time'),
+    })
+    return row
+
+
+def _chunks(records, chunk_size):
+    chunk = []
+    for record in records:
+        chunk.append(flatten(record))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _CsvWriter:
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([header for _, header, _ in FIELDS])
+
+    def write(self, rows):
+        self.writer.writerows([[row[key] for key, _, _ in FIELDS] for row in rows])
+
+    def close(self):
+        self.file.close()
+
+
+class _JsonlWriter:
+    def __init__(self, path):
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def write(self, rows):
+        self.file.writelines(json.dumps(row, ensure_ascii=False) + '\n' for row in rows)
+
+    def close(self):
+        self.file.close()
+
+
+class _ArrowWriter:
+    def __init__(self, path, fmt):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError(f"{fmt} export requires pyarrow (pip install pyarrow)") from None
+        self.pa = pa
+        self.schema = pa.schema([(key, getattr(pa, type_name)()) for key, _, type_name in FIELDS])
+        if fmt == 'parquet':
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+        else:
+            import pyarrow.ipc as ipc
+            self.sink = pa.OSFile(path, 'wb')
+            self.writer = ipc.new_file(self.sink, self.schema)
+
+    def write(self, rows):
+        # Each chunk becomes one row group / record batch
+        columns = {key: [row[key] for row in rows] for key, _, _ in FIELDS}
+        self.writer.write_table(self.pa.Table.from_pydict(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+        if hasattr(self, 'sink'):
+            self.sink.close()
+
+
+def open_writer(path, fmt):
+    if fmt == 'csv':
+        return _CsvWriter(path)
+    if fmt == 'jsonl':
+        return _JsonlWriter(path)
+    if fmt in ('parquet', 'arrow'):
+        return _ArrowWriter(path, fmt)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def export_history(store, path, fmt='csv', chunk_size=1000, progress=None, **filters):
+    """Stream matching history records to ``path`` and return the number written
+
+    Records are read from the store and written ``chunk_size`` at a time,
+    so memory use does not depend on the size of the history. Filters are
+    those accepted by HistoryStore.search(). ``progress(written, total)``
+    is called after every chunk.
+    """
+    total = store.count(**filters)
+    writer = open_writer(path, fmt)
+    written = 0
+    try:
+        for rows in _chunks(store.iter_records(chunk_size, **filters), chunk_size):
+            writer.write(rows)
+            written += len(rows)
+            if progress:
+                progress(written, total)
+    finally:
+        writer.close()
+    return written
+
+
+def export_filename(folder, fmt):
+    return os.path.join(folder, f"news_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                                f"{EXPORT_FORMATS[fmt]}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export analyzed articles from the history store")
+    parser.add_argument('-f', '--format', choices=sorted(EXPORT_FORMATS), default='csv')
+    parser.add_argument('-o', '--output',
+                        help="output file (default: saved_data/exports/news_analysis_<time>)")
+    parser.add_argument('--store', default=os.path.join("saved_data", "history.sqlite"),
+                        help="history database (default: saved_data/history.sqlite)")
+    parser.add_argument('--query', help="full-text search terms")
+    parser.add_argument('--sentiment', choices=SENTIMENT_CATEGORIES)
+    parser.add_argument('--min-polarity', type=float)
+    parser.add_argument('--max-polarity', type=float)
+    parser.add_argument('--published-from', help="YYYY-MM-DD")
+    parser.add_argument('--published-to', help="YYYY-MM-DD")
+    parser.add_argument('--saved-from', help="YYYY-MM-DD")
+    parser.add_argument('--saved-to', help="YYYY-MM-DD")
+    parser.add_argument('--unique', action='store_true',
+                        help="only the first article of every near-duplicate cluster")
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    polarity = None
+    if args.min_polarity is not None or args.max_polarity is not None:
+        polarity = (args.min_polarity, args.max_polarity)
+    output = args.output or export_filename(os.path.join("saved_data", "exports"), args.format)
+    if not os.path.isfile(args.store):
+        print(f"No history store at {args.store}", file=sys.stderr)
+        return 1
+
+    store = HistoryStore(args.store)
+    try:
+        written = export_history(
+            store, output, args.format, args.chunk_size,
+            progress=lambda done, total: print(f"\rExported {done}/{total}", end='',
+                                               file=sys.stderr, flush=True),
+            query=args.query, sentiment=args.sentiment, polarity=polarity,
+            published_from=args.published_from, published_to=args.published_to,
+            saved_from=args.saved_from, saved_to=args.saved_to, unique=args.unique)
+    except OSError as e:
+        print(f"\nCould not write {output}: {e}", file=sys.stderr)
+        return 1
+    finally:
+        store.close()
+    print(f"\nExported {written} articles to {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
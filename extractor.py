@@ -0,0 +1,349 @@
+"""Article extraction from HTML: title, byline, date and body paragraphs
+
+Two interchangeable extractors produce the same fields:
+
+- ``lxml``: a single streaming pass over lxml's C parser with a parser
+  target, so no tree is built and every field is collected at once
+- ``soup``: the original BeautifulSoup / html.parser path
+
+Structured metadata (JSON-LD, OpenGraph/article meta tags and
+``<time datetime>``) is preferred over class-name heuristics when present.
+When the page has an ``<article>`` element with paragraphs, the body is
+taken from the first such element only.
+
+Both extractors also accept HTML in pieces through stream(); the lxml one
+parses each piece as it arrives and reports when everything it needs has
+been seen, so a download can stop there.
+"""
+import json
+import re
+
+BOILERPLATE_TAGS = frozenset(['script', 'style', 'nav', 'header', 'footer', 'aside'])
+RAW_TEXT_TAGS = frozenset(['script', 'style'])
+AUTHOR_TAGS = frozenset(['a', 'span', 'div'])
+DATE_TAGS = frozenset(['time', 'span', 'div'])
+AUTHOR_CLASS = re.compile(r'author|byline', re.I)
+DATE_CLASS = re.compile(r'date|time|published', re.I)
+WHITESPACE = re.compile(r'\s+')
+
+ARTICLE_TYPES = frozenset(['Article', 'NewsArticle', 'ReportageNewsArticle', 'AnalysisNewsArticle',
+                           'OpinionNewsArticle', 'BlogPosting', 'Report'])
+AUTHOR_META = ['author', 'article:author', 'og:article:author', 'parsely-author', 'byl']
+DATE_META = ['article:published_time', 'og:article:published_time', 'datePublished',
+             'date', 'pubdate', 'publish-date', 'dc.date', 'parsely-pub-date']
+
+
+def _clean(text):
+    return WHITESPACE.sub(' ', text or '').strip()
+
+
+def _json_ld_articles(blocks):
+    # Flatten JSON-LD blocks (objects, lists and @graph containers) into the
+    # article objects they describe
+    articles = []
+    pending = []
+    for block in blocks:
+        try:
+            pending.append(json.loads(block))
+        except ValueError:
+            continue
+    while pending:
+        item = pending.pop(0)
+        if isinstance(item, list):
+            pending.extend(item)
+        elif isinstance(item, dict):
+            if '@graph' in item:
+                pending.extend(item['@graph'] if isinstance(item['@graph'], list) else [item['@graph']])
+            types = item.get('@type')
+            types = types if isinstance(types, list) else [types]
+            if any(t in ARTICLE_TYPES for t in types) or 'headline' in item:
+                articles.append(item)
+    return articles
+
+
+def _json_ld_author(author):
+    authors = author if isinstance(author, list) else [author]
+    names = []
+    for entry in authors:
+        name = entry.get('name') if isinstance(entry, dict) else entry
+        if isinstance(name, str) and _clean(name):
+            names.append(_clean(name))
+    return ', '.join(names) or None
+
+
+def resolve(found):
+    """Pick title, author, date and content from what an extractor collected
+
+    ``found`` holds the raw candidates: ``json_ld`` script bodies, ``meta``
+    (lowercased name/property -> content), ``time_datetime``, ``h1``,
+    ``title``, ``byline``, ``dateline`` and the list of ``paragraphs``.
+    """
+    articles = _json_ld_articles(found['json_ld'])
+    meta = found['meta']
+
+    title = next((_clean(a['headline']) for a in articles
+                  if isinstance(a.get('headline'), str) and _clean(a['headline'])), None)
+    title = title or _clean(found['h1']) or _clean(meta.get('og:title')) or _clean(found['title'])
+
+    author = next((_json_ld_author(a['author']) for a in articles
+                   if a.get('author') and _json_ld_author(a['author'])), None)
+    if not author:
+        author = next((_clean(meta[key]) for key in AUTHOR_META
+                       if _clean(meta.get(key)) and not meta[key].startswith('http')), None)
+    author = author or _clean(found['byline'])
+
+    date = next((_clean(a['datePublished']) for a in articles
+                 if isinstance(a.get('datePublished'), str) and _clean(a['datePublished'])), None)
+    if not date:
+        date = next((_clean(meta[key]) for key in (k.lower() for k in DATE_META)
+                     if _clean(meta.get(key))), None)
+    date = date or _clean(found['time_datetime']) or _clean(found['dateline'])
+
+    # Paragraphs stay separated by a blank line for the sentiment timeline
+    paragraphs = (_clean(p) for p in found['paragraphs'])
+    return {
+        'title': title or '',
+        'author': author or "Unknown",
+        'date': date or "Unknown",
+        'content': '\n\n'.join(p for p in paragraphs if p),
+    }
+
+
+class _Collector:
+    """lxml parser target that gathers every candidate field in one pass"""
+
+    def __init__(self):
+        self.found = {'json_ld': [], 'meta': {}, 'time_datetime': None, 'h1': None,
+                      'title': None, 'byline': None, 'dateline': None, 'paragraphs': []}
+        self.stack = []        # per open element: its capture or None
+        self.open = []         # captures currently receiving text
+        self.boilerplate = 0   # depth inside script/style/nav/header/footer/aside
+        self.raw = 0           # depth inside script/style
+        self.order = 0
+        self.byline_order = self.dateline_order = None
+        self.article = 0       # depth inside <article>
+        self.article_start = 0
+        self.body_done = False
+
+    @property
+    def complete(self):
+        """True once the article body, a byline and a date have all been seen"""
+        found = self.found
+        meta = found['meta']
+        return (self.body_done
+                and bool(found['json_ld'] or found['byline']
+                         or any(key in meta for key in AUTHOR_META))
+                and bool(found['json_ld'] or found['time_datetime'] or found['dateline']
+                         or any(key.lower() in meta for key in DATE_META)))
+
+    def start(self, tag, attrib):
+        self.order += 1
+        if tag in BOILERPLATE_TAGS:
+            self.boilerplate += 1
+        if tag in RAW_TEXT_TAGS:
+            self.raw += 1
+        if tag == 'article':
+            self.article += 1
+            if self.article == 1:
+                self.article_start = len(self.found['paragraphs'])
+
+        kinds = []
+        if tag == 'p':
+            if not self.boilerplate and not self.body_done:
+                kinds.append('paragraph')
+        elif tag == 'meta':
+            key = attrib.get('property') or attrib.get('name') or attrib.get('itemprop')
+            if key and attrib.get('content'):
+                self.found['meta'].setdefault(key.lower(), attrib['content'])
+        elif tag == 'h1':
+            if self.found['h1'] is None:
+                kinds.append('h1')
+        elif tag == 'title':
+            if self.found['title'] is None:
+                kinds.append('title')
+        elif tag == 'script':
+            if attrib.get('type', '').lower() == 'application/ld+json':
+                kinds.append('json_ld')
+
+        if tag == 'time' and self.found['time_datetime'] is None and attrib.get('datetime'):
+            self.found['time_datetime'] = attrib['datetime']
+        css = attrib.get('class')
+        if css:
+            if tag in AUTHOR_TAGS and self.byline_order is None and AUTHOR_CLASS.search(css):
+                kinds.append('byline')
+            if tag in DATE_TAGS and self.dateline_order is None and DATE_CLASS.search(css):
+                kinds.append('dateline')
+
+        capture = None
+        if kinds:
+            capture = (kinds, self.order, [])
+            self.open.append(capture)
+        self.stack.append(capture)
+
+    def end(self, tag):
+        if tag in BOILERPLATE_TAGS:
+            self.boilerplate -= 1
+        if tag in RAW_TEXT_TAGS:
+            self.raw -= 1
+        if tag == 'article' and self.article:
+            self.article -= 1
+            paragraphs = self.found['paragraphs']
+            if not self.article and not self.body_done and len(paragraphs) > self.article_start:
+                # The first article with paragraphs is the body; drop any
+                # paragraphs collected before it and stop collecting
+                self.found['paragraphs'] = paragraphs[self.article_start:]
+                self.body_done = True
+        capture = self.stack.pop() if self.stack else None
+        if capture is None:
+            return
+        self.open.pop()
+        kinds, order, chunks = capture
+        text = ''.join(chunks)
+        for kind in kinds:
+            if kind == 'paragraph':
+                self.found['paragraphs'].append(text)
+            elif kind == 'json_ld':
+                self.found['json_ld'].append(text)
+            elif kind in ('h1', 'title'):
+                if self.found[kind] is None:
+                    self.found[kind] = text
+            elif text.strip():
+                # The first matching element in document order with any text,
+                # even when a nested match closes before it
+                order_attr = kind + '_order'
+                if getattr(self, order_attr) is None or order < getattr(self, order_attr):
+                    setattr(self, order_attr, order)
+                    self.found[kind] = text
+
+    def data(self, text):
+        for kinds, _, chunks in self.open:
+            if not self.raw or 'json_ld' in kinds:
+                chunks.append(text)
+
+    def close(self):
+        return self.found
+
+
+class LxmlExtractor:
+    """Single-pass extraction with lxml's HTML parser and a parser target"""
+
+    name = 'lxml'
+
+    def __init__(self):
+        from lxml import etree
+
+        self.etree = etree
+
+    def collector(self):
+        """A fresh (parser, collector) pair; feed() the parser and close() it"""
+        collector = _Collector()
+        return self.etree.HTMLParser(target=collector, remove_comments=True), collector
+
+    def extract(self, html):
+        parser, _ = self.collector()
+        parser.feed(html or ' ')
+        return resolve(parser.close())
+
+    def stream(self):
+        parser, collector = self.collector()
+        return _LxmlStream(parser, collector)
+
+
+class SoupExtractor:
+    """The original BeautifulSoup extraction, with the same metadata preferences"""
+
+    name = 'soup'
+
+    def __init__(self):
+        from bs4 import BeautifulSoup
+
+        self.BeautifulSoup = BeautifulSoup
+
+    def extract(self, html):
+        soup = self.BeautifulSoup(html, 'html.parser')
+
+        h1 = soup.find('h1')
+        time_tag = soup.find('time', datetime=True)
+        found = {
+            'json_ld': [script.string or '' for script in
+                        soup.find_all('script', type=re.compile(r'^application/ld\+json$', re.I))],
+            'meta': {},
+            'time_datetime': time_tag['datetime'] if time_tag else None,
+            'h1': h1.text if h1 else None,
+            'title': soup.title.string if soup.title else None,
+            'byline': self._first_text(soup, AUTHOR_TAGS, AUTHOR_CLASS),
+            'dateline': self._first_text(soup, DATE_TAGS, DATE_CLASS),
+        }
+        for tag in soup.find_all('meta', content=True):
+            key = tag.get('property') or tag.get('name') or tag.get('itemprop')
+            if key:
+                found['meta'].setdefault(key.lower(), tag['content'])
+
+        # Clean and extract main content
+        for tag in soup(list(BOILERPLATE_TAGS)):
+            tag.decompose()
+        article = next((a for a in soup.find_all('article') if a.find('p')), None)
+        found['paragraphs'] = [p.get_text() for p in (article or soup).find_all('p')]
+        return resolve(found)
+
+    def stream(self):
+        return _BufferedStream(self.extract)
+
+    @staticmethod
+    def _first_text(soup, tags, pattern):
+        for element in soup.find_all(list(tags), class_=pattern):
+            if element.text.strip():
+                return element.text.strip()
+        return None
+
+
+class _LxmlStream:
+    """Incremental extraction: feed() HTML pieces, then close() for the article"""
+
+    def __init__(self, parser, collector):
+        self.parser = parser
+        self.collector = collector
+
+    def feed(self, html):
+        """Parse another piece; returns True once nothing more is needed"""
+        self.parser.feed(html)
+        return self.collector.complete
+
+    def close(self):
+        if not self.collector.order:
+            self.parser.feed(' ')
+        return resolve(self.parser.close())
+
+
+class _BufferedStream:
+    """stream() for extractors that need the whole page before parsing"""
+
+    def __init__(self, extract):
+        self.extract = extract
+        self.parts = []
+
+    def feed(self, html):
+        self.parts.append(html)
+        return False
+
+    def close(self):
+        return self.extract(''.join(self.parts))
+
+
+EXTRACTORS = {
+    'lxml': LxmlExtractor,
+    'soup': SoupExtractor,
+}
+
+
+def get_extractor(name=None):
+    """Instantiate an extractor by name; the default is lxml when it is installed"""
+    if name is None:
+        try:
+            return LxmlExtractor()
+        except ImportError:
+            return SoupExtractor()
+    try:
+        return EXTRACTORS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown extractor: {name}") from None
@@ -0,0 +1,358 @@
+"""Concurrent article downloader with pooled sessions, timeouts and retries"""
+import codecs
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from itertools import chain
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_cache import OfflineCacheMiss
+
+DEFAULT_HEADERS = {'User-Agent': 'Mozilla/5.0'}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+MAX_BYTES = 5 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+SNIFF_BYTES = 4096
+TEXT_TYPES = ('text/', 'application/xhtml', 'application/xml', 'application/rss',
+              'application/atom')
+BINARY_SIGNATURES = (b'%PDF', b'\x89PNG', b'GIF8', b'\xff\xd8\xff', b'PK\x03\x04', b'\x1f\x8b',
+                     b'ID3', b'OggS', b'RIFF', b'\x00\x00\x01\x00', b'BM')
+BOMS = ((codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF16_LE, 'utf-16'),
+        (codecs.BOM_UTF16_BE, 'utf-16'))
+CHARSET_PARAM = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.I)
+META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?([\w.:-]+)', re.I)
+XML_ENCODING = re.compile(rb'^\s*<\?xml[^>]+encoding\s*=\s*["\']([\w.:-]+)')
+
+
+class UnsupportedContent(requests.RequestException):
+    """Raised when a response is not a text page, e.g. a PDF or an image"""
+
+
+def parse_content_type(value):
+    """Split a Content-Type header into (lowercased media type, charset or None)"""
+    mime, _, params = (value or '').partition(';')
+    charset = CHARSET_PARAM.search(params)
+    return mime.strip().lower(), charset.group(1) if charset else None
+
+
+def looks_binary(head):
+    """True for bodies that start like a known binary format or contain NUL bytes"""
+    if head.startswith(tuple(bom for bom, _ in BOMS)):
+        return False
+    return head.startswith(BINARY_SIGNATURES) or b'\x00' in head[:1024]
+
+
+def sniff_encoding(head, declared=None):
+    """Charset for a body: its BOM, the header's charset, an XML declaration or a <meta> tag
+
+    Falls back to UTF-8; undecodable bytes are replaced rather than
+    guessed at, which keeps decoding incremental.
+    """
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    meta = XML_ENCODING.match(head) or META_CHARSET.search(head)
+    for candidate in (declared, meta.group(1).decode('ascii') if meta else None):
+        if candidate:
+            try:
+                return codecs.lookup(candidate).name
+            except LookupError:
+                continue
+    return 'utf-8'
+
+
+class FetchResult:
+    """Outcome of downloading a single URL"""
+
+    def __init__(self, url, status=None, text=None, error=None, attempts=0, elapsed=0.0,
+                 from_cache=False, truncated=False, stopped=False, headers=None):
+        self.url = url
+        self.status = status
+        self.text = text
+        self.error = error
+        self.attempts = attempts
+        self.elapsed = elapsed
+        self.from_cache = from_cache
+        # Body cut off at max_bytes / download ended early at the sink's request
+        self.truncated = truncated
+        self.stopped = stopped
+        self.headers = headers or {}
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def bytes(self):
+        return len(self.text.encode('utf-8')) if self.text else 0
+
+    def __repr__(self):
+        return f"FetchResult({self.url!r}, status={self.status}, error={self.error!r})"
+
+
+class Fetcher:
+    """Download many URLs concurrently with bounded per-host parallelism
+
+    Bodies are streamed and never exceed ``max_bytes``; responses that
+    are not text pages are abandoned after the headers or the first few
+    kilobytes.
+    """
+
+    def __init__(self, max_workers=16, per_host=4, timeout=(5, 20), retries=3,
+                 backoff=0.5, headers=None, cache=None, max_bytes=MAX_BYTES):
+        self.cache = cache
+        self.max_bytes = max_bytes
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.headers = headers or DEFAULT_HEADERS
+        self._local = threading.local()
+        self._sessions = []
+        self._host_slots = {}
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def session(self):
+        """Return the keep-alive session owned by the calling thread"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.max_workers,
+                                  pool_maxsize=self.per_host)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update(self.headers)
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def _host_slot(self, url):
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.per_host)
+                self._host_slots[host] = slot
+        return slot
+
+    def _retry_delay(self, attempt, response=None):
+        if response is not None:
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                return min(float(retry_after), 60.0)
+        return self.backoff * (2 ** attempt)
+
+    @contextmanager
+    def _request(self, url, headers=None):
+        """GET with retries, yielding (response, attempts) while holding a host slot
+
+        The response is streamed, so the slot is held until the block that
+        reads the body ends; the response is then closed and the slot
+        released, on errors too. Backoff sleeps happen without a slot.
+        """
+        slot = self._host_slot(url)
+        attempt = 0
+        while True:
+            slot.acquire()
+            try:
+                response = self.session().get(url, headers=headers, timeout=self.timeout,
+                                              stream=True)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                slot.release()
+                if attempt >= self.retries:
+                    e.attempts = attempt + 1
+                    raise
+                time.sleep(self._retry_delay(attempt))
+            except BaseException:
+                slot.release()
+                raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                    break
+                response.close()
+                slot.release()
+                time.sleep(self._retry_delay(attempt, response))
+            attempt += 1
+        try:
+            yield response, attempt + 1
+        finally:
+            response.close()
+            slot.release()
+
+    def _read(self, response, url, sink=None, max_bytes=None):
+        # Returns (text, truncated, stopped). The body is decoded as it
+        # arrives; ``sink(text)`` sees every decoded chunk and may return
+        # True to end the download early.
+        max_bytes = max_bytes or self.max_bytes
+        try:
+            mime, declared = parse_content_type(response.headers.get('Content-Type'))
+            if mime and not mime.startswith(TEXT_TYPES):
+                raise UnsupportedContent(f"{url} is {mime}, not a text page", response=response)
+
+            chunks = response.iter_content(CHUNK_SIZE)
+            head = b''
+            for chunk in chunks:
+                head += chunk
+                if len(head) >= SNIFF_BYTES:
+                    break
+            if looks_binary(head):
+                raise UnsupportedContent(f"{url} does not look like a text page",
+                                         response=response)
+
+            decoder = codecs.getincrementaldecoder(sniff_encoding(head, declared))('replace')
+            parts = []
+            received = 0
+            truncated = stopped = satisfied = False
+            for chunk in chain([head], chunks):
+                if received + len(chunk) > max_bytes:
+                    chunk = chunk[:max_bytes - received]
+                    truncated = True
+                received += len(chunk)
+                text = decoder.decode(chunk, final=truncated)
+                parts.append(text)
+                if sink and text and sink(text):
+                    # A sink satisfied by the last chunk still got the whole page
+                    satisfied = True
+                    stopped = truncated or next(chunks, None) is not None
+                    break
+                if truncated:
+                    break
+            if not (truncated or stopped):
+                parts.append(decoder.decode(b'', final=True))
+                if sink and parts[-1] and not satisfied:
+                    sink(parts[-1])
+            return ''.join(parts), truncated, stopped
+        finally:
+            response.close()
+
+    def download(self, url, sink=None):
+        """Download one URL through the cache, raising on failure
+
+        With ``sink`` the text is also handed over chunk by chunk while it
+        downloads (a cached body arrives as one chunk); the download stops
+        as soon as ``sink`` returns True, and such a partial page is not
+        cached. A sink that returns True on the last chunk still leaves
+        a complete, cacheable page.
+        """
+        started = time.perf_counter()
+        entry = self.cache.get(url) if self.cache else None
+        if entry and (self.cache.offline or self.cache.is_fresh(entry)):
+            if sink:
+                sink(entry['body'])
+            return FetchResult(url, 200, entry['body'], elapsed=time.perf_counter() - started,
+                               from_cache=True)
+        if self.cache and self.cache.offline:
+            raise OfflineCacheMiss(f"{url} is not cached and offline mode is enabled")
+
+        headers = self.cache.validators(entry) if self.cache else None
+        with self._request(url, headers) as (response, attempts):
+            not_modified = response.status_code == 304 and entry
+            if not not_modified:
+                if response.status_code >= 400:
+                    response.raise_for_status()
+                text, truncated, stopped = self._read(response, url, sink)
+        if not_modified:
+            self.cache.revalidated(url)
+            if sink:
+                sink(entry['body'])
+            return FetchResult(url, 304, entry['body'], attempts=attempts,
+                               elapsed=time.perf_counter() - started, from_cache=True)
+        # Bodies cut at max_bytes or stopped by the sink are partial pages;
+        # caching them would serve them short to later full-page readers
+        if self.cache and not (truncated or stopped):
+            self.cache.store(url, response, text)
+        return FetchResult(url, response.status_code, text, attempts=attempts,
+                           elapsed=time.perf_counter() - started, truncated=truncated,
+                           stopped=stopped)
+
+    def poll(self, url, etag=None, last_modified=None, max_bytes=None):
+        """Conditional GET that bypasses the page cache, raising on failure
+
+        For callers that keep their own validators, such as feed polling.
+        A 304 Not Modified comes back with ``text`` None; other responses
+        carry their ETag / Last-Modified in ``headers``. ``max_bytes``
+        overrides the fetcher's article size cap, e.g. for sitemaps.
+        """
+        started = time.perf_counter()
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        with self._request(url, headers) as (response, attempts):
+            validators = {name: response.headers[name] for name in ('ETag', 'Last-Modified')
+                          if response.headers.get(name)}
+            if response.status_code == 304:
+                return FetchResult(url, 304, attempts=attempts,
+                                   elapsed=time.perf_counter() - started, headers=validators)
+            if response.status_code >= 400:
+                response.raise_for_status()
+            text, truncated, _ = self._read(response, url, max_bytes=max_bytes)
+        return FetchResult(url, response.status_code, text, attempts=attempts,
+                           elapsed=time.perf_counter() - started, truncated=truncated,
+                           headers=validators)
+
+    def fetch(self, url):
+        """Download one URL, capturing failures in the result instead of raising"""
+        started = time.perf_counter()
+        try:
+            return self.download(url)
+        except requests.RequestException as e:
+            status = e.response.status_code if e.response is not None else None
+            return FetchResult(url, status, error=str(e),
+                               attempts=getattr(e, 'attempts', 0),
+                               elapsed=time.perf_counter() - started)
+
+    def executor(self):
+        """Return the shared worker pool, creating it on first use"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='fetch')
+            return self._executor
+
+    def fetch_all(self, urls, progress=None):
+        """Yield a FetchResult for every URL as soon as it completes
+
+        At most ``max_workers * 2`` requests are queued at once so very
+        long URL lists are consumed lazily. ``progress(done, submitted)`` is
+        called after every completed download.
+        """
+        urls = iter(urls)
+        done_count = submitted = 0
+        pending = set()
+        executor = self.executor()
+        while True:
+            while len(pending) < self.max_workers * 2:
+                url = next(urls, None)
+                if url is None:
+                    break
+                pending.add(executor.submit(self.fetch, url))
+                submitted += 1
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                done_count += 1
+                if progress:
+                    progress(done_count, submitted)
+                yield future.result()
+
+    def close(self):
+        """Stop the worker pool and close every pooled session"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            sessions, self._sessions = self._sessions, []
+        if executor is not None:
+            executor.shutdown(wait=True)
+        for session in sessions:
+            session.close()
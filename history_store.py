@@ -0,0 +1,417 @@
+"""Indexed SQLite store for analyzed articles"""
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+from aggregates import CorpusAggregates
+from dedup import LshIndex, decode_signature
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT,
+    title TEXT,
+    author TEXT,
+    date TEXT,
+    published TEXT,
+    saved_at TEXT NOT NULL,
+    sentiment TEXT,
+    polarity REAL,
+    subjectivity REAL,
+    data TEXT NOT NULL,
+    cluster_id INTEGER,
+    url_key TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_articles_url ON articles(url);
+CREATE INDEX IF NOT EXISTS idx_articles_saved_at ON articles(saved_at);
+CREATE INDEX IF NOT EXISTS idx_articles_published ON articles(published);
+CREATE INDEX IF NOT EXISTS idx_articles_sentiment ON articles(sentiment, id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    title, summary, key_points, author,
+    tokenize = 'porter unicode61'
+);
+"""
+
+SENTIMENT_CATEGORIES = ["Very Positive", "Slightly Positive", "Neutral",
+                        "Slightly Negative", "Very Negative"]
+
+DATE_FORMATS = ['%Y-%m-%d', '%B %d, %Y', '%b %d, %Y', '%d %B %Y', '%d %b %Y',
+                '%b %d %Y', '%d/%m/%Y', '%m/%d/%Y']
+
+
+def parse_sentiment(text):
+    """Split the formatted sentiment string into (category, polarity, subjectivity)"""
+    category = re.search(r'Overall Sentiment:\s*(.+)', text or '')
+    polarity = re.search(r'Polarity Score:\s*(-?[\d.]+)', text or '')
+    subjectivity = re.search(r'Subjectivity Score:\s*(-?[\d.]+)', text or '')
+    return (category.group(1).strip() if category else None,
+            float(polarity.group(1)) if polarity else None,
+            float(subjectivity.group(1)) if subjectivity else None)
+
+
+def sentiment_fields(record):
+    """(category, polarity, subjectivity) for a record, old or new"""
+    scores = record.get('sentiment_scores')
+    if scores:
+        return scores['category'], scores['polarity'], scores['subjectivity']
+    return parse_sentiment(record.get('sentiment'))
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 query requiring every word
+
+    The last word is matched as a prefix so partially typed queries work.
+    """
+    terms = [f'"{term}"' for term in re.findall(r'\w+', text.lower())]
+    if terms:
+        terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def url_key(url):
+    """Normalized URL used to recognize an article saved under another form of its link"""
+    # http_cache imports requests, which the GUI only loads after its window is up
+    from http_cache import normalize_url
+
+    return normalize_url(url) if url else None
+
+
+def parse_published(date):
+    """Best-effort ISO date (YYYY-MM-DD) from a scraped date string"""
+    if not date or date == "Unknown":
+        return None
+    match = re.search(r'\d{4}-\d{2}-\d{2}', date)
+    if match:
+        return match.group(0)
+    cleaned = re.sub(r'(?i)^(published|updated)\s*:?\s*|,?\s+\d{1,2}:\d{2}.*$', '', date.strip())
+    cleaned = re.sub(r'(\d)(st|nd|rd|th)\b', r'\1', cleaned)
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(cleaned, fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+
+class HistoryStore:
+    """All analyzed articles in one SQLite file with URL, date and sentiment indexes
+
+    The full result dict is kept as JSON in ``data``; the indexed columns
+    are derived from it on insert. Records are addressed by their integer
+    id, which is also returned as ``record['id']``.
+
+    Results carrying a ``minhash`` signature are grouped with their near
+    duplicates: ``cluster_id`` is the id of the first article of the story.
+
+    ``aggregates`` (a CorpusAggregates) keeps corpus-wide statistics up to
+    date with every insert.
+    """
+
+    def __init__(self, path=os.path.join("saved_data", "history.sqlite")):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._db.create_function('url_key', 1, url_key, deterministic=True)
+        self._add_cluster_column()
+        self._add_url_key_column()
+        self.lsh = LshIndex(self._db, self._lock)
+        self.aggregates = CorpusAggregates(self._db, self._lock)
+        self._index_missing()
+        self._db.commit()
+
+    def _add_cluster_column(self):
+        # Stores created before duplicate clustering: every article is its own story
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(articles)")]
+        if 'cluster_id' not in columns:
+            self._db.execute("ALTER TABLE articles ADD COLUMN cluster_id INTEGER")
+            self._db.execute("UPDATE articles SET cluster_id = id")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_articles_cluster "
+                         "ON articles(cluster_id, id)")
+
+    def _add_url_key_column(self):
+        # Stores created before has_url() compared normalized links
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(articles)")]
+        if 'url_key' not in columns:
+            self._db.execute("ALTER TABLE articles ADD COLUMN url_key TEXT")
+            self._fill_url_keys()
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_articles_url_key ON articles(url_key)")
+
+    def _fill_url_keys(self):
+        self._db.execute("UPDATE articles SET url_key = url_key(url) "
+                         "WHERE url_key IS NULL AND url IS NOT NULL")
+
+    def _row_values(self, data, saved_at):
+        category, polarity, subjectivity = sentiment_fields(data)
+        record = {k: v for k, v in data.items() if k not in ('id', 'saved_at', 'cluster_id',
+                                                             'minhash')}
+        return (data.get('url'), data.get('title'), data.get('author'), data.get('date'),
+                parse_published(data.get('date')), saved_at, category, polarity,
+                subjectivity, json.dumps(record, ensure_ascii=False))
+
+    def add(self, data, saved_at=None):
+        """Insert an analysis result and return its id
+
+        A result with a ``minhash`` signature joins the cluster of its most
+        similar stored article, if any is similar enough.
+        """
+        saved_at = saved_at or datetime.now().isoformat(timespec='seconds')
+        signature = decode_signature(data['minhash']) if data.get('minhash') else None
+        with self._lock:
+            match = self.find_duplicate(signature) if signature is not None else None
+            cursor = self._db.execute(
+                """INSERT INTO articles (url, title, author, date, published, saved_at,
+                                         sentiment, polarity, subjectivity, data)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                self._row_values(data, saved_at))
+            article_id = cursor.lastrowid
+            self._db.execute(
+                "UPDATE articles SET cluster_id = ?, url_key = ? WHERE id = ?",
+                (self.cluster_of(match[0]) if match else article_id, url_key(data.get('url')),
+                 article_id))
+            self._index(article_id, data)
+            if signature is not None:
+                self.lsh.insert(article_id, signature)
+            self.aggregates.add(*self._aggregate_values(data, saved_at))
+            self._db.commit()
+            return article_id
+
+    def _aggregate_values(self, data, saved_at):
+        category, polarity, subjectivity = sentiment_fields(data)
+        return (data.get('url'), parse_published(data.get('date')), saved_at,
+                category, polarity, subjectivity, data.get('stats'))
+
+    def find_duplicate(self, signature):
+        """(id, estimated similarity) of the closest stored near duplicate, or None"""
+        matches = self.lsh.query(signature)
+        return matches[0] if matches else None
+
+    def cluster_of(self, article_id):
+        with self._lock:
+            row = self._db.execute("SELECT cluster_id FROM articles WHERE id = ?",
+                                   (article_id,)).fetchone()
+        return row[0] if row and row[0] is not None else article_id
+
+    def cluster_sizes(self, cluster_ids):
+        """Number of stored articles in each of the given clusters"""
+        cluster_ids = list(set(cluster_ids))
+        if not cluster_ids:
+            return {}
+        with self._lock:
+            return dict(self._db.execute(
+                f"SELECT cluster_id, COUNT(*) FROM articles WHERE cluster_id IN "
+                f"({','.join('?' * len(cluster_ids))}) GROUP BY cluster_id", cluster_ids))
+
+    def _index(self, article_id, data):
+        self._db.execute("INSERT INTO articles_fts (rowid, title, summary, key_points, author) "
+                         "VALUES (?, ?, ?, ?, ?)",
+                         (article_id, data.get('title'), data.get('summary'),
+                          data.get('key_points'), data.get('author')))
+
+    def _index_missing(self):
+        # Catch up the full-text index for rows stored before it existed
+        rows = self._db.execute("SELECT id, data FROM articles WHERE id > "
+                                "(SELECT IFNULL(MAX(rowid), 0) FROM articles_fts)").fetchall()
+        for article_id, data in rows:
+            self._index(article_id, json.loads(data))
+
+    def get(self, article_id):
+        """Return the full record for an id, or None"""
+        with self._lock:
+            row = self._db.execute("SELECT id, saved_at, data, cluster_id FROM articles "
+                                   "WHERE id = ?",
+                                   (article_id,)).fetchone()
+        return self._decode(row) if row else None
+
+    def find_by_url(self, url):
+        """Return the most recent record analyzed from a URL, or None"""
+        with self._lock:
+            row = self._db.execute("SELECT id, saved_at, data, cluster_id FROM articles "
+                                   "WHERE url = ? "
+                                   "ORDER BY id DESC LIMIT 1", (url,)).fetchone()
+        return self._decode(row) if row else None
+
+    def has_url(self, url):
+        """True when an article was saved under this URL or another form of it"""
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM articles WHERE url_key = ? LIMIT 1",
+                                    (url_key(url),)).fetchone() is not None
+
+    def _filters(self, query=None, sentiment=None, polarity=None, published_from=None,
+                 published_to=None, saved_from=None, saved_to=None, cluster=None, unique=False):
+        # Returns (FROM clause, id column, WHERE clauses, params). With a text
+        # query the full-text index drives the scan in rowid order so that
+        # ORDER BY id DESC LIMIT n stops after n matches.
+        source, id_column, clauses, params = "articles", "articles.id", [], []
+        if query and fts_query(query):
+            source = "articles_fts JOIN articles ON articles.id = articles_fts.rowid"
+            id_column = "articles_fts.rowid"
+            clauses.append("articles_fts MATCH ?")
+            params.append(fts_query(query))
+        if sentiment:
+            clauses.append("articles.sentiment = ?")
+            params.append(sentiment)
+        if polarity is not None:
+            low, high = polarity
+            if low is not None:
+                clauses.append("polarity >= ?")
+                params.append(low)
+            if high is not None:
+                clauses.append("polarity <= ?")
+                params.append(high)
+        if published_from:
+            clauses.append("published >= ?")
+            params.append(published_from)
+        if published_to:
+            clauses.append("published <= ?")
+            params.append(published_to)
+        if saved_from:
+            clauses.append("saved_at >= ?")
+            params.append(saved_from)
+        if saved_to:
+            # A bare date includes the whole day
+            clauses.append("saved_at <= ?")
+            params.append(saved_to + 'T23:59:59' if len(saved_to) == 10 else saved_to)
+        if cluster is not None:
+            clauses.append("articles.cluster_id = ?")
+            params.append(cluster)
+        if unique:
+            clauses.append("articles.cluster_id = articles.id")
+        return source, id_column, clauses, params
+
+    def count(self, **filters):
+        """Number of articles, optionally restricted by the search() filters"""
+        source, _, clauses, params = self._filters(**filters)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM {source}{where}",
+                                    params).fetchone()[0]
+
+    def search(self, query=None, sentiment=None, polarity=None, published_from=None,
+               published_to=None, saved_from=None, saved_to=None, cluster=None, unique=False,
+               before_id=None, limit=100):
+        """Full-text and faceted search returning (id, title, saved_at, cluster_id) rows
+
+        Rows come newest first. ``query`` matches title, summary, key
+        points and author; ``sentiment`` is a category name, ``polarity`` a
+        (min, max) tuple where either bound may be None, and the published
+        bounds are ISO dates, as are ``saved_from``/``saved_to`` for the
+        time the article was analyzed. ``cluster`` limits results to one
+        story's copies and ``unique`` to the first article of every story.
+        Results page by ``before_id`` like rows().
+        """
+        source, id_column, clauses, params = self._filters(query, sentiment, polarity,
+                                                           published_from, published_to,
+                                                           saved_from, saved_to, cluster, unique)
+        if before_id is not None:
+            clauses.append(f"{id_column} < ?")
+            params.append(before_id)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            return self._db.execute(
+                f"SELECT articles.id, articles.title, saved_at, articles.cluster_id "
+                f"FROM {source}{where} "
+                f"ORDER BY {id_column} DESC LIMIT ?", params + [limit]).fetchall()
+
+    def sentiment_facets(self, **filters):
+        """Article counts per sentiment category for the search() filters"""
+        filters.pop('sentiment', None)
+        source, _, clauses, params = self._filters(**filters)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            return dict(self._db.execute(f"SELECT articles.sentiment, COUNT(*) FROM {source}{where} "
+                                         f"GROUP BY articles.sentiment", params).fetchall())
+
+    def rows(self, before_id=None, limit=100):
+        """Return up to ``limit`` lightweight (id, title, saved_at, cluster_id) rows, newest first
+
+        Pages are addressed by the last id of the previous page (keyset
+        pagination), so fetching any page costs the same regardless of
+        how much history has accumulated.
+        """
+        return self.search(before_id=before_id, limit=limit)
+
+    def iter_records(self, chunk_size=500, **filters):
+        """Yield full records in id order, reading ``chunk_size`` rows at a time
+
+        Accepts the same filters as search(); only one chunk is held in
+        memory at once.
+        """
+        source, id_column, clauses, params = self._filters(**filters)
+        clauses.append(f"{id_column} > ?")
+        sql = (f"SELECT {id_column}, saved_at, data, articles.cluster_id FROM {source} "
+               f"WHERE {' AND '.join(clauses)} ORDER BY {id_column} LIMIT ?")
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._db.execute(sql, params + [last_id, chunk_size]).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._decode(row)
+            last_id = rows[-1][0]
+
+    def _decode(self, row):
+        record = json.loads(row[2])
+        record['id'] = row[0]
+        record['saved_at'] = row[1]
+        record['cluster_id'] = row[3]
+        return record
+
+    def migrate_json_folder(self, folder):
+        """Import legacy article_*.json files once; returns the number imported"""
+        with self._lock:
+            done = self._db.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone()
+        if done or not os.path.isdir(folder):
+            return 0
+
+        imported = 0
+        rows = []
+        records = []
+        for filename in sorted(os.listdir(folder)):
+            if not filename.endswith('.json'):
+                continue
+            path = os.path.join(folder, filename)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error loading history file {filename}: {str(e)}")
+                continue
+            match = re.search(r'(\d{8}_\d{6})', filename)
+            if match:
+                saved_at = datetime.strptime(match.group(1), '%Y%m%d_%H%M%S')
+            else:
+                saved_at = datetime.fromtimestamp(os.path.getmtime(path))
+            rows.append(self._row_values(data, saved_at.isoformat(timespec='seconds')))
+            records.append((data, saved_at.isoformat(timespec='seconds')))
+            imported += 1
+
+        with self._lock:
+            self._db.executemany(
+                """INSERT INTO articles (url, title, author, date, published, saved_at,
+                                         sentiment, polarity, subjectivity, data)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", rows)
+            self._db.execute("UPDATE articles SET cluster_id = id WHERE cluster_id IS NULL")
+            self._fill_url_keys()
+            self._index_missing()
+            self.aggregates.add_many([self._aggregate_values(data, saved_at)
+                                      for data, saved_at in records])
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)",
+                             (datetime.now().isoformat(timespec='seconds'),))
+            self._db.commit()
+        return imported
+
+    def close(self):
+        with self._lock:
+            self._db.close()
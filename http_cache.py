@@ -0,0 +1,170 @@
+"""On-disk HTTP response cache with conditional revalidation and LRU eviction"""
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+
+TRACKING_PARAMS = ('utm_', 'fbclid', 'gclid', 'mc_cid', 'mc_eid', 'ocid')
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+class OfflineCacheMiss(requests.RequestException):
+    """Raised in offline mode when a URL has never been cached"""
+
+
+def normalize_url(url):
+    """Canonical form of a URL used as the cache key
+
+    Lowercases scheme and host, drops default ports, fragments and
+    tracking parameters, and sorts the remaining query parameters.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not k.lower().startswith(TRACKING_PARAMS))
+    return urlunsplit((scheme, host, parts.path or '/', urlencode(query), ''))
+
+
+class HttpCache:
+    """Cache article HTML under saved_data/ keyed by normalized URL
+
+    Entries younger than ``ttl`` seconds are served without touching the
+    network; older ones are revalidated with If-None-Match /
+    If-Modified-Since. When the cache grows beyond ``max_bytes`` the least
+    recently used entries are evicted. In ``offline`` mode only cached
+    entries are served, regardless of age.
+    """
+
+    def __init__(self, folder=os.path.join("saved_data", "http_cache"), ttl=3600,
+                 max_bytes=200 * 1024 * 1024, offline=False):
+        self.folder = folder
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self._lock = threading.Lock()
+        self._sizes = None
+        self._total = 0
+        os.makedirs(folder, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha1(normalize_url(url).encode('utf-8')).hexdigest()
+        base = os.path.join(self.folder, key[:2], key)
+        return base + '.html', base + '.json'
+
+    def _load_sizes(self):
+        # Build the LRU bookkeeping once, on first use
+        if self._sizes is not None:
+            return
+        self._sizes = {}
+        for root, _, files in os.walk(self.folder):
+            for filename in files:
+                if filename.endswith('.html'):
+                    path = os.path.join(root, filename)
+                    self._sizes[path] = os.path.getsize(path)
+        self._total = sum(self._sizes.values())
+
+    def get(self, url):
+        """Return the cached entry for a URL, or None"""
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            with open(body_path, 'r', encoding='utf-8', newline='') as f:
+                entry['body'] = f.read()
+            # The body's mtime doubles as the last-access time for LRU eviction
+            os.utime(body_path)
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def is_fresh(self, entry):
+        return time.time() - entry['stored_at'] < self.ttl
+
+    def validators(self, entry):
+        """Conditional request headers for revalidating an entry"""
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url, response, body=None):
+        """Save a 200 response unless the server forbids caching
+
+        ``body`` is the already decoded text of a streamed response.
+        """
+        if 'no-store' in response.headers.get('Cache-Control', '').lower():
+            return
+        body_path, meta_path = self._paths(url)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        body = response.text if body is None else body
+        meta = {
+            'url': normalize_url(url),
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_type': response.headers.get('Content-Type'),
+            'stored_at': time.time(),
+        }
+        self._write(body_path, body)
+        self._write(meta_path, json.dumps(meta))
+
+        with self._lock:
+            self._load_sizes()
+            size = os.path.getsize(body_path)
+            self._total += size - self._sizes.get(body_path, 0)
+            self._sizes[body_path] = size
+        self._evict()
+
+    def revalidated(self, url):
+        """Mark an entry fresh again after a 304 Not Modified"""
+        _, meta_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return
+        meta['stored_at'] = time.time()
+        self._write(meta_path, json.dumps(meta))
+
+    def _write(self, path, text):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def _evict(self):
+        with self._lock:
+            if self._total <= self.max_bytes:
+                return
+            by_access = sorted(self._sizes, key=lambda p: os.path.getmtime(p)
+                               if os.path.exists(p) else 0)
+            for body_path in by_access:
+                if self._total <= self.max_bytes:
+                    break
+                self._total -= self._sizes.pop(body_path)
+                for path in (body_path, body_path[:-len('.html')] + '.json'):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+    def clear(self):
+        """Remove every cached entry"""
+        with self._lock:
+            self._load_sizes()
+            for body_path in list(self._sizes):
+                for path in (body_path, body_path[:-len('.html')] + '.json'):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+            self._sizes = {}
+            self._total = 0
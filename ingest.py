@@ -0,0 +1,480 @@
+"""Scheduled polling of RSS/Atom feeds and news sitemaps
+
+Every source is polled on its own schedule with a conditional GET, so
+an unchanged feed costs a 304 and no parsing. Article links are added to
+a persistent frontier in SQLite; links seen before, in the frontier or
+in the history store, are never queued again. Pending links are then
+fetched and analyzed in batches and saved to the history store.
+
+Usage:
+    python ingest.py add https://example.com/rss.xml [--interval 600]
+    python ingest.py list
+    python ingest.py run [--once]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import as_completed
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urljoin, urlsplit
+from xml.etree import ElementTree
+
+import requests
+
+from fetcher import Fetcher
+from history_store import HistoryStore
+from http_cache import HttpCache, normalize_url
+from pipeline import ArticleAnalyzer, iter_results
+from result_cache import ResultCache
+from scoring import SUMMARIZERS
+from sentiment import BACKENDS
+from topics import TopicModel
+
+DEFAULT_INTERVAL = 900         # seconds between polls of a source
+MIN_INTERVAL = 120
+MAX_INTERVAL = 6 * 3600
+MAX_AGE = 3 * 24 * 3600        # items published earlier than this are ignored
+MAX_ATTEMPTS = 3               # analysis attempts before a link is given up on
+DRAIN_BATCH = 64
+SOURCE_MAX_BYTES = 50 * 1024 * 1024  # the sitemap protocol's limit, well above any feed
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    url TEXT PRIMARY KEY,
+    kind TEXT,
+    interval REAL NOT NULL,
+    next_poll REAL NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    last_polled REAL,
+    last_status TEXT,
+    failures INTEGER NOT NULL DEFAULT 0,
+    parent TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_sources_next_poll ON sources(next_poll);
+CREATE TABLE IF NOT EXISTS frontier (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL UNIQUE,
+    url TEXT NOT NULL,
+    source TEXT,
+    title TEXT,
+    published TEXT,
+    discovered_at REAL NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    article_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_frontier_state ON frontier(state, id);
+"""
+
+
+def _local(tag):
+    # Element name without its XML namespace
+    return tag.rsplit('}', 1)[-1] if isinstance(tag, str) else ''
+
+
+def _child(element, name):
+    return next((c for c in element if _local(c.tag) == name), None)
+
+
+def _text(element, name):
+    child = _child(element, name)
+    return (child.text or '').strip() if child is not None else ''
+
+
+def parse_date(value):
+    """Aware datetime for RFC 822 (RSS) or ISO 8601 (Atom, sitemaps) dates, or None"""
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def parse_feed(text, base_url=''):
+    """Parse an RSS, RSS 1.0, Atom, sitemap or sitemap index document
+
+    Returns (kind, entries, ttl). Entries are dicts with ``url``, ``title``
+    and ``published`` (an aware datetime or None); for a sitemap index they
+    are the child sitemaps. ``ttl`` is the feed's own polling hint in
+    seconds, when it gives one.
+    """
+    root = ElementTree.fromstring(text.lstrip())
+    kind = {'rss': 'rss', 'RDF': 'rss', 'feed': 'atom', 'urlset': 'sitemap',
+            'sitemapindex': 'sitemapindex'}.get(_local(root.tag))
+    if kind is None:
+        raise ValueError(f"Not a feed or sitemap: <{_local(root.tag)}>")
+
+    entries = []
+    ttl = None
+    if kind == 'rss':
+        channel = _child(root, 'channel')
+        if channel is not None and _text(channel, 'ttl').isdigit():
+            ttl = int(_text(channel, 'ttl')) * 60
+        for item in root.iter():
+            if _local(item.tag) != 'item':
+                continue
+            link = _text(item, 'link')
+            guid = _child(item, 'guid')
+            if not link and guid is not None and guid.get('isPermaLink', 'true') != 'false':
+                link = (guid.text or '').strip()
+            entries.append({'url': link, 'title': _text(item, 'title'),
+                            'published': parse_date(_text(item, 'pubDate')
+                                                    or _text(item, 'date'))})
+    elif kind == 'atom':
+        for entry in root:
+            if _local(entry.tag) != 'entry':
+                continue
+            links = [c for c in entry if _local(c.tag) == 'link']
+            link = next((c.get('href') for c in links
+                         if c.get('rel', 'alternate') == 'alternate'), None)
+            entries.append({'url': (link or '').strip(), 'title': _text(entry, 'title'),
+                            'published': parse_date(_text(entry, 'published')
+                                                    or _text(entry, 'updated'))})
+    else:
+        for entry in root:
+            if _local(entry.tag) not in ('url', 'sitemap'):
+                continue
+            news = _child(entry, 'news')
+            published = _text(news, 'publication_date') if news is not None else ''
+            entries.append({'url': _text(entry, 'loc'),
+                            'title': _text(news, 'title') if news is not None else '',
+                            'published': parse_date(published or _text(entry, 'lastmod'))})
+
+    for entry in entries:
+        entry['url'] = urljoin(base_url, entry['url']) if entry['url'] else ''
+    return kind, [e for e in entries if urlsplit(e['url']).scheme in ('http', 'https')], ttl
+
+
+class Ingestor:
+    """Feed and sitemap sources plus the frontier of links waiting for analysis
+
+    ``analyzer`` is an ArticleAnalyzer whose fetcher also polls the
+    sources; ``store`` is the HistoryStore that analyzed articles are
+    saved to and that already-analyzed URLs are checked against.
+
+    Polling adapts to each source: the interval halves (down to
+    ``min_interval``) after a poll that found new links and grows by half
+    (up to ``max_interval``) after one that did not. Failed polls back off
+    exponentially. A sitemap index adds its recently modified child
+    sitemaps as sources of their own.
+    """
+
+    def __init__(self, store, analyzer, path=os.path.join("saved_data", "ingest.sqlite"),
+                 min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL, max_age=MAX_AGE):
+        self.store = store
+        self.analyzer = analyzer
+        self.path = path
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_age = max_age
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    def add_source(self, url, interval=DEFAULT_INTERVAL, parent=None):
+        """Start polling a feed or sitemap; returns False if it was already added"""
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO sources (url, interval, next_poll, parent) "
+                "VALUES (?, ?, ?, ?)", (url, float(interval), time.time(), parent))
+            self._db.commit()
+            return cursor.rowcount > 0
+
+    def remove_source(self, url):
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM sources WHERE url = ? OR parent = ?",
+                                      (url, url))
+            self._db.commit()
+            return cursor.rowcount > 0
+
+    def sources(self):
+        """Every source as a dict, soonest poll first"""
+        with self._lock:
+            cursor = self._db.execute("SELECT * FROM sources ORDER BY next_poll")
+            columns = [c[0] for c in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor]
+
+    def counts(self):
+        """Number of frontier links in each state"""
+        with self._lock:
+            return dict(self._db.execute("SELECT state, COUNT(*) FROM frontier GROUP BY state"))
+
+    def next_due(self):
+        """Time of the next scheduled poll, or None without sources"""
+        with self._lock:
+            row = self._db.execute("SELECT MIN(next_poll) FROM sources").fetchone()
+        return row[0]
+
+    def poll(self):
+        """Poll every source that is due and queue new links; returns how many were queued
+
+        Child sitemaps found in a sitemap index are due at once and are
+        polled in the same call.
+        """
+        fetcher = self.analyzer.fetcher
+        queued = 0
+        while True:
+            with self._lock:
+                due = self._db.execute(
+                    "SELECT url, interval, etag, last_modified, failures FROM sources "
+                    "WHERE next_poll <= ? ORDER BY next_poll", (time.time(),)).fetchall()
+            if not due:
+                return queued
+            executor = fetcher.executor()
+            futures = {executor.submit(fetcher.poll, url, etag, last_modified,
+                                       SOURCE_MAX_BYTES):
+                       (url, interval, failures)
+                       for url, interval, etag, last_modified, failures in due}
+            for future in as_completed(futures):
+                url, interval, failures = futures[future]
+                try:
+                    queued += self._handle(url, future.result(), interval)
+                except (requests.RequestException, ElementTree.ParseError, ValueError) as e:
+                    self._reschedule(url, interval, error=str(e), failures=failures + 1)
+
+    def _handle(self, url, result, interval):
+        if result.status == 304:
+            self._reschedule(url, min(interval * 1.5, self.max_interval), status='304',
+                             validators=result.headers)
+            return 0
+
+        kind, entries, ttl = parse_feed(result.text, url)
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.max_age)
+        entries = [e for e in entries if e['published'] is None or e['published'] >= cutoff]
+        if kind == 'sitemapindex':
+            children = sum(self.add_source(e['url'], interval, parent=url) for e in entries)
+            self._reschedule(url, interval, status=f"{result.status}, {children} new sitemaps",
+                             kind=kind, validators=result.headers)
+            return 0
+
+        added = self._enqueue(url, entries)
+
+        if added:
+            interval = max(interval / 2, self.min_interval)
+        else:
+            interval = min(interval * 1.5, self.max_interval)
+        if ttl:
+            interval = max(interval, min(ttl, self.max_interval))
+        self._reschedule(url, interval, status=f"{result.status}, {added} new", kind=kind,
+                         validators=result.headers)
+        return added
+
+    def _enqueue(self, source, entries):
+        # New links go to the frontier as pending, or as done when the
+        # history already has them; known links are left untouched
+        now = time.time()
+        added = 0
+        with self._lock:
+            for entry in entries:
+                cursor = self._db.execute(
+                    "INSERT OR IGNORE INTO frontier (key, url, source, title, published, "
+                    "discovered_at, state) VALUES (?, ?, ?, ?, ?, ?, 'pending')",
+                    (normalize_url(entry['url']), entry['url'], source, entry['title'],
+                     entry['published'].isoformat() if entry['published'] else None, now))
+                if not cursor.rowcount:
+                    continue
+                if self.store.has_url(entry['url']):
+                    self._db.execute("UPDATE frontier SET state = 'done' WHERE id = ?",
+                                     (cursor.lastrowid,))
+                else:
+                    added += 1
+            self._db.commit()
+        return added
+
+    def _reschedule(self, url, interval, status=None, error=None, failures=0, kind=None,
+                    validators=None):
+        now = time.time()
+        delay = interval
+        if error:
+            delay = min(interval * 2 ** failures, self.max_interval)
+        # A little jitter keeps sources added together from polling together
+        next_poll = now + delay * random.uniform(0.9, 1.1)
+        validators = validators or {}
+        with self._lock:
+            self._db.execute(
+                "UPDATE sources SET interval = ?, next_poll = ?, last_polled = ?, "
+                "last_status = ?, failures = ?, kind = COALESCE(?, kind), "
+                "etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) "
+                "WHERE url = ?",
+                (interval, next_poll, now, error or status, failures if error else 0, kind,
+                 validators.get('ETag'), validators.get('Last-Modified'), url))
+            self._db.commit()
+
+    def pending(self, limit=DRAIN_BATCH, after=0):
+        """(id, url) of links waiting for analysis, oldest discovery first"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT id, url FROM frontier WHERE state = 'pending' AND id > ? "
+                "ORDER BY id LIMIT ?", (after, limit)).fetchall()
+
+    def drain(self, limit=None, workers=1, callback=None):
+        """Fetch, analyze and save pending links; returns (processed, failed)
+
+        Links are taken ``DRAIN_BATCH`` at a time, each at most once per
+        call; one that fails stays pending for the next call until it has
+        failed ``MAX_ATTEMPTS`` times. ``callback(url, result, error)`` sees
+        every outcome after it has been recorded.
+        """
+        processed = failed = 0
+        after = 0
+        while limit is None or processed < limit:
+            batch = self.pending(DRAIN_BATCH if limit is None
+                                 else min(DRAIN_BATCH, limit - processed), after)
+            if not batch:
+                break
+            after = batch[-1][0]
+            ids = {url: link_id for link_id, url in batch}
+            for url, result, error in iter_results(list(ids), self.analyzer, workers=workers):
+                processed += 1
+                if error:
+                    failed += 1
+                    self._failed(ids[url], error)
+                else:
+                    article_id = self.store.add(result)
+                    self._finish(ids[url], 'done', article_id=article_id)
+                if callback:
+                    callback(url, result, error)
+        return processed, failed
+
+    def _finish(self, link_id, state, error=None, article_id=None):
+        with self._lock:
+            self._db.execute("UPDATE frontier SET state = ?, error = ?, article_id = ?, "
+                             "attempts = attempts + 1 WHERE id = ?",
+                             (state, error, article_id, link_id))
+            self._db.commit()
+
+    def _failed(self, link_id, error):
+        with self._lock:
+            self._db.execute(
+                "UPDATE frontier SET attempts = attempts + 1, error = ?, "
+                "state = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'pending' END "
+                "WHERE id = ?", (error, MAX_ATTEMPTS, link_id))
+            self._db.commit()
+
+    def run(self, stop=None, once=False, workers=1, callback=None):
+        """Poll and drain until ``stop`` (a threading.Event) is set
+
+        Sleeps until the next source is due between rounds. With ``once``
+        a single round is run: due sources are polled and every pending
+        link is analyzed.
+        """
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            self.poll()
+            self.drain(workers=workers, callback=callback)
+            if once:
+                break
+            next_due = self.next_due()
+            stop.wait(max(next_due - time.time(), 1.0) if next_due else self.min_interval)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Poll RSS/Atom feeds and news sitemaps and analyze new articles")
+    parser.add_argument('--db', default=os.path.join("saved_data", "ingest.sqlite"),
+                        help="sources and frontier database (default: saved_data/ingest.sqlite)")
+    parser.add_argument('--history', default=os.path.join("saved_data", "history.sqlite"),
+                        help="history database (default: saved_data/history.sqlite)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    add = commands.add_parser('add', help="add feed or sitemap URLs")
+    add.add_argument('urls', nargs='+')
+    add.add_argument('--interval', type=float, default=DEFAULT_INTERVAL,
+                     help=f"initial seconds between polls (default: {DEFAULT_INTERVAL})")
+    remove = commands.add_parser('remove', help="stop polling sources")
+    remove.add_argument('urls', nargs='+')
+    commands.add_parser('list', help="show sources and the frontier")
+
+    run = commands.add_parser('run', help="poll sources and analyze new articles")
+    run.add_argument('--once', action='store_true',
+                     help="poll what is due, analyze the frontier and exit")
+    run.add_argument('-j', '--processes', type=int, default=1,
+                     help="analysis worker processes (default: 1, 0 for all cores)")
+    run.add_argument('--max-age', type=float, default=MAX_AGE / 3600,
+                     help=f"ignore items published more than this many hours ago "
+                          f"(default: {MAX_AGE // 3600})")
+    run.add_argument('--sentiment', choices=sorted(BACKENDS), default='textblob',
+                     help="sentiment backend (default: textblob)")
+    run.add_argument('--summarizer', choices=SUMMARIZERS, default='keywords',
+                     help="summary method: keyword scoring or TextRank (default: keywords)")
+    run.add_argument('--no-topics', action='store_true', help="skip topic assignment")
+    run.add_argument('-q', '--quiet', action='store_true')
+    args = parser.parse_args(argv)
+
+    store = HistoryStore(args.history)
+    if args.command != 'run':
+        ingestor = Ingestor(store, None, args.db)
+        try:
+            if args.command == 'add':
+                for url in args.urls:
+                    if not ingestor.add_source(url, args.interval):
+                        print(f"Already polling {url}", file=sys.stderr)
+            elif args.command == 'remove':
+                for url in args.urls:
+                    if not ingestor.remove_source(url):
+                        print(f"Not a source: {url}", file=sys.stderr)
+            else:
+                for source in ingestor.sources():
+                    due = max(source['next_poll'] - time.time(), 0)
+                    print(f"{source['url']}  [{source['kind'] or '?'}] every "
+                          f"{source['interval'] / 60:.0f} min, next in {due / 60:.0f} min"
+                          f"{'  ' + source['last_status'] if source['last_status'] else ''}")
+                counts = ingestor.counts()
+                print(f"Frontier: {counts.get('pending', 0)} pending, {counts.get('done', 0)} "
+                      f"done, {counts.get('failed', 0)} failed")
+        finally:
+            ingestor.close()
+            store.close()
+        return 0
+
+    fetcher = Fetcher(cache=HttpCache(os.path.join("saved_data", "http_cache")))
+    result_cache = ResultCache(os.path.join("saved_data", "analysis_cache.sqlite"))
+    topics = None if args.no_topics else TopicModel()
+    analyzer = ArticleAnalyzer(fetcher, result_cache, args.sentiment, duplicates=store,
+                               on_duplicate='skip', topics=topics, summarizer=args.summarizer)
+    ingestor = Ingestor(store, analyzer, args.db, max_age=args.max_age * 3600)
+
+    def report(url, result, error):
+        if not args.quiet:
+            print(f"Error processing {url}: {error}" if error else f"Saved {result['title']}",
+                  file=sys.stderr)
+
+    stop = threading.Event()
+    try:
+        ingestor.run(stop, once=args.once, workers=args.processes or os.cpu_count() or 1,
+                     callback=report)
+    except KeyboardInterrupt:
+        stop.set()
+    finally:
+        ingestor.close()
+        fetcher.close()
+        result_cache.close()
+        if topics is not None:
+            topics.close()
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""Background jobs for the GUI: IDs, a bounded worker pool, cancellation and coalescing
+
+Work is submitted as ``func(job)`` and runs on one of a fixed number of
+threads. Each state or progress change is recorded and announced through
+``notify()``, which is called from the worker thread; the GUI uses it to
+wake its main loop and then reads the changed jobs with changes().
+
+Cancellation is cooperative: a queued job is dropped before it starts,
+and a running one raises JobCancelled at its next report(). Jobs given
+the same ``key`` while one is still queued or running are coalesced
+into that job, so a URL clicked twice is only fetched once.
+"""
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job that has been cancelled"""
+
+
+class Job:
+    """One unit of background work and its current state"""
+
+    def __init__(self, job_id, kind, label, key, on_change):
+        self.id = job_id
+        self.kind = kind
+        self.label = label
+        self.key = key
+        self.state = QUEUED
+        self.progress = 0
+        self.result = None
+        self.error = None
+        self.coalesced = 0      # later submissions answered by this job
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self._cancel = threading.Event()
+        self._on_change = on_change
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def elapsed(self):
+        """Seconds spent running so far, or in total once finished"""
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def check(self):
+        """Raise JobCancelled once the job has been cancelled"""
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def report(self, progress):
+        """Record progress (0-100) from inside the job; doubles as a cancellation point"""
+        self.check()
+        self.progress = progress
+        self._on_change(self)
+
+    def __repr__(self):
+        return f"Job({self.id}, {self.kind!r}, {self.state!r})"
+
+
+class JobScheduler:
+    """Run jobs on ``workers`` threads and track them by ID
+
+    The newest ``keep`` finished jobs are remembered, with their results,
+    for the jobs panel; older ones are forgotten.
+    """
+
+    def __init__(self, workers=2, notify=None, keep=200):
+        self.workers = workers
+        self.notify = notify
+        self.keep = keep
+        self.jobs = {}
+        self._lock = threading.RLock()
+        self._ids = itertools.count(1)
+        self._inflight = {}
+        self._futures = {}
+        self._changed = set()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+
+    def submit(self, kind, label, func, key=None):
+        """Queue ``func(job)`` and return (job, True)
+
+        With a ``key`` matching a queued or running job that job is
+        returned instead, as (job, False), and nothing new is queued.
+        """
+        with self._lock:
+            existing = self._inflight.get(key) if key is not None else None
+            if existing is not None:
+                existing.coalesced += 1
+                return existing, False
+            job = Job(next(self._ids), kind, label, key, self._mark)
+            self.jobs[job.id] = job
+            if key is not None:
+                self._inflight[key] = job
+            self._futures[job.id] = self._executor.submit(self._run, job, func)
+        self._mark(job)
+        return job, True
+
+    def _run(self, job, func):
+        with self._lock:
+            cancelled = job.cancelled
+            if not cancelled:
+                job.state = RUNNING
+                job.started = time.time()
+        if cancelled:
+            # Cancelled while queued, too late to drop it from the pool
+            self._finish(job, CANCELLED)
+            return
+        self._mark(job)
+        try:
+            job.result = func(job)
+            state = CANCELLED if job.cancelled else DONE
+        except JobCancelled:
+            state = CANCELLED
+        except Exception as e:
+            state, job.error = FAILED, str(e)
+        self._finish(job, state)
+
+    def _finish(self, job, state):
+        with self._lock:
+            job.state = state
+            job.finished = time.time()
+            if state == CANCELLED:
+                job.result = None
+            elif state == DONE:
+                job.progress = 100
+            if self._inflight.get(job.key) is job:
+                del self._inflight[job.key]
+            self._futures.pop(job.id, None)
+            self._forget_old()
+        self._mark(job)
+
+    def _forget_old(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.state in FINISHED]
+        for job_id in finished[:max(0, len(finished) - self.keep)]:
+            del self.jobs[job_id]
+
+    def _mark(self, job):
+        with self._lock:
+            self._changed.add(job.id)
+        if self.notify is not None:
+            self.notify()
+
+    def changes(self):
+        """Jobs changed since the last call, oldest first"""
+        with self._lock:
+            changed, self._changed = self._changed, set()
+            return [self.jobs[job_id] for job_id in sorted(changed) if job_id in self.jobs]
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def active(self, kinds=None):
+        """Number of queued or running jobs, optionally of the given kinds only"""
+        with self._lock:
+            return sum(1 for job in self.jobs.values() if job.state not in FINISHED
+                       and (kinds is None or job.kind in kinds))
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; returns False if it already finished"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.state in FINISHED:
+                return False
+            job._cancel.set()
+            # A new submission with the same key starts afresh from now on
+            if self._inflight.get(job.key) is job:
+                del self._inflight[job.key]
+            future = self._futures.get(job_id)
+            dropped = job.state == QUEUED and future is not None and future.cancel()
+        if dropped:
+            self._finish(job, CANCELLED)
+        else:
+            self._mark(job)
+        return True
+
+    def clear_finished(self):
+        """Forget all finished jobs and return their IDs"""
+        with self._lock:
+            finished = [job_id for job_id, job in self.jobs.items() if job.state in FINISHED]
+            for job_id in finished:
+                del self.jobs[job_id]
+        return finished
+
+    def shutdown(self):
+        """Cancel everything and stop the workers without waiting for running jobs"""
+        with self._lock:
+            pending = [job_id for job_id, job in self.jobs.items() if job.state not in FINISHED]
+        for job_id in pending:
+            self.cancel(job_id)
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,18 +1,23 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
-import requests
-from bs4 import BeautifulSoup
-import re
-from textblob import TextBlob
-import json
-from datetime import datetime
 from ttkthemes import ThemedTk
 import os
-import webbrowser
-from threading import Thread
-from queue import Queue
-import csv
-import queue 
+import time
+from threading import Event, Thread
+from aggregates import format_aggregates
+from history_store import HistoryStore, SENTIMENT_CATEGORIES
+from exporter import EXPORT_FORMATS, export_filename, export_history
+from jobs import CANCELLED, DONE, FAILED, FINISHED, JobScheduler
+from sentiment import format_timeline
+from metrics import format_timings
+from scoring import SUMMARIZERS
+from topics import format_entities, format_topic
+
+# The analysis stack (pipeline, requests, bs4/lxml, numpy, TextBlob) is
+# imported by _warm_up() in a background thread once the window is shown
+
+HISTORY_PAGE_SIZE = 100
+JOB_WORKERS = 3  # background jobs (downloads, exports, loading) running at once
 
 class ModernNewsSummarizer:
     def __init__(self):
@@ -39,17 +44,117 @@ class ModernNewsSummarizer:
         self.main_canvas.pack(side="left", fill="both", expand=True)
         
         # Initialize variables
-        self.history = []
+        self.history = []  # article ids on the visible history page
+        self.history_page_starts = []
+        self.history_filters = {}
         self.data_folder = "saved_data"
         self.ensure_data_folders()
-        self.queue = Queue()
+        self.store = HistoryStore(os.path.join(self.data_folder, "history.sqlite"))
+        self.analyzer = None
+        self.analyzer_error = None
+        self.analyzer_ready = Event()
+        self.history_loaded = Event()
+        
+        # Background work runs as jobs; finished jobs are handed to the
+        # callback registered for them, on the Tk thread
+        self.jobs_changed = Event()
+        self.scheduler = JobScheduler(JOB_WORKERS, notify=self.jobs_changed.set)
+        self.job_callbacks = {}
+        self.current_job = None  # the article shown in the progress bar
+        self.corpus_stats_job = None
+        self.closing = False
         
         self.create_styles()
         self.create_gui()
-        self.load_history()
         
         # Bind mousewheel scrolling
         self.window.bind("<MouseWheel>", self._on_mousewheel)
+        self.window.bind("<<JobsChanged>>", self._on_jobs_changed)
+        self.window.protocol("WM_DELETE_WINDOW", self._on_close)
+        Thread(target=self._forward_job_changes, daemon=True).start()
+        
+        # Heavy loading starts once the first frame is on screen
+        self.window.after(50, self._start_background_loading)
+        
+    def _start_background_loading(self):
+        self._load_analyzer()
+        self.load_history()
+        
+    def _load_analyzer(self):
+        self.analyzer_error = None
+        self.analyzer_ready.clear()
+        self._submit_job('startup', "Load analysis modules", self._warm_up,
+                         self._warm_up_finished, key='warm-up')
+        
+    def _warm_up_finished(self, job):
+        # A load cancelled before it started never reaches _warm_up; record
+        # that so waiting article jobs fail instead of hanging. The next
+        # Summarize starts loading again.
+        if not self.analyzer_ready.is_set():
+            self.analyzer_error = "loading was cancelled"
+            self.analyzer_ready.set()
+        
+    def _warm_up(self, job):
+        """Import the analysis modules and build the analyzer off the GUI thread"""
+        try:
+            from fetcher import Fetcher
+            from http_cache import HttpCache
+            from pipeline import ArticleAnalyzer
+            from result_cache import ResultCache
+            from topics import TopicModel
+            
+            analyzer = ArticleAnalyzer(
+                Fetcher(cache=HttpCache(os.path.join(self.data_folder, "http_cache"))),
+                ResultCache(os.path.join(self.data_folder, "analysis_cache.sqlite")),
+                duplicates=self.store, on_duplicate='skip',
+                topics=TopicModel(os.path.join(self.data_folder, "topics.sqlite")))
+            analyzer.warm_up()
+            self.analyzer = analyzer
+        except Exception as e:
+            self.analyzer_error = str(e)
+        finally:
+            self.analyzer_ready.set()
+        
+    def _forward_job_changes(self):
+        # Tk may only be called from this thread once the main loop runs,
+        # and never from the job workers, so one daemon thread turns the
+        # scheduler's notifications into <<JobsChanged>> events; several
+        # changes in a row collapse into one event
+        while True:
+            self.jobs_changed.wait()
+            self.jobs_changed.clear()
+            try:
+                self.window.event_generate("<<JobsChanged>>", when="tail")
+            except (RuntimeError, tk.TclError):
+                if self.closing:
+                    return
+                # The main loop has not started yet; try again shortly
+                self.jobs_changed.set()
+                time.sleep(0.1)
+
+    def _on_jobs_changed(self, event=None):
+        for job in self.scheduler.changes():
+            self._show_job(job)
+            if job.id == self.current_job:
+                self.progress['value'] = job.progress if job.state != CANCELLED else 0
+            if job.state in FINISHED:
+                callback = self.job_callbacks.pop(job.id, None)
+                if callback:
+                    callback(job)
+        busy = self.scheduler.active(kinds=('article', 'export'))
+        self.window.config(cursor="wait" if busy else "")
+
+    def _submit_job(self, kind, label, func, callback, key=None):
+        """Run func(job) in the background and callback(job) on the Tk thread when it ends"""
+        job, created = self.scheduler.submit(kind, label, func, key)
+        if created:
+            self.job_callbacks[job.id] = callback
+        return job, created
+
+    def _on_close(self):
+        self.closing = True
+        self.scheduler.shutdown()
+        self.window.destroy()
         
     def _on_mousewheel(self, event):
         self.main_canvas.yview_scroll(int(-1*(event.delta/120)), "units")
@@ -130,7 +235,7 @@ class ModernNewsSummarizer:
         buttons = [
             ("Summarize", self.summarize_article),
             ("Save", self.save_article),
-            ("Export CSV", self.export_to_csv),
+            ("Export", self.export_data),
             ("Clear", self.clear_all),
             ("Help", self.show_help)
         ]
@@ -141,6 +246,16 @@ class ModernNewsSummarizer:
                            style="Modern.TButton",
                            command=command)
             btn.pack(side="left", padx=5)
+        
+        self.export_format = ttk.Combobox(parent, state="readonly", width=8,
+                                          values=list(EXPORT_FORMATS))
+        self.export_format.current(0)
+        self.export_format.pack(side="left", padx=5)
+        
+        self.summarizer_choice = ttk.Combobox(parent, state="readonly", width=9,
+                                              values=list(SUMMARIZERS))
+        self.summarizer_choice.current(0)
+        self.summarizer_choice.pack(side="left", padx=5)
     
     def create_all_tabs(self):
         # Summary Tab
@@ -162,6 +277,11 @@ class ModernNewsSummarizer:
         stats_frame = ttk.Frame(self.notebook)
         self.notebook.add(stats_frame, text="Statistics")
         self.create_statistics_tab(stats_frame)
+        
+        # Jobs Tab
+        jobs_frame = ttk.Frame(self.notebook)
+        self.notebook.add(jobs_frame, text="Jobs")
+        self.create_jobs_tab(jobs_frame)
 
     def create_summary_tab(self, parent):
         self.create_text_widget(parent, "Title", "title_text", height=2)
@@ -172,10 +292,62 @@ class ModernNewsSummarizer:
 
     def create_analysis_tab(self, parent):
         self.create_text_widget(parent, "Key Points", "keypoints_text", height=8)
+        self.create_text_widget(parent, "Sentiment by Paragraph", "timeline_text", height=8)
         self.create_text_widget(parent, "Named Entities", "entities_text", height=5)
         self.create_text_widget(parent, "Topic Analysis", "topics_text", height=5)
 
     def create_history_tab(self, parent):
+        search_frame = ttk.Frame(parent)
+        search_frame.pack(fill="x", padx=10, pady=(10, 0))
+        
+        self.history_search_entry = ttk.Entry(search_frame, width=30, font=("Segoe UI", 12))
+        self.history_search_entry.pack(side="left")
+        self.history_search_entry.bind("<Return>", lambda e: self.search_history())
+        
+        self.history_sentiment_filter = ttk.Combobox(
+            search_frame, state="readonly", width=16,
+            values=["All Sentiments"] + SENTIMENT_CATEGORIES)
+        self.history_sentiment_filter.current(0)
+        self.history_sentiment_filter.pack(side="left", padx=5)
+        
+        filter_fields = [
+            ("Polarity", "history_polarity_min", 5),
+            ("to", "history_polarity_max", 5),
+            ("Published", "history_date_from", 11),
+            ("to", "history_date_to", 11),
+        ]
+        for label_text, attr_name, width in filter_fields:
+            ttk.Label(search_frame, text=label_text).pack(side="left", padx=(5, 2))
+            entry = ttk.Entry(search_frame, width=width)
+            entry.pack(side="left")
+            entry.bind("<Return>", lambda e: self.search_history())
+            setattr(self, attr_name, entry)
+        
+        ttk.Button(search_frame, text="Search",
+                   command=self.search_history).pack(side="left", padx=5)
+        ttk.Button(search_frame, text="Reset",
+                   command=self.reset_history_search).pack(side="left")
+        
+        nav_frame = ttk.Frame(parent)
+        nav_frame.pack(fill="x", padx=10, pady=(10, 0))
+        
+        self.history_prev_button = ttk.Button(nav_frame, text="< Newer",
+                                              command=self.show_newer_history)
+        self.history_prev_button.pack(side="left")
+        
+        self.history_next_button = ttk.Button(nav_frame, text="Older >",
+                                              command=self.show_older_history)
+        self.history_next_button.pack(side="left", padx=5)
+        
+        self.history_page_label = ttk.Label(nav_frame, text="")
+        self.history_page_label.pack(side="left", padx=10)
+        
+        ttk.Button(nav_frame, text="Same Story",
+                   command=self.show_same_story).pack(side="right")
+        self.history_unique = tk.BooleanVar(value=False)
+        ttk.Checkbutton(nav_frame, text="One per story", variable=self.history_unique,
+                        command=self.search_history).pack(side="right", padx=5)
+        
         self.history_list = tk.Listbox(parent,
                                      font=("Segoe UI", 12),
                                      bg="#ECF0F1",
@@ -188,6 +360,64 @@ class ModernNewsSummarizer:
         self.create_text_widget(parent, "Reading Statistics", "reading_stats_text", height=5)
         self.create_text_widget(parent, "Content Statistics", "content_stats_text", height=5)
         self.create_text_widget(parent, "Language Statistics", "language_stats_text", height=5)
+        self.create_text_widget(parent, "Corpus Statistics", "corpus_stats_text", height=14)
+
+    def create_jobs_tab(self, parent):
+        button_frame = ttk.Frame(parent)
+        button_frame.pack(fill="x", padx=10, pady=(10, 0))
+        
+        ttk.Button(button_frame, text="Cancel",
+                   command=self.cancel_selected_jobs).pack(side="left")
+        ttk.Button(button_frame, text="Clear Finished",
+                   command=self.clear_finished_jobs).pack(side="left", padx=5)
+        ttk.Label(button_frame,
+                  text="Double-click a finished article to show it").pack(side="left", padx=10)
+        
+        columns = ("kind", "item", "state", "progress", "time")
+        self.jobs_tree = ttk.Treeview(parent, columns=columns, show="headings", height=15)
+        for column, heading, width in (("kind", "Type", 80), ("item", "Item", 520),
+                                       ("state", "State", 90), ("progress", "Progress", 80),
+                                       ("time", "Time", 80)):
+            self.jobs_tree.heading(column, text=heading)
+            self.jobs_tree.column(column, width=width, stretch=(column == "item"))
+        self.jobs_tree.pack(fill="both", expand=True, padx=10, pady=10)
+        self.jobs_tree.bind("<Double-1>", self.show_job_result)
+
+    def _show_job(self, job):
+        state = "cancelling" if job.cancelled and job.state not in FINISHED else job.state
+        if job.coalesced:
+            state += f" (x{job.coalesced + 1})"
+        values = (job.kind, job.label, state, f"{job.progress}%",
+                  f"{job.elapsed:.1f}s" if job.started else "")
+        row = str(job.id)
+        if self.jobs_tree.exists(row):
+            self.jobs_tree.item(row, values=values)
+        else:
+            self.jobs_tree.insert("", 0, iid=row, values=values)
+        # Jobs the scheduler no longer remembers drop off the list
+        for row in self.jobs_tree.get_children():
+            if self.scheduler.get(int(row)) is None:
+                self.jobs_tree.delete(row)
+
+    def cancel_selected_jobs(self):
+        for row in self.jobs_tree.selection():
+            self.scheduler.cancel(int(row))
+
+    def clear_finished_jobs(self):
+        for job_id in self.scheduler.clear_finished():
+            if self.jobs_tree.exists(str(job_id)):
+                self.jobs_tree.delete(str(job_id))
+
+    def show_job_result(self, event=None):
+        """Show the article of a finished job picked in the Jobs tab"""
+        for row in self.jobs_tree.selection():
+            job = self.scheduler.get(int(row))
+            if job is not None and job.kind == 'article' and job.state == DONE:
+                self._update_gui_with_results(job.result, save=False)
+                self.url_entry.delete(0, tk.END)
+                self.url_entry.insert(0, job.label)
+                self.notebook.select(0)
+                return
 
     def create_text_widget(self, parent, label_text, attr_name, height):
         frame = ttk.Frame(parent)
@@ -208,183 +438,50 @@ class ModernNewsSummarizer:
         
         setattr(self, attr_name, text_widget)
 
-    def extract_author_date(self, soup):
-        # Try to find author
-        author = None
-        author_elements = soup.find_all(['a', 'span', 'div'], 
-                                      class_=re.compile(r'author|byline', re.I))
-        for element in author_elements:
-            if element.text.strip():
-                author = element.text.strip()
-                break
-        
-        # Try to find date
-        date = None
-        date_elements = soup.find_all(['time', 'span', 'div'], 
-                                    class_=re.compile(r'date|time|published', re.I))
-        for element in date_elements:
-            if element.text.strip():
-                date = element.text.strip()
-                break
-        
-        return author or "Unknown", date or "Unknown"
-
-    def analyze_sentiment(self, text):
-        analysis = TextBlob(text)
-        polarity = analysis.sentiment.polarity
-        subjectivity = analysis.sentiment.subjectivity
-        
-        # Determine sentiment category
-        if polarity > 0.3:
-            sentiment = "Very Positive"
-        elif polarity > 0:
-            sentiment = "Slightly Positive"
-        elif polarity < -0.3:
-            sentiment = "Very Negative"
-        elif polarity < 0:
-            sentiment = "Slightly Negative"
-        else:
-            sentiment = "Neutral"
-        
-        return (f"Overall Sentiment: {sentiment}\n"
-                f"Polarity Score: {polarity:.2f} (-1 to 1)\n"
-                f"Subjectivity Score: {subjectivity:.2f} (0 to 1)")
-
-    def extract_key_points(self, text):
-        # Extract sentences with important indicators
-        sentences = text.split('.')
-        indicators = ['most important', 'significant', 'crucial', 'key', 'major', 
-                     'essential', 'fundamental', 'primary']
-        
-        scored_sentences = []
-        for sentence in sentences:
-            score = 0
-            for indicator in indicators:
-                if indicator in sentence.lower():
-                    score += 1
-            if score > 0:
-                scored_sentences.append((score, sentence.strip()))
-        
-        scored_sentences.sort(reverse=True)
-        key_points = [s[1] for s in scored_sentences[:5]]
-        
-        return "• " + "\n• ".join(key_points) if key_points else "No key points identified."
-
-    def generate_statistics(self, text):
-        words = text.split()
-        sentences = text.split('.')
-        paragraphs = text.split('\n\n')
-        
-        # Basic stats
-        stats = {
-            'word_count': len(words),
-            'sentence_count': len(sentences),
-            'paragraph_count': len(paragraphs),
-            'avg_words_per_sentence': len(words) / max(len(sentences), 1),
-            'avg_sentences_per_paragraph': len(sentences) / max(len(paragraphs), 1),
-            'reading_time': len(words) / 200  # Average reading speed of 200 wpm
-        }
-        
-        return stats
-
     def summarize_article(self):
-        try:
-            url = self.url_entry.get()
-            if not url:
-                messagebox.showerror("Error", "Please enter a URL")
-                return
-            
-            # Show loading state
-            self.progress['value'] = 0
-            self.window.config(cursor="wait")
-            self.window.update()
-            
-            # Start processing in a thread
-            thread = Thread(target=self._process_article, args=(url,))
-            thread.start()
-            
-            # Check queue periodically
-            self.window.after(100, self._check_processing_queue)
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to process article: {str(e)}")
-            self.window.config(cursor="")
+        """Analyze the entered URL as a background job
 
-    def _process_article(self, url):
-        try:
-            # Fetch and parse webpage
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            
-            self.queue.put(('progress', 20))
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Extract content
-            title = soup.find('h1').text if soup.find('h1') else soup.title.string
-            author, date = self.extract_author_date(soup)
-            
-            self.queue.put(('progress', 40))
-            
-            # Clean and extract main content
-            for tag in soup(['script', 'style', 'nav', 'header', 'footer', 'aside']):
-                tag.decompose()
-            
-            paragraphs = soup.find_all('p')
-            content = ' '.join(p.get_text() for p in paragraphs)
-            content = re.sub(r'\s+', ' ', content).strip()
-            
-            self.queue.put(('progress', 60))
-            
-            # Analyze content
-            summary = self.get_important_sentences(content)
-            sentiment = self.analyze_sentiment(content)
-            key_points = self.extract_key_points(content)
-            stats = self.generate_statistics(content)
-            
-            self.queue.put(('progress', 80))
-            
-            # Save results
-            result = {
-                'title': title,
-                'author': author,
-                'date': date,
-                'summary': summary,
-                'sentiment': sentiment,
-                'key_points': key_points,
-                'stats': stats,
-                'url': url
-            }
-            
-            self.queue.put(('result', result))
-            self.queue.put(('progress', 100))
-            
-        except Exception as e:
-            self.queue.put(('error', str(e)))
+        Clicking again while the same URL is queued or running follows
+        the existing job instead of fetching the page a second time.
+        """
+        url = self.url_entry.get().strip()
+        if not url:
+            messagebox.showerror("Error", "Please enter a URL")
+            return
+        
+        if self.analyzer_ready.is_set() and self.analyzer is None:
+            self._load_analyzer()
+        
+        summarizer = self.summarizer_choice.get()
+        job, _ = self._submit_job('article', url,
+                                  lambda job: self._process_article(job, url, summarizer),
+                                  self._article_finished, key=('article', url, summarizer))
+        self.current_job = job.id
+        self.progress['value'] = job.progress
+        self.window.config(cursor="wait")
 
+    def _process_article(self, job, url, summarizer):
+        # Waits in steps so the job can be cancelled while the modules load
+        while not self.analyzer_ready.wait(0.25):
+            job.check()
+        job.check()
+        if self.analyzer is None:
+            raise RuntimeError(f"The analysis modules failed to load: {self.analyzer_error}")
+        # Reporting progress is also where a cancelled job stops
+        return self.analyzer.with_summarizer(summarizer).process_url(url, progress=job.report)
 
-    def _check_processing_queue(self):
-        try:
-            while True:
-                msg_type, data = self.queue.get_nowait()
-                
-                if msg_type == 'progress':
-                    self.progress['value'] = data
-                elif msg_type == 'result':
-                    self._update_gui_with_results(data)
-                elif msg_type == 'error':
-                    messagebox.showerror("Error", f"Failed to process article: {data}")
-                    self.window.config(cursor="")
-                    return
-                
-        except queue.Empty:
-            if self.progress['value'] != 100:
-                self.window.after(100, self._check_processing_queue)
+    def _article_finished(self, job):
+        # Only the article asked for last replaces what is on screen;
+        # earlier ones that finish later just go to the history
+        if job.state == DONE:
+            if job.id == self.current_job:
+                self._update_gui_with_results(job.result)
             else:
-                self.window.config(cursor="")
+                self.add_to_history(job.result)
+        elif job.state == FAILED and job.id == self.current_job:
+            messagebox.showerror("Error", f"Failed to process article: {job.error}")
 
-    def _update_gui_with_results(self, data):
+    def _update_gui_with_results(self, data, save=True):
         # Clear existing content
         self.clear_all()
         
@@ -397,6 +494,10 @@ class ModernNewsSummarizer:
         
         # Update Analysis tab
         self.keypoints_text.insert("1.0", data['key_points'])
+        if data.get('sentiment_timeline'):
+            self.timeline_text.insert("1.0", format_timeline(data['sentiment_timeline']))
+        self.entities_text.insert("1.0", format_entities(data.get('entities')))
+        self.topics_text.insert("1.0", format_topic(data))
         
         # Update Statistics tab
         stats = data['stats']
@@ -405,48 +506,66 @@ class ModernNewsSummarizer:
         
         content_stats = (f"Sentence Count: {stats['sentence_count']}\n"
                         f"Paragraph Count: {stats['paragraph_count']}\n"
-                        f"Average Words per Sentence: {stats['avg_words_per_sentence']:.1f}")
+                        f"Average Words per Sentence: {stats['avg_words_per_sentence']:.1f}\n"
+                        f"{format_timings(data.get('timings'))}")
         
         self.reading_stats_text.insert("1.0", reading_stats)
         self.content_stats_text.insert("1.0", content_stats)
+        self.language_stats_text.insert("1.0", self._language_stats(stats))
         
         # Add to history
-        self.add_to_history(data)
+        if save:
+            self.add_to_history(data)
+            if data.get('duplicate_of'):
+                messagebox.showinfo(
+                    "Near Duplicate",
+                    f"This article was flagged as a near duplicate of a story already in "
+                    f"the history ({data['duplicate_similarity']:.0%} similar).\n"
+                    f"Use \"Same Story\" in the History tab to see every copy.")
+        else:
+            self.refresh_corpus_stats(stats['word_count'])
 
-    def get_important_sentences(self, text, num_sentences=5):
-        sentences = re.split(r'[.!?]+', text)
-        sentences = [s.strip() for s in sentences if len(s.strip()) > 20]
-        
-        scored_sentences = []
-        for sentence in sentences:
-            # Base score is word count (longer sentences often more important)
-            score = len(sentence.split()) * 0.1
-            
-            # Boost score for sentences with numbers
-            if re.search(r'\d+', sentence):
-                score += 2
-                
-            # Boost score for sentences with quotes
-            if '"' in sentence or '"' in sentence:
-                score += 2
-                
-            # Boost score for sentences with important keywords
-            keywords = ['important', 'significant', 'crucial', 'findings', 'results', 
-                       'concluded', 'research', 'study', 'analysis', 'report']
-            for keyword in keywords:
-                if keyword in sentence.lower():
-                    score += 1.5
-            
-            scored_sentences.append((score, sentence))
+    def _language_stats(self, stats):
+        # Articles saved before these were computed lack them
+        lines = []
+        if 'unique_words' in stats:
+            lines.append(f"Unique Words: {stats['unique_words']} "
+                         f"(lexical diversity {stats['lexical_diversity']:.2f})")
+            lines.append(f"Average Word Length: {stats['avg_word_length']:.1f} characters")
+        return '\n'.join(lines) or "Not recorded for this article"
+
+    def refresh_corpus_stats(self, word_count=None):
+        """Recompute the Statistics tab's corpus summary in the background
         
-        scored_sentences.sort(reverse=True)
-        return "\n\n".join(s[1] for s in scored_sentences[:num_sentences])
+        With a ``word_count`` the current article is also ranked by length
+        against the history.
+        """
+        def compute(job):
+            summary = self.store.aggregates.summary()
+            rank = (self.store.aggregates.percentile_rank('word_count', word_count)
+                    if word_count is not None else None)
+            return summary, rank
+        
+        job, _ = self._submit_job('stats', "Corpus statistics", compute,
+                                  self._corpus_stats_done)
+        self.corpus_stats_job = job.id
+
+    def _corpus_stats_done(self, job):
+        # An older refresh finishing late must not overwrite a newer one
+        if job.state != DONE or job.id != self.corpus_stats_job:
+            return
+        summary, rank = job.result
+        self.corpus_stats_text.delete("1.0", tk.END)
+        self.corpus_stats_text.insert("1.0", format_aggregates(summary))
+        if rank is not None:
+            self.language_stats_text.insert(tk.END, f"\nLonger than {rank:.0%} of the "
+                                                    f"articles in your history")
 
     def clear_all(self):
         """Clear all text widgets"""
         text_widgets = [
             'title_text', 'author_text', 'date_text', 'summary_text',
-            'sentiment_text', 'keypoints_text', 'entities_text', 'topics_text',
+            'sentiment_text', 'keypoints_text', 'timeline_text', 'entities_text', 'topics_text',
             'reading_stats_text', 'content_stats_text', 'language_stats_text'
         ]
         
@@ -459,72 +578,162 @@ class ModernNewsSummarizer:
 
     def add_to_history(self, data):
         """Add analyzed article to history"""
-        self.history.append(data)
-        self.history_list.insert(tk.END, data['title'])
-        
-        # Save to file
-        history_file = os.path.join(self.data_folder, "articles", 
-                                  f"article_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
-        
-        with open(history_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        self.store.add(data)
+        if not self.history_page_starts:
+            self.show_history_page()
+        self.refresh_corpus_stats(data['stats']['word_count'])
 
     def load_history(self):
-        """Load history from saved files"""
-        history_dir = os.path.join(self.data_folder, "articles")
-        if not os.path.exists(history_dir):
-            return
+        """Load the newest page of history titles in the background"""
+        self.history_page_starts = []
+        self.history_page_label.config(text="Loading history...")
+        filters = dict(self.history_filters)
+        
+        def load(job):
+            self.store.migrate_json_folder(os.path.join(self.data_folder, "articles"))
+            return self._query_history_page(None, filters)
+        
+        self._submit_job('history', "Load history", load, self._history_loaded,
+                         key='history-load')
+        
+    def _history_loaded(self, job):
+        if job.state == DONE:
+            # Searches started while loading take precedence
+            if not self.history_loaded.is_set():
+                self._render_history_page(None, *job.result)
+            self.history_loaded.set()
+            self.refresh_corpus_stats()
+        elif job.state == FAILED:
+            self.history_loaded.set()
+            self.history_page_label.config(text="History unavailable")
+            messagebox.showerror("Error", f"Failed to load history: {job.error}")
+
+    def search_history(self):
+        """Filter the History tab by the search box and facet fields"""
+        try:
+            def number(entry):
+                value = entry.get().strip()
+                return float(value) if value else None
             
-        for filename in os.listdir(history_dir):
-            if filename.endswith('.json'):
-                try:
-                    with open(os.path.join(history_dir, filename), 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        self.history.append(data)
-                        self.history_list.insert(tk.END, data['title'])
-                except Exception as e:
-                    print(f"Error loading history file {filename}: {str(e)}")
+            polarity = (number(self.history_polarity_min), number(self.history_polarity_max))
+        except ValueError:
+            messagebox.showerror("Error", "Polarity bounds must be numbers between -1 and 1")
+            return
+        
+        sentiment = self.history_sentiment_filter.get()
+        self.history_filters = {
+            'query': self.history_search_entry.get().strip() or None,
+            'sentiment': sentiment if sentiment in SENTIMENT_CATEGORIES else None,
+            'polarity': polarity if polarity != (None, None) else None,
+            'published_from': self.history_date_from.get().strip() or None,
+            'published_to': self.history_date_to.get().strip() or None,
+            'unique': self.history_unique.get(),
+        }
+        self.history_page_starts = []
+        self.show_history_page()
+
+    def show_same_story(self):
+        """List every stored copy of the selected article's story"""
+        selection = self.history_list.curselection()
+        if not selection:
+            messagebox.showinfo("Same Story", "Select an article in the history first")
+            return
+        cluster = self.store.cluster_of(self.history[selection[0]])
+        self.history_filters = {'cluster': cluster}
+        self.history_page_starts = []
+        self.show_history_page()
+
+    def reset_history_search(self):
+        for entry in (self.history_search_entry, self.history_polarity_min,
+                      self.history_polarity_max, self.history_date_from, self.history_date_to):
+            entry.delete(0, tk.END)
+        self.history_sentiment_filter.current(0)
+        self.history_unique.set(False)
+        self.history_filters = {}
+        self.history_page_starts = []
+        self.show_history_page()
+
+    def show_history_page(self, before_id=None):
+        """Show one page of history rows; full records are loaded on selection"""
+        self.history_loaded.set()
+        self._render_history_page(before_id,
+                                  *self._query_history_page(before_id, self.history_filters))
+        
+    def _query_history_page(self, before_id, filters):
+        # (rows, cluster sizes, total); safe to call from any thread
+        rows = self.store.search(before_id=before_id, limit=HISTORY_PAGE_SIZE, **filters)
+        sizes = self.store.cluster_sizes(row[3] for row in rows)
+        return rows, sizes, self.store.count(**filters)
+        
+    def _render_history_page(self, before_id, rows, sizes, total):
+        self.history = [row[0] for row in rows]
+        self.history_before_id = before_id
+        
+        self.history_list.delete(0, tk.END)
+        for article_id, title, saved_at, cluster_id in rows:
+            copies = sizes.get(cluster_id, 1)
+            suffix = f"  [{copies} copies]" if copies > 1 else ""
+            self.history_list.insert(tk.END, f"{saved_at[:10]}  {title}{suffix}")
+        
+        page = len(self.history_page_starts) + 1
+        pages = max(1, -(-total // HISTORY_PAGE_SIZE))
+        self.history_page_label.config(text=f"Page {page} of {pages} ({total} articles)")
+        self.history_prev_button.state(["!disabled" if self.history_page_starts else "disabled"])
+        self.history_next_button.state(["!disabled" if page < pages else "disabled"])
+
+    def show_older_history(self):
+        if len(self.history) == HISTORY_PAGE_SIZE:
+            self.history_page_starts.append(self.history_before_id)
+            self.show_history_page(self.history[-1])
+
+    def show_newer_history(self):
+        if self.history_page_starts:
+            self.show_history_page(self.history_page_starts.pop())
 
     def load_from_history(self, event):
         """Load article from history when selected"""
         selection = self.history_list.curselection()
         if selection:
             index = selection[0]
-            data = self.history[index]
-            self._update_gui_with_results(data)
+            data = self.store.get(self.history[index])
+            self._update_gui_with_results(data, save=False)
             self.url_entry.delete(0, tk.END)
             self.url_entry.insert(0, data['url'])
 
-    def export_to_csv(self):
-        """Export analyzed articles to CSV"""
+    def export_data(self):
+        """Export the articles matching the History tab filters in the background"""
+        fmt = self.export_format.get()
+        filepath = export_filename(os.path.join(self.data_folder, "exports"), fmt)
+        filters = dict(self.history_filters)
+        
+        job, _ = self._submit_job(
+            'export', os.path.basename(filepath),
+            lambda job: self._export_history(job, filepath, fmt, filters), self._export_finished)
+        self.current_job = job.id
+        self.progress['value'] = 0
+        self.window.config(cursor="wait")
+
+    def _export_history(self, job, filepath, fmt, filters):
+        def report(done, total):
+            job.report(min(99, done * 100 // max(total, 1)))
+        
         try:
-            filepath = os.path.join(self.data_folder, "exports", 
-                                  f"news_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
-            
-            with open(filepath, 'w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow(['Title', 'URL', 'Author', 'Date', 'Summary', 
-                               'Sentiment', 'Key Points', 'Word Count', 'Reading Time'])
-                
-                for article in self.history:
-                    writer.writerow([
-                        article['title'],
-                        article['url'],
-                        article['author'],
-                        article['date'],
-                        article['summary'][:500],  # First 500 chars of summary
-                        article['sentiment'].split('\n')[0],  # Overall sentiment only
-                        article['key_points'][:500],  # First 500 chars of key points
-                        article['stats']['word_count'],
-                        f"{article['stats']['reading_time']:.1f} min"
-                    ])
-            
+            export_history(self.store, filepath, fmt, progress=report, **filters)
+        except BaseException:
+            # No half-written export is left behind, cancelled or not
+            if os.path.exists(filepath):
+                os.remove(filepath)
+            raise
+        return filepath
+
+    def _export_finished(self, job):
+        if job.state == DONE:
             messagebox.showinfo("Success", 
-                              f"Data exported to {filepath}\nOpening folder location...")
-            webbrowser.open(os.path.dirname(filepath))
-            
-        except Exception as e:
-            messagebox.showerror("Export Error", f"Failed to export data: {str(e)}")
+                              f"Data exported to {job.result}\nOpening folder location...")
+            import webbrowser
+            webbrowser.open(os.path.dirname(job.result))
+        elif job.state == FAILED:
+            messagebox.showerror("Export Error", f"Failed to export data: {job.error}")
 
     def save_article(self):
         """Save current article explicitly"""
@@ -568,14 +777,31 @@ class ModernNewsSummarizer:
            - Article summarization
            - Sentiment analysis
            - Key points extraction
-           - Reading statistics
-           - Export to CSV
+           - Named entities, keywords and topics
+           - Reading statistics, and corpus statistics over the whole
+             history (articles per day, sources, sentiment, percentiles)
+           - Export to CSV, JSON lines, Parquet or Arrow
            - Article history
         
         3. Tips:
            - Save important articles for later reference
            - Use the history tab to access previous analyses
            - Export data for further analysis in spreadsheets
+           - The box after the export format picks the summary method:
+             "keywords" favours long sentences with numbers, quotes and
+             report words; "textrank" picks the sentences most similar
+             to the rest of the article
+           - Copies of the same story share one analysis; tick "One per
+             story" or use "Same Story" in the History tab to group them
+           - Exports include only the articles matching the History
+             tab search and filters
+           - The Jobs tab lists downloads and exports; select one to
+             cancel it, or double-click a finished article to show it
+             again. Clicking Summarize twice for the same URL does not
+             download it twice
+           - To follow RSS/Atom feeds or news sitemaps, add them with
+             "python ingest.py add <url>" and keep "python ingest.py run"
+             going; new articles appear in the History tab
         
         4. Troubleshooting:
            - Ensure you have an active internet connection
@@ -0,0 +1,291 @@
+"""Per-stage timings, histograms and an opt-in profiler for the analysis pipeline
+
+Every analyzed article carries a ``timings`` breakdown: wall and CPU
+milliseconds per stage plus the bytes parsed and sentences scored. A
+Metrics registry aggregates those breakdowns into histograms that can
+be exported as Prometheus text or JSON. Workers only fill in timings;
+the registry lives in the process that collects the results.
+
+Stages that run once for a whole batch, such as sentiment scoring, are
+timed once and split evenly between the batch's articles.
+"""
+import io
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# Upper bounds in seconds, as used by Prometheus client libraries
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+COUNT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class Timings:
+    """Stage timings of one article, kept in the dict stored with its result
+
+    ``data`` holds wall and CPU milliseconds per stage, their wall total,
+    the bytes of HTML parsed and the sentences scored. Wrapping a stored
+    dict again adds to it in place.
+    """
+
+    def __init__(self, data=None):
+        self.data = data if data is not None else {
+            'stages': {}, 'total_ms': 0.0, 'bytes': 0, 'sentences': 0}
+
+    def add(self, stage, wall, cpu):
+        entry = self.data['stages'].setdefault(stage, {'wall_ms': 0.0, 'cpu_ms': 0.0})
+        entry['wall_ms'] = round(entry['wall_ms'] + wall * 1000, 3)
+        entry['cpu_ms'] = round(entry['cpu_ms'] + cpu * 1000, 3)
+        self.data['total_ms'] = round(self.data['total_ms'] + wall * 1000, 3)
+
+    @contextmanager
+    def stage(self, name):
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - wall, time.thread_time() - cpu)
+
+
+@contextmanager
+def batch_stage(timings, name):
+    """Time one call made for a whole batch and charge each article an equal share"""
+    wall, cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        if timings:
+            wall = (time.perf_counter() - wall) / len(timings)
+            cpu = (time.thread_time() - cpu) / len(timings)
+            for entry in timings:
+                entry.add(name, wall, cpu)
+
+
+def format_timings(timings):
+    """One line for the GUI: total time and the slowest stages"""
+    if not timings or not timings.get('stages'):
+        return "Processing time: not recorded"
+    stages = sorted(timings['stages'].items(), key=lambda item: -item[1]['wall_ms'])
+    slowest = ', '.join(f"{name} {entry['wall_ms']:.0f} ms" for name, entry in stages[:4])
+    return f"Processing time: {timings['total_ms']:.0f} ms ({slowest})"
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound),
+                     len(self.buckets))
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """[(upper bound, observations at or below it)], ending with +Inf"""
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def quantile(self, fraction):
+        """Upper bound of the bucket holding the given quantile (an estimate)"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return bound if bound != float('inf') else self.buckets[-1]
+        return self.buckets[-1]
+
+
+class Metrics:
+    """Thread-safe registry of labelled histograms and counters
+
+    ``record(timings)`` folds one article's breakdown into
+    ``article_stage_seconds`` / ``article_stage_cpu_seconds`` by stage,
+    ``article_seconds``, ``article_bytes`` and ``article_sentences``.
+    """
+
+    HELP = {
+        'article_stage_seconds': "Wall time per pipeline stage and article",
+        'article_stage_cpu_seconds': "CPU time of the analyzing thread per stage and article",
+        'article_seconds': "Wall time of all stages of an article",
+        'article_bytes': "Size of the HTML parsed per article",
+        'article_sentences': "Sentences scored per article",
+        'articles_total': "Articles analyzed",
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+
+    def _histogram(self, name, labels, buckets):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(buckets)
+        return histogram
+
+    def observe(self, name, value, buckets=SECONDS_BUCKETS, **labels):
+        with self._lock:
+            self._histogram(name, labels, buckets).observe(value)
+
+    def increment(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def record(self, timings):
+        """Add one article's ``timings`` dict (as stored with its result)"""
+        if not timings:
+            return
+        with self._lock:
+            for stage, entry in timings.get('stages', {}).items():
+                self._histogram('article_stage_seconds', {'stage': stage},
+                                SECONDS_BUCKETS).observe(entry['wall_ms'] / 1000)
+                self._histogram('article_stage_cpu_seconds', {'stage': stage},
+                                SECONDS_BUCKETS).observe(entry['cpu_ms'] / 1000)
+            self._histogram('article_seconds', {}, SECONDS_BUCKETS).observe(
+                timings.get('total_ms', 0) / 1000)
+            # Reused and cached analyses parse or score nothing
+            if timings.get('bytes'):
+                self._histogram('article_bytes', {}, BYTES_BUCKETS).observe(timings['bytes'])
+            if timings.get('sentences'):
+                self._histogram('article_sentences', {}, COUNT_BUCKETS).observe(
+                    timings['sentences'])
+            key = ('articles_total', ())
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    def to_json(self):
+        """Histograms and counters as plain data, with estimated p50/p99"""
+        with self._lock:
+            histograms = []
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                histograms.append({
+                    'name': name, 'labels': dict(labels), 'count': histogram.count,
+                    'sum': round(histogram.sum, 6),
+                    'p50': histogram.quantile(0.5), 'p99': histogram.quantile(0.99),
+                    'buckets': [[bound if bound != float('inf') else '+Inf', total]
+                                for bound, total in histogram.cumulative()],
+                })
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self.counters.items())]
+        return {'histograms': histograms, 'counters': counters}
+
+    def to_prometheus(self, values=None, prefix='news_analyzer_'):
+        """The Prometheus text exposition format (version 0.0.4)
+
+        ``values`` adds unlabelled samples as {name: (type, value)}, for
+        counters and gauges kept outside the registry.
+        """
+        lines = []
+        described = set()
+
+        def describe(name, kind):
+            if name not in described:
+                described.add(name)
+                if name in self.HELP:
+                    lines.append(f"# HELP {prefix}{name} {self.HELP[name]}")
+                lines.append(f"# TYPE {prefix}{name} {kind}")
+
+        for name, (kind, value) in sorted((values or {}).items()):
+            describe(name, kind)
+            lines.append(f"{prefix}{name} {value}")
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                describe(name, 'counter')
+                lines.append(f"{prefix}{name}{_labels(labels)} {value}")
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                describe(name, 'histogram')
+                for bound, total in histogram.cumulative():
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f"{prefix}{name}_bucket{_labels(labels + (('le', le),))} "
+                                 f"{total}")
+                lines.append(f"{prefix}{name}_sum{_labels(labels)} {histogram.sum!r}")
+                lines.append(f"{prefix}{name}_count{_labels(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Save as Prometheus text (.prom/.txt) or JSON (anything else)"""
+        text = (self.to_prometheus() if path.endswith(('.prom', '.txt'))
+                else json.dumps(self.to_json(), indent=2))
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"'
+                          for (key, _), value in zip(labels, escaped)) + '}'
+
+
+class SlowProfiler:
+    """Opt-in cProfile and tracemalloc capture, kept only for slow calls
+
+    While enabled every profiled call runs under cProfile with tracemalloc
+    tracing, which slows it down. Calls taking at least ``threshold``
+    seconds leave a ``.prof`` file (open it with pstats or snakeviz) and
+    a ``.txt`` report of the top functions and allocation sites in
+    ``folder``; faster ones are discarded.
+    """
+
+    def __init__(self, threshold=1.0, folder=os.path.join("saved_data", "profiles"), top=25):
+        self.threshold = threshold
+        self.folder = folder
+        self.top = top
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    @contextmanager
+    def profile(self, label):
+        # Imported here so the GUI, which only formats timings, skips them
+        import cProfile
+        import tracemalloc
+
+        # cProfile hooks only the calling thread, so concurrent calls from
+        # other threads neither disturb nor show up in this profile
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+        before = tracemalloc.take_snapshot()
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - started
+            if elapsed >= self.threshold:
+                self._save(label, elapsed, profiler, before, tracemalloc.take_snapshot())
+
+    def _save(self, label, elapsed, profiler, before, after):
+        import pstats
+
+        name = re.sub(r'[^\w.-]+', '_', label)[:60] or 'article'
+        base = os.path.join(self.folder, f"{datetime.now():%Y%m%d-%H%M%S}-{name}")
+        with self._lock:
+            profiler.dump_stats(base + '.prof')
+            report = io.StringIO()
+            report.write(f"{label}: {elapsed:.3f}s\n\n")
+            pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(self.top)
+            report.write("Largest allocation growth:\n")
+            for stat in after.compare_to(before, 'lineno')[:self.top]:
+                report.write(f"  {stat}\n")
+            with open(base + '.txt', 'w', encoding='utf-8') as f:
+                f.write(report.getvalue())
@@ -0,0 +1,682 @@
+"""Headless article analysis pipeline shared by the GUI and the command line"""
+import argparse
+import copy
+import json
+import os
+import re
+import string
+import sys
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, wait
+from contextlib import nullcontext
+
+from dedup import MinHasher, encode_signature
+from extractor import EXTRACTORS, get_extractor
+from fetcher import Fetcher
+from history_store import HistoryStore
+from http_cache import HttpCache
+from metrics import Metrics, SlowProfiler, Timings, batch_stage
+from result_cache import ResultCache, content_key
+from scoring import SUMMARIZERS, SentenceScorer
+from sentiment import (BACKENDS, format_sentiment, get_backend, sentiment_category,
+                       sentiment_timeline)
+from textrank import TextRankSummarizer
+from topics import TopicModel, article_terms, extract_entities
+
+# Bump whenever a change to the analysis alters its output
+ANALYZER_VERSION = '6'
+
+# Keys of a stored record that describe the article rather than its analysis
+ARTICLE_FIELDS = frozenset(['id', 'saved_at', 'url', 'title', 'author', 'date', 'cluster_id',
+                            'duplicate_of', 'duplicate_similarity', 'minhash', 'timings'])
+DUPLICATE_POLICIES = ('flag', 'skip')
+# Stripped from both ends of a word for the language statistics
+NON_WORD_EDGES = string.punctuation + string.digits + '“”‘’«»—–…'
+
+
+class ArticleAnalyzer:
+    """Fetch, extract and analyze news articles without any GUI
+
+    With a ``duplicates`` store (a HistoryStore) every article gets a
+    MinHash signature and is looked up among the stored ones before it is
+    analyzed. Near duplicates are marked with ``duplicate_of``; with
+    ``on_duplicate='skip'`` the stored analysis is reused instead of
+    running a new one.
+
+    With a ``topics`` model (a TopicModel) results also get ``keywords``
+    and a ``topic``. The model lives in the calling process only; batches
+    analyzed elsewhere are passed through finalize() afterwards.
+
+    Every result carries ``timings``, a per-stage breakdown (see
+    metrics.Timings). finalize() also adds those to the ``metrics``
+    registry when one is given. A ``profiler`` (metrics.SlowProfiler)
+    profiles each article or batch and keeps the slow ones.
+
+    ``summarizer`` picks the summary: 'keywords' (the sentence scorer's
+    length, number, quote and keyword heuristics) or 'textrank' (see
+    textrank.py). Key points always come from the scorer.
+    """
+
+    def __init__(self, fetcher=None, result_cache=None, sentiment='textblob', extractor=None,
+                 duplicates=None, on_duplicate='flag', topics=None, metrics=None,
+                 profiler=None, summarizer='keywords'):
+        if on_duplicate not in DUPLICATE_POLICIES:
+            raise ValueError(f"Unknown duplicate policy: {on_duplicate}")
+        self._set_summarizer(summarizer)
+        self.fetcher = fetcher or Fetcher()
+        self.duplicates = duplicates
+        self.on_duplicate = on_duplicate
+        self.minhasher = MinHasher() if duplicates is not None else None
+        self.topics = topics
+        self.metrics = metrics
+        self.profiler = profiler
+        self.result_cache = result_cache
+        self.scorer = SentenceScorer()
+        self.sentiment = get_backend(sentiment) if isinstance(sentiment, str) else sentiment
+        self.extractor = (get_extractor(extractor) if extractor is None or isinstance(extractor, str)
+                          else extractor)
+
+    def _set_summarizer(self, summarizer):
+        if summarizer not in SUMMARIZERS:
+            raise ValueError(f"Unknown summarizer: {summarizer}")
+        self.summarizer = summarizer
+        self.textrank = TextRankSummarizer() if summarizer == 'textrank' else None
+
+    def with_summarizer(self, summarizer):
+        """This analyzer, or a copy sharing its fetcher, caches and stores, using ``summarizer``"""
+        if summarizer == self.summarizer:
+            return self
+        analyzer = copy.copy(self)
+        analyzer._set_summarizer(summarizer)
+        return analyzer
+
+    @property
+    def version(self):
+        """Identifies the analysis output; part of every result cache key"""
+        return f"{ANALYZER_VERSION}-{self.sentiment.name}-{self.summarizer}"
+
+    def warm_up(self):
+        """Load lexicons, parsers and native modules now rather than on the first article
+
+        Runs every analysis stage on a tiny document without touching the
+        caches or stores.
+        """
+        html = "<html><body><article><p>A good start. A bad end.</p></article></body></html>"
+        content = self.parse(html)['content']
+        self.extractor.stream().close()
+        scored = self.scorer.score(content)
+        self._summary(scored)
+        sentiment_timeline(content, scored['sentences'], scored['starts'], self.sentiment)
+        extract_entities(content)
+        article_terms(content)
+        if self.minhasher is not None:
+            self.minhasher.signature(content)
+
+    def _report(self, progress, value):
+        if progress:
+            progress(value)
+
+    def _profiled(self, label):
+        return self.profiler.profile(label) if self.profiler is not None else nullcontext()
+
+    def fetch(self, url):
+        """Download the raw HTML for a URL"""
+        return self.fetcher.download(url).text
+
+    def process_url(self, url, progress=None):
+        """Fetch a URL and return the analysis result dict
+
+        The page is parsed while it downloads, and the download stops once
+        the extractor has the article body, byline and date.
+        """
+        timings = Timings()
+        with self._profiled(url):
+            stream = self.extractor.stream()
+            # The fetch stage includes parsing the chunks as they arrive
+            with timings.stage('fetch'):
+                fetched = self.fetcher.download(url, sink=stream.feed)
+            timings.data['bytes'] = fetched.bytes
+            self._report(progress, 20)
+            with timings.stage('extract'):
+                article = stream.close()
+            self._report(progress, 60)
+            result = self._process_article(article, url, timings)
+        self._report(progress, 80)
+        return result
+
+    def process_html(self, html, url='', progress=None):
+        """Analyze already downloaded HTML and return the result dict"""
+        timings = Timings()
+        with self._profiled(url or 'html'):
+            with timings.stage('parse'):
+                article = self.parse(html)
+            timings.data['bytes'] = len(html.encode('utf-8', 'replace'))
+            self._report(progress, 60)
+            result = self._process_article(article, url, timings)
+        self._report(progress, 80)
+        return result
+
+    def _process_article(self, article, url, timings):
+        with timings.stage('dedup'):
+            signature, match, reused = self._find_duplicate(article)
+        analysis = (reused if reused is not None
+                    else self.analyze_batch([article['content']], [timings])[0])
+        result = self._result(article, analysis, url, signature, match, timings)
+        self.finalize([result])
+        return result
+
+    def finalize(self, results):
+        """Steps that run in the calling process once a batch is analyzed
+
+        Assigns topics (timed as one batch-wide stage) and records each
+        result's timings in the metrics registry. Failed entries (None)
+        are skipped.
+        """
+        done = [result for result in results if result is not None]
+        timed = ([Timings(result['timings']) for result in done if 'timings' in result]
+                 if self.topics is not None else [])
+        with batch_stage(timed, 'topics'):
+            self.assign_topics(done)
+        if self.metrics is not None:
+            for result in done:
+                self.metrics.record(result.get('timings'))
+        return results
+
+    def assign_topics(self, results):
+        """Fold a batch of results into the topic model in one update
+
+        Drops the intermediate ``terms`` from each result and, with a
+        model, adds ``keywords`` and ``topic``. Results without terms, such
+        as reused analyses of near duplicates, keep what they have.
+        """
+        batch = [(result, result.pop('terms')) for result in results
+                 if result is not None and 'terms' in result]
+        if self.topics is None or not batch:
+            return results
+        assigned = self.topics.update([terms for _, terms in batch])
+        for (result, _), topic in zip(batch, assigned):
+            result.update(topic)
+        return results
+
+    def _find_duplicate(self, article):
+        # (signature, (id, similarity) of a stored near duplicate, analysis to reuse)
+        if self.duplicates is None:
+            return None, None, None
+        signature = self.minhasher.signature(article['content'])
+        match = self.duplicates.find_duplicate(signature) if signature is not None else None
+        reused = None
+        if match and self.on_duplicate == 'skip':
+            record = self.duplicates.get(match[0])
+            # A summary made the other way is not reused; the copy is still flagged
+            if record is not None and record.get('summarizer', 'keywords') == self.summarizer:
+                reused = {k: v for k, v in record.items() if k not in ARTICLE_FIELDS}
+        return signature, match, reused
+
+    def process_html_batch(self, pages):
+        """Analyze a list of (html, url) pairs together
+
+        Returns a (result, error) pair per page. Sentiment for all pages
+        that miss the result cache is scored in a single backend call.
+        A page whose article was already extracted while downloading can
+        be passed as an (article, url, timings dict) triple instead, and
+        is not parsed again.
+        """
+        outcomes = [None] * len(pages)
+        parsed = []
+        label = f"{pages[0][1] or 'html'} (+{len(pages) - 1})" if pages else 'batch'
+        with self._profiled(label):
+            for index, (page, url, *extracted) in enumerate(pages):
+                try:
+                    if extracted:
+                        article, timings = page, Timings(extracted[0])
+                    else:
+                        timings = Timings()
+                        with timings.stage('parse'):
+                            article = self.parse(page)
+                        timings.data['bytes'] = len(page.encode('utf-8', 'replace'))
+                    with timings.stage('dedup'):
+                        duplicate = self._find_duplicate(article)
+                    parsed.append((index, url, article, timings) + duplicate)
+                except Exception as e:
+                    outcomes[index] = (None, str(e))
+
+            # Near duplicates with a reused analysis drop out of the batch
+            pending = [entry for entry in parsed if entry[6] is None]
+            analyses = iter(self.analyze_batch([entry[2]['content'] for entry in pending],
+                                               [entry[3] for entry in pending]))
+            for index, url, article, timings, signature, match, reused in parsed:
+                analysis = reused if reused is not None else next(analyses)
+                outcomes[index] = (self._result(article, analysis, url, signature, match,
+                                                timings), None)
+        return outcomes
+
+    def _result(self, article, analysis, url, signature=None, match=None, timings=None):
+        result = {
+            'title': article['title'],
+            'author': article['author'],
+            'date': article['date'],
+        }
+        result.update(analysis)
+        result['url'] = url
+        if signature is not None:
+            result['minhash'] = encode_signature(signature)
+        if match:
+            result['duplicate_of'] = match[0]
+            result['duplicate_similarity'] = round(match[1], 3)
+        if timings is not None:
+            result['timings'] = timings.data
+        return result
+
+    def parse(self, html):
+        """Extract title, author, date and body text from HTML"""
+        return self.extractor.extract(html)
+
+    def analyze(self, content):
+        """Run summary, sentiment, key point and statistics analysis
+
+        Results are memoized by content hash when a result cache is
+        configured, so syndicated copies and re-runs skip the work.
+        """
+        return self.analyze_batch([content])[0]
+
+    def analyze_batch(self, contents, timings=None):
+        """analyze() for several documents, scoring sentiment for all cache misses at once
+
+        Stage times are added to ``timings``, one metrics.Timings per
+        document, when given.
+        """
+        timings = timings or [Timings() for _ in contents]
+        keys = [None] * len(contents)
+        analyses = [None] * len(contents)
+        if self.result_cache is not None:
+            for index, content in enumerate(contents):
+                with timings[index].stage('cache'):
+                    keys[index] = content_key(content, self.version)
+                    analyses[index] = self.result_cache.get(keys[index])
+
+        missing = [index for index, analysis in enumerate(analyses) if analysis is None]
+        if not missing:
+            return analyses
+        with batch_stage([timings[index] for index in missing], 'sentiment'):
+            scores = self.sentiment.score_batch([contents[index] for index in missing])
+        for index, (polarity, subjectivity) in zip(missing, scores):
+            content, stage = contents[index], timings[index].stage
+            with stage('scoring'):
+                scored = self.scorer.score(content)
+            timings[index].data['sentences'] = len(scored['sentences'])
+            if self.textrank is not None:
+                with stage('summary'):
+                    summary = self._summary(scored)
+            else:
+                summary = scored['summary']
+            with stage('timeline'):
+                timeline = sentiment_timeline(content, scored['sentences'], scored['starts'],
+                                              self.sentiment)
+            with stage('stats'):
+                stats = self.generate_statistics(content)
+            with stage('entities'):
+                entities = extract_entities(content)
+            with stage('terms'):
+                terms = article_terms(content)
+            analysis = {
+                'summary': summary,
+                'summarizer': self.summarizer,
+                'sentiment': format_sentiment(polarity, subjectivity),
+                'sentiment_scores': {
+                    'category': sentiment_category(polarity),
+                    'polarity': polarity,
+                    'subjectivity': subjectivity,
+                    'backend': self.sentiment.name,
+                },
+                'sentiment_timeline': timeline,
+                'key_points': scored['key_points'],
+                'stats': stats,
+                'entities': entities,
+                'terms': terms,
+            }
+            if keys[index] is not None:
+                with stage('cache'):
+                    self.result_cache.put(keys[index], analysis)
+            analyses[index] = analysis
+        return analyses
+
+    def analyze_sentiment(self, text):
+        return format_sentiment(*self.sentiment.score(text))
+
+    def extract_key_points(self, text):
+        return self.scorer.score(text)['key_points']
+
+    def generate_statistics(self, text):
+        words = text.split()
+        sentences = text.split('.')
+        paragraphs = text.split('\n\n')
+
+        # Basic stats
+        stats = {
+            'word_count': len(words),
+            'sentence_count': len(sentences),
+            'paragraph_count': len(paragraphs),
+            'avg_words_per_sentence': len(words) / max(len(sentences), 1),
+            'avg_sentences_per_paragraph': len(sentences) / max(len(paragraphs), 1),
+            'reading_time': len(words) / 200  # Average reading speed of 200 wpm
+        }
+
+        # Language stats, over the same words without surrounding punctuation
+        # or digits; words that are nothing else are left out. Each distinct
+        # word is cleaned once and weighted by how often it occurs.
+        vocabulary = set()
+        counted = letters = 0
+        for word, count in Counter(words).items():
+            word = word.strip(NON_WORD_EDGES)
+            if word:
+                vocabulary.add(word.lower())
+                counted += count
+                letters += count * len(word)
+        stats['unique_words'] = len(vocabulary)
+        stats['lexical_diversity'] = len(vocabulary) / max(counted, 1)
+        stats['avg_word_length'] = letters / max(counted, 1)
+
+        return stats
+
+    def _summary(self, scored, num_sentences=5):
+        if self.textrank is not None:
+            return self.textrank.summarize(scored['sentences'], num_sentences)
+        return scored['summary']
+
+    def get_important_sentences(self, text, num_sentences=5):
+        return self._summary(self.scorer.score(text, num_sentences), num_sentences)
+
+
+def is_html_source(source):
+    """Return True when a source refers to a saved HTML file instead of a URL"""
+    return not re.match(r'^https?://', source, re.I) and os.path.isfile(source)
+
+
+def read_sources(path):
+    """Read one URL or saved HTML path per line, skipping blanks and comments"""
+    handle = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+    try:
+        for line in handle:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+
+def expand_sources(paths):
+    """Turn CLI arguments into sources: HTML files, directories of HTML or lists"""
+    for path in paths:
+        if os.path.isdir(path):
+            for filename in sorted(os.listdir(path)):
+                if filename.lower().endswith(('.html', '.htm')):
+                    yield os.path.join(path, filename)
+        elif path.lower().endswith(('.html', '.htm')):
+            yield path
+        else:
+            yield from read_sources(path)
+
+
+def iter_documents(sources, analyzer, progress=None):
+    """Yield (source, html, error) for saved HTML files and downloaded URLs
+
+    Saved HTML files are read first; URLs are then downloaded
+    concurrently by the analyzer's fetcher in completion order.
+    ``progress(done, submitted)`` tracks the download stage.
+    """
+    urls = []
+    for source in sources:
+        if not is_html_source(source):
+            urls.append(source)
+            continue
+        try:
+            with open(source, 'r', encoding='utf-8', errors='replace') as f:
+                yield source, f.read(), None
+        except OSError as e:
+            yield source, None, str(e)
+
+    for fetched in analyzer.fetcher.fetch_all(urls, progress):
+        yield fetched.url, fetched.text, fetched.error
+
+
+_worker_analyzer = None
+
+
+def _init_worker(result_cache_path, sentiment='textblob', extractor=None, history_path=None,
+                 on_duplicate='flag', profile=None, summarizer='keywords'):
+    global _worker_analyzer
+    result_cache = ResultCache(result_cache_path) if result_cache_path else None
+    duplicates = HistoryStore(history_path) if history_path else None
+    profiler = SlowProfiler(*profile) if profile else None
+    _worker_analyzer = ArticleAnalyzer(result_cache=result_cache, sentiment=sentiment,
+                                       extractor=extractor, duplicates=duplicates,
+                                       on_duplicate=on_duplicate, profiler=profiler,
+                                       summarizer=summarizer)
+    _worker_analyzer.warm_up()
+
+
+def _analyze_in_worker(pages):
+    return _worker_analyzer.process_html_batch(pages)
+
+
+def analysis_pool(analyzer, workers):
+    """A process pool whose workers each hold a copy of ``analyzer``'s configuration
+
+    Submit lists of pages for process_html_batch() with _analyze_in_worker; results
+    still need analyzer.finalize() in the calling process.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    result_cache = analyzer.result_cache
+    profiler = analyzer.profiler
+    initargs = (result_cache.path if result_cache else None, analyzer.sentiment.name,
+                analyzer.extractor.name,
+                analyzer.duplicates.path if analyzer.duplicates is not None else None,
+                analyzer.on_duplicate,
+                (profiler.threshold, profiler.folder) if profiler is not None else None,
+                analyzer.summarizer)
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs)
+
+
+def _batches(documents, batch_size):
+    # Group fetched pages into lists of (html, source); failed fetches are
+    # passed through on their own as (None, source, error)
+    batch = []
+    for source, html, error in documents:
+        if error:
+            yield None, source, error
+            continue
+        batch.append((html, source))
+        if len(batch) >= batch_size:
+            yield batch, None, None
+            batch = []
+    if batch:
+        yield batch, None, None
+
+
+def analyze_documents(documents, analyzer=None, workers=1, batch_size=16):
+    """Analyze (source, html, error) tuples, yielding (source, result, error)
+
+    Pages are analyzed ``batch_size`` at a time so batch-capable sentiment
+    backends score them in one call. With ``workers`` > 1 the CPU-bound
+    parse and analysis stages run in a process pool. Batches are streamed
+    to it with at most two pending per worker, so fetched HTML never piles
+    up in memory.
+    """
+    analyzer = analyzer or ArticleAnalyzer()
+    if workers <= 1:
+        for batch, source, error in _batches(documents, batch_size):
+            if batch is None:
+                yield source, None, error
+                continue
+            try:
+                outcomes = analyzer.process_html_batch(batch)
+                analyzer.finalize([result for result, _ in outcomes])
+            except Exception as e:
+                outcomes = [(None, str(e))] * len(batch)
+            for (_, source), (result, error) in zip(batch, outcomes):
+                yield source, result, error
+        return
+
+    pending = {}
+
+    def drain(return_when):
+        finished, _ = wait(pending, return_when=return_when)
+        for future in finished:
+            batch = pending.pop(future)
+            try:
+                outcomes = future.result()
+                analyzer.finalize([result for result, _ in outcomes])
+            except Exception as e:
+                outcomes = [(None, str(e))] * len(batch)
+            for (_, source), (result, error) in zip(batch, outcomes):
+                yield source, result, error
+
+    with analysis_pool(analyzer, workers) as executor:
+        for batch, source, error in _batches(documents, batch_size):
+            if batch is None:
+                yield source, None, error
+                continue
+            pending[executor.submit(_analyze_in_worker, batch)] = batch
+            if len(pending) >= workers * 2:
+                yield from drain(FIRST_COMPLETED)
+        while pending:
+            yield from drain(FIRST_COMPLETED)
+
+
+def iter_results(sources, analyzer=None, progress=None, workers=1):
+    """Yield (source, result, error) for every source as soon as it is ready"""
+    analyzer = analyzer or ArticleAnalyzer()
+    documents = iter_documents(sources, analyzer, progress)
+    yield from analyze_documents(documents, analyzer, workers)
+
+
+def run_batch(sources, callback, analyzer=None, progress=None, workers=1):
+    """Analyze sources and report each outcome through callback(source, result, error)"""
+    processed = failed = 0
+    for source, result, error in iter_results(sources, analyzer, progress, workers):
+        processed += 1
+        if error:
+            failed += 1
+        callback(source, result, error)
+    return processed, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Analyze news articles without the GUI")
+    parser.add_argument('sources', nargs='+',
+                        help="file of URLs/HTML paths (one per line, '-' for stdin), "
+                             "a saved .html file or a directory of them")
+    parser.add_argument('-o', '--output',
+                        help="write JSON lines to this file instead of stdout")
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help="do not report failures on stderr")
+    parser.add_argument('-j', '--processes', type=int, default=1,
+                        help="analysis worker processes (default: 1, 0 for all cores)")
+    parser.add_argument('--workers', type=int, default=16,
+                        help="concurrent downloads (default: 16)")
+    parser.add_argument('--per-host', type=int, default=4,
+                        help="concurrent downloads per host (default: 4)")
+    parser.add_argument('--timeout', type=float, default=20,
+                        help="read timeout in seconds (default: 20)")
+    parser.add_argument('--retries', type=int, default=3,
+                        help="retries for failed or throttled requests (default: 3)")
+    parser.add_argument('--cache-dir', default=os.path.join("saved_data", "http_cache"),
+                        help="HTTP response cache folder (default: saved_data/http_cache)")
+    parser.add_argument('--cache-ttl', type=float, default=3600,
+                        help="seconds before cached pages are revalidated (default: 3600)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="always download pages")
+    parser.add_argument('--offline', action='store_true',
+                        help="only serve pages from the cache")
+    parser.add_argument('--result-cache', default=os.path.join("saved_data", "analysis_cache.sqlite"),
+                        help="analysis result cache file (default: saved_data/analysis_cache.sqlite)")
+    parser.add_argument('--no-result-cache', action='store_true',
+                        help="always recompute the analysis")
+    parser.add_argument('--sentiment', choices=sorted(BACKENDS), default='textblob',
+                        help="sentiment backend (default: textblob)")
+    parser.add_argument('--extractor', choices=sorted(EXTRACTORS),
+                        help="HTML extractor (default: lxml when installed, else soup)")
+    parser.add_argument('--summarizer', choices=SUMMARIZERS, default='keywords',
+                        help="summary method: keyword scoring or TextRank (default: keywords)")
+    parser.add_argument('--history',
+                        help="history database to check for near duplicates and save results to")
+    parser.add_argument('--duplicates', choices=DUPLICATE_POLICIES, default='flag',
+                        help="with --history: flag near duplicates, or skip their analysis "
+                             "and reuse the stored one (default: flag)")
+    parser.add_argument('--topics', default=os.path.join("saved_data", "topics.sqlite"),
+                        help="topic model file, updated with every batch "
+                             "(default: saved_data/topics.sqlite)")
+    parser.add_argument('--no-topics', action='store_true',
+                        help="skip keyword and topic assignment")
+    parser.add_argument('--metrics',
+                        help="write per-stage timing histograms to this file when done "
+                             "(Prometheus text for .prom/.txt, JSON otherwise)")
+    parser.add_argument('--profile-slow', type=float, metavar='SECONDS',
+                        help="profile every batch (slower) and save cProfile/tracemalloc "
+                             "reports of those taking at least SECONDS to --profile-dir")
+    parser.add_argument('--profile-dir', default=os.path.join("saved_data", "profiles"),
+                        help="folder for --profile-slow reports (default: saved_data/profiles)")
+    args = parser.parse_args(argv)
+    processes = args.processes or os.cpu_count() or 1
+
+    cache = None
+    if not args.no_cache:
+        cache = HttpCache(args.cache_dir, ttl=args.cache_ttl, offline=args.offline)
+    fetcher = Fetcher(max_workers=args.workers, per_host=args.per_host,
+                      timeout=(5, args.timeout), retries=args.retries, cache=cache)
+    result_cache = None if args.no_result_cache else ResultCache(args.result_cache)
+    store = HistoryStore(args.history) if args.history else None
+    topics = None if args.no_topics else TopicModel(args.topics)
+    metrics = Metrics() if args.metrics else None
+    profiler = (SlowProfiler(args.profile_slow, args.profile_dir)
+                if args.profile_slow is not None else None)
+    analyzer = ArticleAnalyzer(fetcher, result_cache, args.sentiment, args.extractor,
+                               duplicates=store, on_duplicate=args.duplicates, topics=topics,
+                               metrics=metrics, profiler=profiler, summarizer=args.summarizer)
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+
+    def write_result(source, result, error):
+        if error:
+            if not args.quiet:
+                print(f"Error processing {source}: {error}", file=sys.stderr)
+            return
+        if store is not None:
+            store.add(result)
+        out.write(json.dumps(result, ensure_ascii=False) + '\n')
+
+    def report_progress(done, submitted):
+        if not args.quiet:
+            print(f"\rFetched {done}/{submitted}", end='', file=sys.stderr, flush=True)
+
+    started = time.perf_counter()
+    try:
+        processed, failed = run_batch(expand_sources(args.sources), write_result,
+                                      analyzer, report_progress, processes)
+    finally:
+        fetcher.close()
+        if result_cache:
+            result_cache.close()
+        if store is not None:
+            store.close()
+        if topics is not None:
+            topics.close()
+        if out is not sys.stdout:
+            out.close()
+        if metrics is not None:
+            metrics.write(args.metrics)
+        if not args.quiet:
+            print(file=sys.stderr)
+
+    elapsed = time.perf_counter() - started
+    print(f"Processed {processed} articles ({failed} failed) in {elapsed:.1f}s",
+          file=sys.stderr)
+    return 1 if failed and failed == processed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""Memoization of analysis results keyed by article content"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def content_key(content, version):
+    """Stable key for a piece of article text analyzed by a given analyzer version
+
+    Callers pass whitespace-normalized text (as produced by
+    ArticleAnalyzer.parse), so the content is hashed as is.
+    """
+    digest = hashlib.sha256(f"{version}\0{content}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Two-level cache: a bounded in-memory LRU backed by an SQLite file
+
+    Results are stored as JSON so every hit hands out a fresh copy that
+    callers can mutate freely. The SQLite table is pruned back to
+    ``max_rows`` least recently used entries when it grows past it.
+    """
+
+    def __init__(self, path=os.path.join("saved_data", "analysis_cache.sqlite"),
+                 max_memory=1024, max_rows=100000):
+        self.path = path
+        self.max_memory = max_memory
+        self.max_rows = max_rows
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db = None
+        if path:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""CREATE TABLE IF NOT EXISTS results (
+                                    key TEXT PRIMARY KEY,
+                                    data TEXT NOT NULL,
+                                    accessed REAL NOT NULL)""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_results_accessed "
+                             "ON results(accessed)")
+            self._db.commit()
+
+    def _remember(self, key, data):
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Return a copy of the cached result for key, or None"""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+            elif self._db is not None:
+                row = self._db.execute("SELECT data FROM results WHERE key = ?",
+                                       (key,)).fetchone()
+                if row is None:
+                    return None
+                data = row[0]
+                self._db.execute("UPDATE results SET accessed = ? WHERE key = ?",
+                                 (time.time(), key))
+                self._db.commit()
+                self._remember(key, data)
+            else:
+                return None
+        return json.loads(data)
+
+    def put(self, key, result):
+        """Store an analysis result"""
+        data = json.dumps(result, ensure_ascii=False)
+        with self._lock:
+            self._remember(key, data)
+            if self._db is None:
+                return
+            self._db.execute("INSERT OR REPLACE INTO results (key, data, accessed) "
+                             "VALUES (?, ?, ?)", (key, data, time.time()))
+            self._writes += 1
+            if self._writes % 1000 == 0:
+                self._prune()
+            self._db.commit()
+
+    def _prune(self):
+        count = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        if count > self.max_rows:
+            self._db.execute("""DELETE FROM results WHERE key IN (
+                                    SELECT key FROM results ORDER BY accessed LIMIT ?)""",
+                             (count - self.max_rows,))
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
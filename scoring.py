@@ -0,0 +1,116 @@
+"""Single-pass sentence segmentation and scoring for summaries and key points"""
+import heapq
+import re
+from bisect import bisect_right
+
+SUMMARY_KEYWORDS = ['important', 'significant', 'crucial', 'findings', 'results',
+                    'concluded', 'research', 'study', 'analysis', 'report']
+KEY_POINT_INDICATORS = ['most important', 'significant', 'crucial', 'key', 'major',
+                        'essential', 'fundamental', 'primary']
+
+# Summary modes: the keyword scorer below, or TextRank (textrank.py)
+SUMMARIZERS = ('keywords', 'textrank')
+
+# A blank line ends a sentence too, so none spans two paragraphs
+SENTENCE_BOUNDARY = re.compile(r'[.!?]+|\n\n')
+DIGITS = re.compile(r'\d+')
+
+
+def _lower_same_length(text):
+    # str.lower() can lengthen a few characters (e.g. "İ"); offsets into the
+    # lowered text must line up with the original, so keep those as is
+    lower = text.lower()
+    if len(lower) == len(text):
+        return lower
+    return ''.join(ch.lower() if len(ch.lower()) == 1 else ch for ch in text)
+
+
+class SentenceScorer:
+    """Segment text once and score every sentence for both summary and key points
+
+    Sentence boundaries are found in one regex pass and every keyword,
+    indicator and number is located by scanning the whole lowercased text
+    once per term (a C-level substring search), then mapped to its
+    sentence by bisecting the boundary offsets. Per-sentence work is
+    reduced to a word count, which keeps substring semantics identical to
+    testing each keyword against each sentence.
+    """
+
+    def __init__(self, keywords=SUMMARY_KEYWORDS, indicators=KEY_POINT_INDICATORS):
+        self.keywords = frozenset(keywords)
+        self.indicators = frozenset(indicators)
+        self.terms = [(term, term in self.keywords, term in self.indicators)
+                      for term in sorted(self.keywords | self.indicators)]
+
+    def _segments(self, text):
+        spans = [match.span() for match in SENTENCE_BOUNDARY.finditer(text)]
+        starts = [0] + [end for _, end in spans]
+        ends = [start for start, _ in spans] + [len(text)]
+        return starts, ends
+
+    def segment(self, text):
+        """Split text into stripped, non-empty sentences"""
+        return [s for s in (part.strip() for part in SENTENCE_BOUNDARY.split(text)) if s]
+
+    def score(self, text, num_sentences=5, num_key_points=5):
+        """Return the sentences, their offsets, summary and key points from a single pass
+
+        Summary scoring: 0.1 per word, +2 for a number, +2 for a quote and
+        +1.5 per distinct keyword, over sentences longer than 20
+        characters. Key point scoring: +1 per distinct indicator; sentences
+        without any are dropped.
+        """
+        starts, ends = self._segments(text)
+        keyword_hits = [0] * len(starts)
+        indicator_hits = [0] * len(starts)
+        has_number = [False] * len(starts)
+
+        lower = _lower_same_length(text)
+        for term, is_keyword, is_indicator in self.terms:
+            last = -1
+            position = lower.find(term)
+            while position != -1:
+                index = bisect_right(starts, position) - 1
+                if index != last:  # count each term once per sentence
+                    last = index
+                    if is_keyword:
+                        keyword_hits[index] += 1
+                    if is_indicator:
+                        indicator_hits[index] += 1
+                position = lower.find(term, position + 1)
+
+        for match in DIGITS.finditer(text):
+            has_number[bisect_right(starts, match.start()) - 1] = True
+
+        sentences = []
+        sentence_starts = []
+        summary_scores = []
+        key_point_scores = []
+        for index, start in enumerate(starts):
+            sentence = text[start:ends[index]].strip()
+            if not sentence:
+                continue
+            sentences.append(sentence)
+            sentence_starts.append(start)
+
+            if len(sentence) > 20:
+                score = len(sentence.split()) * 0.1
+                if has_number[index]:
+                    score += 2
+                if '"' in sentence:
+                    score += 2
+                score += 1.5 * keyword_hits[index]
+                summary_scores.append((score, sentence))
+
+            if indicator_hits[index]:
+                key_point_scores.append((indicator_hits[index], sentence))
+
+        summary = heapq.nlargest(num_sentences, summary_scores)
+        key_points = [s[1] for s in heapq.nlargest(num_key_points, key_point_scores)]
+        return {
+            'sentences': sentences,
+            'starts': sentence_starts,
+            'summary': "\n\n".join(s[1] for s in summary),
+            'key_points': ("• " + "\n• ".join(key_points) if key_points
+                           else "No key points identified."),
+        }
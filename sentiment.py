@@ -0,0 +1,277 @@
+"""Pluggable sentiment backends: TextBlob and a vectorized lexicon scorer"""
+import argparse
+import os
+import re
+import sys
+import time
+from bisect import bisect_right
+from xml.etree import ElementTree
+
+CATEGORY_THRESHOLD = 0.3
+NEGATIONS = frozenset(['not', 'never', 'no', "n't", 'nor', 'neither', 'without'])
+TOKEN = re.compile(r"[a-z]+(?:'[a-z]+)?|n't")
+PARAGRAPH_BREAK = re.compile(r'\n\n')
+
+
+def sentiment_category(polarity):
+    """Map a polarity score to the category shown in the GUI"""
+    if polarity > CATEGORY_THRESHOLD:
+        return "Very Positive"
+    elif polarity > 0:
+        return "Slightly Positive"
+    elif polarity < -CATEGORY_THRESHOLD:
+        return "Very Negative"
+    elif polarity < 0:
+        return "Slightly Negative"
+    return "Neutral"
+
+
+def format_sentiment(polarity, subjectivity):
+    return (f"Overall Sentiment: {sentiment_category(polarity)}\n"
+            f"Polarity Score: {polarity:.2f} (-1 to 1)\n"
+            f"Subjectivity Score: {subjectivity:.2f} (0 to 1)")
+
+
+class SentimentBackend:
+    """Scores documents as (polarity, subjectivity) tuples"""
+
+    name = None
+
+    def score(self, text):
+        return self.score_batch([text])[0]
+
+    def score_batch(self, texts):
+        raise NotImplementedError
+
+
+class TextBlobBackend(SentimentBackend):
+    """The pattern analyzer shipped with TextBlob, one document at a time"""
+
+    name = 'textblob'
+
+    def score_batch(self, texts):
+        # The pattern scorer behind TextBlob(text).sentiment, called directly
+        # so short texts such as single sentences skip building a blob
+        from textblob.en import sentiment
+
+        return [tuple(sentiment(text)) for text in texts]
+
+
+class LexiconBackend(SentimentBackend):
+    """Scores a batch of documents with one sparse document-term product
+
+    Uses the same adjective lexicon as TextBlob (senses averaged per word)
+    and its "not good" = -0.5 * good negation rule, but skips intensifiers,
+    emoticons and part-of-speech handling. Each document contributes
+    (row, column, weight) entries to a COO matrix; polarity and
+    subjectivity are then the row-wise weighted means computed with
+    np.bincount, i.e. a sparse matrix-vector product per score.
+    """
+
+    name = 'lexicon'
+    _lexicon = None
+
+    def __init__(self, lexicon_path=None):
+        import numpy as np
+
+        self.np = np
+        self.vocabulary, self.polarity, self.subjectivity = self.load_lexicon(lexicon_path)
+
+    @classmethod
+    def load_lexicon(cls, path=None):
+        """Return (vocabulary, polarity, subjectivity); the default lexicon is parsed once"""
+        if path is not None:
+            return cls._parse_lexicon(path)
+        if cls._lexicon is None:
+            import textblob
+            cls._lexicon = cls._parse_lexicon(
+                os.path.join(os.path.dirname(textblob.__file__), 'en', 'en-sentiment.xml'))
+        return cls._lexicon
+
+    @staticmethod
+    def _parse_lexicon(path):
+        import numpy as np
+
+        senses = {}
+        for word in ElementTree.parse(path).getroot().iter('word'):
+            form = word.get('form')
+            if form:
+                senses.setdefault(form.lower(), []).append(
+                    (float(word.get('polarity', 0.0)), float(word.get('subjectivity', 0.0))))
+
+        vocabulary = {form: index for index, form in enumerate(senses)}
+        polarity = np.array([sum(p for p, _ in v) / len(v) for v in senses.values()])
+        subjectivity = np.array([sum(s for _, s in v) / len(v) for v in senses.values()])
+        return vocabulary, polarity, subjectivity
+
+    def _entries(self, texts):
+        rows, columns, signs = [], [], []
+        vocabulary = self.vocabulary
+        for row, text in enumerate(texts):
+            negated = False
+            for token in TOKEN.findall(text.lower()):
+                column = vocabulary.get(token)
+                if column is None:
+                    # A negation carries across short words ("not a good")
+                    negated = token in NEGATIONS or (negated and len(token) <= 2)
+                    continue
+                rows.append(row)
+                columns.append(column)
+                signs.append(-0.5 if negated else 1.0)
+                negated = token in NEGATIONS
+        return rows, columns, signs
+
+    def score_batch(self, texts):
+        np = self.np
+        rows, columns, signs = self._entries(texts)
+        rows = np.asarray(rows, dtype=np.int64)
+        columns = np.asarray(columns, dtype=np.int64)
+        signs = np.asarray(signs)
+
+        size = len(texts)
+        counts = np.bincount(rows, minlength=size)
+        polarity = np.bincount(rows, weights=self.polarity[columns] * signs, minlength=size)
+        subjectivity = np.bincount(rows, weights=self.subjectivity[columns], minlength=size)
+        counts = np.maximum(counts, 1)
+        return list(zip((polarity / counts).tolist(), (subjectivity / counts).tolist()))
+
+
+def sentiment_timeline(text, sentences, starts, backend):
+    """Sentence scores and their per-paragraph averages, in reading order
+
+    ``sentences`` and ``starts`` are the segmentation already produced by
+    SentenceScorer.score(), so the text is not split again. Paragraphs are
+    separated by blank lines; a paragraph averages only the sentences that
+    carry any sentiment, as the document score does for words.
+    """
+    breaks = [match.end() for match in PARAGRAPH_BREAK.finditer(text)]
+    scores = backend.score_batch(sentences) if sentences else []
+
+    timeline = {'sentences': [], 'paragraphs': []}
+    for start, (polarity, subjectivity) in zip(starts, scores):
+        paragraph = bisect_right(breaks, start)
+        timeline['sentences'].append({
+            'paragraph': paragraph,
+            'polarity': round(polarity, 3),
+            'subjectivity': round(subjectivity, 3),
+        })
+        if not timeline['paragraphs'] or timeline['paragraphs'][-1]['paragraph'] != paragraph:
+            timeline['paragraphs'].append({'paragraph': paragraph, 'sentences': 0,
+                                           'polarity': 0.0, 'subjectivity': 0.0, 'scored': 0})
+        section = timeline['paragraphs'][-1]
+        section['sentences'] += 1
+        if polarity or subjectivity:
+            section['scored'] += 1
+            section['polarity'] += polarity
+            section['subjectivity'] += subjectivity
+
+    for section in timeline['paragraphs']:
+        scored = section.pop('scored')
+        section['polarity'] = round(section['polarity'] / scored, 3) if scored else 0.0
+        section['subjectivity'] = round(section['subjectivity'] / scored, 3) if scored else 0.0
+        section['category'] = sentiment_category(section['polarity'])
+    return timeline
+
+
+def format_timeline(timeline, width=20):
+    """Render per-paragraph polarity as text bars for the GUI"""
+    lines = []
+    for section in timeline.get('paragraphs', []):
+        polarity = section['polarity']
+        bar = ('+' if polarity >= 0 else '-') * round(abs(polarity) * width)
+        lines.append(f"¶{section['paragraph'] + 1:<4} {polarity:+.2f}  "
+                     f"{section['category']:<18} {bar}")
+    return "\n".join(lines) if lines else "No sentences to score."
+
+
+BACKENDS = {
+    'textblob': TextBlobBackend,
+    'lexicon': LexiconBackend,
+}
+
+
+def get_backend(name):
+    """Instantiate a sentiment backend by name"""
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown sentiment backend: {name}") from None
+
+
+def agreement_report(texts, reference='textblob', candidate='lexicon'):
+    """Compare two backends over the same documents
+
+    Returns timings, the share of documents that land in the same
+    category, mean absolute score differences and the polarity correlation.
+    """
+    import numpy as np
+
+    results = {}
+    for name in (reference, candidate):
+        backend = get_backend(name)
+        backend.score_batch(texts[:1])  # warm up lazy imports and lexicon loading
+        started = time.perf_counter()
+        results[name] = np.array(backend.score_batch(texts))
+        results[name + '_seconds'] = time.perf_counter() - started
+
+    ref, cand = results[reference], results[candidate]
+    same = sum(sentiment_category(a) == sentiment_category(b) for a, b in zip(ref[:, 0], cand[:, 0]))
+    correlation = (float(np.corrcoef(ref[:, 0], cand[:, 0])[0, 1])
+                   if len(texts) > 1 and ref[:, 0].std() and cand[:, 0].std() else float('nan'))
+    return {
+        'documents': len(texts),
+        'reference': reference,
+        'candidate': candidate,
+        'reference_seconds': results[reference + '_seconds'],
+        'candidate_seconds': results[candidate + '_seconds'],
+        'category_agreement': same / max(len(texts), 1),
+        'polarity_mae': float(np.abs(ref[:, 0] - cand[:, 0]).mean()) if len(texts) else 0.0,
+        'subjectivity_mae': float(np.abs(ref[:, 1] - cand[:, 1]).mean()) if len(texts) else 0.0,
+        'polarity_correlation': correlation,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare sentiment backends on stored articles or text files")
+    parser.add_argument('files', nargs='*',
+                        help="text files, one document each (default: the history store)")
+    parser.add_argument('--store', default=os.path.join("saved_data", "history.sqlite"))
+    parser.add_argument('--limit', type=int, default=10000)
+    parser.add_argument('--reference', choices=sorted(BACKENDS), default='textblob')
+    parser.add_argument('--candidate', choices=sorted(BACKENDS), default='lexicon')
+    args = parser.parse_args(argv)
+
+    if args.files:
+        texts = []
+        for path in args.files:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                texts.append(f.read())
+    else:
+        from history_store import HistoryStore
+
+        store = HistoryStore(args.store)
+        texts = []
+        for record in store.iter_records():
+            texts.append(f"{record.get('summary', '')} {record.get('key_points', '')}")
+            if len(texts) >= args.limit:
+                break
+        store.close()
+
+    if not texts:
+        print("No documents to compare", file=sys.stderr)
+        return 1
+
+    report = agreement_report(texts, args.reference, args.candidate)
+    print(f"Documents:             {report['documents']}")
+    print(f"{args.reference + ' time:':<22} {report['reference_seconds']:.3f}s")
+    print(f"{args.candidate + ' time:':<22} {report['candidate_seconds']:.3f}s")
+    print(f"Category agreement:    {report['category_agreement']:.1%}")
+    print(f"Polarity MAE:          {report['polarity_mae']:.3f}")
+    print(f"Subjectivity MAE:      {report['subjectivity_mae']:.3f}")
+    print(f"Polarity correlation:  {report['polarity_correlation']:.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
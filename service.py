@@ -0,0 +1,423 @@
+"""Local HTTP/JSON analysis service with micro-batching
+
+    POST /analyze   {"url": "..."} or {"html": "...", "url": "optional"}
+                    -> the result dict the GUI shows and stores
+    GET  /health    -> {"status": "ok", ...}
+    GET  /metrics   -> request, batch and latency counters and per-stage
+                       timing histograms in the Prometheus text format
+                       (?format=json for JSON)
+
+Requests that arrive together are grouped into one batch, up to
+``max_batch`` pages or ``max_wait`` seconds after the first, and each
+batch is analyzed with one process_html_batch() call, so sentiment is
+scored for all of them at once. Pages requested by URL are parsed while
+they download, and only the extracted article goes to the batch.
+Batches run in a process pool with at most two per worker in flight.
+Once ``max_pending`` requests are waiting, new ones are answered with
+503 and Retry-After instead of queueing without bound.
+
+Usage: python service.py [--port 8080] [-j 4 | --inline] [--max-batch 16]
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import requests
+
+from extractor import EXTRACTORS
+from fetcher import MAX_BYTES, Fetcher
+from http_cache import HttpCache
+from metrics import Metrics, SlowProfiler, Timings
+from pipeline import ArticleAnalyzer, _analyze_in_worker, analysis_pool
+from result_cache import ResultCache
+from scoring import SUMMARIZERS
+from sentiment import BACKENDS
+from topics import TopicModel
+
+MAX_BATCH = 16
+MAX_WAIT = 0.01          # seconds a batch waits for more requests after its first
+MAX_PENDING = 256        # requests accepted before answering 503
+IDLE_TIMEOUT = 30        # seconds a keep-alive connection may stay silent
+MAX_HEADER_LINES = 100
+LATENCY_WINDOW = 10000   # most recent request latencies kept for percentiles
+
+
+class HttpError(Exception):
+    def __init__(self, status, message=None, headers=None):
+        super().__init__(message or HTTPStatus(status).phrase)
+        self.status = status
+        self.headers = headers or {}
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sequence, 0.0 when empty"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+class AnalysisService:
+    """Micro-batching front end for an ArticleAnalyzer
+
+    ``analyzer`` provides the configuration, the fetcher used for URL
+    requests, the topic model and the metrics registry that /metrics
+    exports. With ``workers`` > 0 batches run in that many processes;
+    with 0 they run one at a time in a thread of this process.
+    """
+
+    def __init__(self, analyzer, workers=1, max_batch=MAX_BATCH, max_wait=MAX_WAIT,
+                 max_pending=MAX_PENDING):
+        self.analyzer = analyzer
+        self.workers = workers
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_pending = max_pending
+        self.pending = 0
+        self.started = time.time()
+        self.counters = {'requests': 0, 'errors': 0, 'rejected': 0, 'batches': 0,
+                         'batched_pages': 0}
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self._queue = None
+        self._slots = None
+        self._executor = None
+        self._io = None
+        self._tasks = set()
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(max(self.workers, 1) * 2)
+        if self.workers > 0:
+            self._executor = analysis_pool(self.analyzer, self.workers)
+            # Start the workers now, before the listening socket exists for
+            # them to inherit, and load their models before the first request
+            await asyncio.get_running_loop().run_in_executor(self._executor,
+                                                             _analyze_in_worker, [])
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='analyze')
+        # Downloads and topic updates block; keep them off the event loop
+        self._io = ThreadPoolExecutor(max_workers=self.analyzer.fetcher.max_workers,
+                                      thread_name_prefix='service-io')
+        self._tasks.add(asyncio.get_running_loop().create_task(self._batcher()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._executor.shutdown(wait=True)
+        self._io.shutdown(wait=True)
+
+    async def analyze(self, payload):
+        """Analyze one request body; raises HttpError for client errors and overload"""
+        if not isinstance(payload, dict) or not (payload.get('html') or payload.get('url')):
+            raise HttpError(400, "Expected a JSON object with 'url' or 'html'")
+        if self.pending >= self.max_pending:
+            self.counters['rejected'] += 1
+            raise HttpError(503, "Too many pending requests", {'Retry-After': '1'})
+
+        self.pending += 1
+        try:
+            url = payload.get('url') or ''
+            if payload.get('html'):
+                page = (payload['html'], url)
+            else:
+                page = await asyncio.get_running_loop().run_in_executor(
+                    self._io, self._download, url)
+            future = asyncio.get_running_loop().create_future()
+            await self._queue.put((page, future))
+            return await future
+        finally:
+            self.pending -= 1
+
+    def _download(self, url):
+        # As in process_url, the page is parsed as it arrives and the
+        # download stops once the extractor has everything it needs.
+        # Returns an (article, url, timings) page for process_html_batch.
+        timings = Timings()
+        try:
+            stream = self.analyzer.extractor.stream()
+            with timings.stage('fetch'):
+                fetched = self.analyzer.fetcher.download(url, sink=stream.feed)
+        except requests.RequestException as e:
+            raise HttpError(502, f"Could not fetch {url}: {e}") from None
+        timings.data['bytes'] = fetched.bytes
+        try:
+            with timings.stage('extract'):
+                article = stream.close()
+        except Exception as e:
+            raise HttpError(422, f"Could not extract an article from {url}: {e}") from e
+        return article, url, timings.data
+
+    async def _batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                if self._queue.empty():
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(self._queue.get_nowait())
+            await self._slots.acquire()
+            task = loop.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        loop = asyncio.get_running_loop()
+        pages = [page for page, _ in batch]
+        failure = None
+        try:
+            work = (_analyze_in_worker if self.workers > 0
+                    else self.analyzer.process_html_batch)
+            outcomes = await loop.run_in_executor(self._executor, work, pages)
+            await loop.run_in_executor(self._io, self.analyzer.finalize,
+                                       [result for result, _ in outcomes])
+        except Exception as e:
+            # Not a problem with the pages: every request in the batch gets a 500
+            failure, outcomes = e, [(None, None)] * len(batch)
+        finally:
+            self._slots.release()
+        self.counters['batches'] += 1
+        self.counters['batched_pages'] += len(batch)
+        for (_, future), (result, error) in zip(batch, outcomes):
+            if future.done():
+                continue
+            if failure is not None:
+                future.set_exception(failure)
+            elif error:
+                future.set_exception(HttpError(422, error))
+            else:
+                future.set_result(result)
+
+    def metrics(self):
+        latencies = list(self.latencies)
+        batches = self.counters['batches']
+        return dict(self.counters, pending=self.pending, queued=self._queue.qsize(),
+                    workers=self.workers, uptime=round(time.time() - self.started, 1),
+                    mean_batch_size=round(self.counters['batched_pages'] / batches, 2)
+                    if batches else 0.0,
+                    latency_p50_ms=round(percentile(latencies, 0.50) * 1000, 2),
+                    latency_p99_ms=round(percentile(latencies, 0.99) * 1000, 2))
+
+    def prometheus(self):
+        """/metrics in the Prometheus text format"""
+        snapshot = self.metrics()
+        values = {f'service_{name}_total': ('counter', value) for name, value in snapshot.items()
+                  if name in self.counters}
+        values.update((f'service_{name}', ('gauge', value)) for name, value in snapshot.items()
+                      if name not in self.counters)
+        return (self.analyzer.metrics or Metrics()).to_prometheus(values)
+
+    async def route(self, method, path, body):
+        """(status, response object or text) for one request"""
+        path, _, query = path.partition('?')
+        if path == '/health':
+            if method != 'GET':
+                raise HttpError(405, headers={'Allow': 'GET'})
+            return 200, {'status': 'ok', 'version': self.analyzer.version,
+                         'pending': self.pending}
+        if path == '/metrics':
+            if method != 'GET':
+                raise HttpError(405, headers={'Allow': 'GET'})
+            if 'format=json' not in query.split('&'):
+                return 200, self.prometheus()
+            stages = self.analyzer.metrics.to_json() if self.analyzer.metrics else {}
+            return 200, dict(self.metrics(), stages=stages)
+        if path == '/analyze':
+            if method != 'POST':
+                raise HttpError(405, headers={'Allow': 'POST'})
+            try:
+                payload = json.loads(body or b'null')
+            except ValueError:
+                raise HttpError(400, "Request body is not valid JSON") from None
+            started = time.perf_counter()
+            self.counters['requests'] += 1
+            try:
+                result = await self.analyze(payload)
+            except HttpError as e:
+                if e.status != 503:
+                    self.counters['errors'] += 1
+                raise
+            except Exception:
+                self.counters['errors'] += 1
+                raise
+            self.latencies.append(time.perf_counter() - started)
+            return 200, result
+        raise HttpError(404)
+
+    async def handle(self, reader, writer):
+        """Serve one HTTP/1.1 connection, keeping it open between requests"""
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), IDLE_TIMEOUT)
+                except HttpError as e:
+                    await self._respond(writer, e.status, {'error': str(e)}, e.headers, False)
+                    break
+                if request is None:
+                    break
+                method, path, keep_alive, body = request
+                try:
+                    status, response = await self.route(method, path, body)
+                    headers = {}
+                except HttpError as e:
+                    status, response, headers = e.status, {'error': str(e)}, e.headers
+                except Exception as e:
+                    print(f"Error handling {method} {path}:", file=sys.stderr)
+                    traceback.print_exc()
+                    status, response, headers = 500, {'error': f"Internal error: {e}"}, {}
+                await self._respond(writer, status, response, headers, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        # (method, path, keep_alive, body), or None when the client closed
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, path, version = line.decode('latin-1').split()
+        except ValueError:
+            raise HttpError(400, "Malformed request line") from None
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise HttpError(431)
+
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            raise HttpError(411, "Send a Content-Length instead of chunked encoding")
+        length = headers.get('content-length', '0')
+        if not length.isdigit():
+            raise HttpError(400, "Invalid Content-Length")
+        if int(length) > MAX_BYTES:
+            raise HttpError(413, f"Request bodies are limited to {MAX_BYTES} bytes")
+        body = await reader.readexactly(int(length)) if int(length) else b''
+
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+        return method.upper(), path, keep_alive, body
+
+    async def _respond(self, writer, status, response, headers, keep_alive):
+        if isinstance(response, str):
+            body = response.encode('utf-8')
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body = json.dumps(response, ensure_ascii=False).encode('utf-8')
+            content_type = "application/json; charset=utf-8"
+        lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+                 f"Content-Type: {content_type}",
+                 f"Content-Length: {len(body)}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+
+async def serve(service, host, port):
+    """Run the service until SIGINT or SIGTERM"""
+    await service.start()
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stopping.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: Ctrl+C still raises KeyboardInterrupt
+    try:
+        server = await asyncio.start_server(service.handle, host, port)
+        print(f"Serving on http://{host}:{port} ({service.workers or 'inline'} workers)",
+              file=sys.stderr)
+        async with server:
+            await stopping.wait()
+    finally:
+        await service.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve article analysis over HTTP/JSON")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('-j', '--processes', type=int, default=1,
+                        help="analysis worker processes (default: 1, 0 for all cores)")
+    parser.add_argument('--inline', action='store_true',
+                        help="analyze in the server process instead of worker processes")
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH,
+                        help=f"pages analyzed per batch (default: {MAX_BATCH})")
+    parser.add_argument('--max-wait', type=float, default=MAX_WAIT * 1000,
+                        help=f"milliseconds a batch waits to fill up "
+                             f"(default: {MAX_WAIT * 1000:g})")
+    parser.add_argument('--max-pending', type=int, default=MAX_PENDING,
+                        help=f"requests accepted before answering 503 (default: {MAX_PENDING})")
+    parser.add_argument('--cache-dir', default=os.path.join("saved_data", "http_cache"),
+                        help="HTTP response cache folder (default: saved_data/http_cache)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="always download pages")
+    parser.add_argument('--result-cache', default=os.path.join("saved_data", "analysis_cache.sqlite"),
+                        help="analysis result cache file (default: saved_data/analysis_cache.sqlite)")
+    parser.add_argument('--no-result-cache', action='store_true',
+                        help="always recompute the analysis")
+    parser.add_argument('--sentiment', choices=sorted(BACKENDS), default='textblob',
+                        help="sentiment backend (default: textblob)")
+    parser.add_argument('--extractor', choices=sorted(EXTRACTORS),
+                        help="HTML extractor (default: lxml when installed, else soup)")
+    parser.add_argument('--summarizer', choices=SUMMARIZERS, default='keywords',
+                        help="summary method: keyword scoring or TextRank (default: keywords)")
+    parser.add_argument('--topics',
+                        help="topic model file to assign and update topics with (default: none)")
+    parser.add_argument('--profile-slow', type=float, metavar='SECONDS',
+                        help="profile every batch (slower) and save cProfile/tracemalloc "
+                             "reports of those taking at least SECONDS to --profile-dir")
+    parser.add_argument('--profile-dir', default=os.path.join("saved_data", "profiles"),
+                        help="folder for --profile-slow reports (default: saved_data/profiles)")
+    args = parser.parse_args(argv)
+    workers = 0 if args.inline else args.processes or os.cpu_count() or 1
+
+    fetcher = Fetcher(cache=None if args.no_cache else HttpCache(args.cache_dir))
+    result_cache = None if args.no_result_cache else ResultCache(args.result_cache)
+    topics = TopicModel(args.topics) if args.topics else None
+    profiler = (SlowProfiler(args.profile_slow, args.profile_dir)
+                if args.profile_slow is not None else None)
+    analyzer = ArticleAnalyzer(fetcher, result_cache, args.sentiment, args.extractor,
+                               topics=topics, metrics=Metrics(), profiler=profiler,
+                               summarizer=args.summarizer)
+    service = AnalysisService(analyzer, workers, args.max_batch, args.max_wait / 1000,
+                              args.max_pending)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fetcher.close()
+        if result_cache:
+            result_cache.close()
+        if topics is not None:
+            topics.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+"""Fetcher behaviour against a stand-in HTTP server on localhost"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from fetcher import Fetcher, UnsupportedContent
+from http_cache import HttpCache
+
+
+class StandIn:
+    """Local server answering each path with a handler set by the test
+
+    ``routes[path](request)`` writes the response; every request's path
+    and headers are kept in ``seen``, and ``peak`` is the most handlers
+    that ran at the same time.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.seen = []
+        self.active = self.peak = 0
+        self._lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with stand_in._lock:
+                    stand_in.seen.append((self.path, dict(self.headers)))
+                    stand_in.active += 1
+                    stand_in.peak = max(stand_in.peak, stand_in.active)
+                try:
+                    stand_in.routes[self.path.split('?')[0]](self)
+                finally:
+                    with stand_in._lock:
+                        stand_in.active -= 1
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_port}{path}"
+
+    def hits(self, path):
+        return sum(1 for seen, _ in self.seen if seen.split('?')[0] == path)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def respond(request, body, status=200, content_type='text/html', headers=None):
+    request.send_response(status)
+    request.send_header('Content-Type', content_type)
+    request.send_header('Content-Length', str(len(body)))
+    for name, value in (headers or {}).items():
+        request.send_header(name, value)
+    request.end_headers()
+    request.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    stand_in = StandIn()
+    yield stand_in
+    stand_in.close()
+
+
+@pytest.fixture
+def fetcher():
+    fetcher = Fetcher(max_workers=8, per_host=2, timeout=(2, 5), retries=2, backoff=0.05)
+    yield fetcher
+    fetcher.close()
+
+
+def test_server_errors_are_retried_with_backoff(server, fetcher):
+    answers = iter([503, 502, 200])
+
+    def flaky(request):
+        status = next(answers)
+        respond(request, b'<p>ok</p>' if status == 200 else b'busy', status)
+
+    server.routes['/flaky'] = flaky
+    started = time.perf_counter()
+    result = fetcher.download(server.url('/flaky'))
+    assert result.status == 200 and result.text == '<p>ok</p>'
+    assert result.attempts == 3
+    # Two backoff sleeps of 0.05 and 0.1 seconds
+    assert time.perf_counter() - started >= 0.15
+
+
+def test_retry_after_is_honoured_and_retries_are_bounded(server, fetcher):
+    server.routes['/throttled'] = lambda request: respond(request, b'slow down', 429,
+                                                          headers={'Retry-After': '0'})
+    result = fetcher.fetch(server.url('/throttled'))
+    assert not result.ok and result.status == 429
+    assert server.hits('/throttled') == fetcher.retries + 1
+
+
+def test_connection_errors_are_retried(server, fetcher):
+    url = server.url('/gone')
+    server.close()
+    result = fetcher.fetch(url)
+    assert not result.ok
+    assert result.attempts == fetcher.retries + 1
+
+
+def test_per_host_limit_covers_the_body_transfer(server, fetcher):
+    def slow(request):
+        request.send_response(200)
+        request.send_header('Content-Type', 'text/html')
+        request.send_header('Content-Length', str(4 * 5000))
+        request.end_headers()
+        for _ in range(4):
+            time.sleep(0.05)
+            request.wfile.write(b'a' * 5000)
+            request.wfile.flush()
+
+    server.routes['/slow'] = slow
+    results = list(fetcher.fetch_all(server.url(f'/slow?page={i}') for i in range(6)))
+    assert all(result.ok and len(result.text) == 20000 for result in results)
+    assert server.peak == fetcher.per_host
+
+
+def test_bodies_over_the_size_cap_are_truncated_and_not_cached(server, tmp_path):
+    server.routes['/big'] = lambda request: respond(request, b'x' * 100000)
+    cache = HttpCache(str(tmp_path))
+    fetcher = Fetcher(cache=cache, max_bytes=10000)
+    try:
+        result = fetcher.download(server.url('/big'))
+        assert result.truncated and len(result.text) == 10000
+        assert cache.get(server.url('/big')) is None
+        assert len(fetcher.poll(server.url('/big'), max_bytes=200000).text) == 100000
+    finally:
+        fetcher.close()
+
+
+def test_pages_stopped_by_the_sink_are_not_cached(server, tmp_path):
+    server.routes['/page'] = lambda request: respond(request, b'<p>' + b'y' * 200000 + b'</p>')
+    cache = HttpCache(str(tmp_path))
+    fetcher = Fetcher(cache=cache)
+    try:
+        result = fetcher.download(server.url('/page'), sink=lambda text: True)
+        assert result.stopped and len(result.text) < 200007
+        assert cache.get(server.url('/page')) is None
+        assert len(fetcher.download(server.url('/page')).text) == 200007
+        assert cache.get(server.url('/page')) is not None
+    finally:
+        fetcher.close()
+
+
+def test_complete_pages_are_cached_when_the_sink_stops_on_the_last_chunk(server, tmp_path):
+    server.routes['/page'] = lambda request: respond(request, b'<p>' + b'z' * 2000 + b'</p>')
+    cache = HttpCache(str(tmp_path))
+    fetcher = Fetcher(cache=cache)
+    try:
+        result = fetcher.download(server.url('/page'), sink=lambda text: True)
+        assert not result.stopped and len(result.text) == 2007
+        assert cache.get(server.url('/page'))['body'] == result.text
+    finally:
+        fetcher.close()
+
+
+@pytest.mark.parametrize('body, content_type', [
+    ('café'.encode('latin-1'), 'text/html; charset=ISO-8859-1'),
+    (b'<meta charset="windows-1252"><p>caf\xe9</p>', 'text/html'),
+    ('<?xml version="1.0" encoding="iso-8859-1"?><rss>café</rss>'.encode('latin-1'),
+     'application/rss+xml'),
+    (b'\xef\xbb\xbf<p>caf\xc3\xa9</p>', 'text/html'),
+    ('<p>café</p>'.encode('utf-16'), 'text/html'),
+])
+def test_encoding_is_sniffed(server, fetcher, body, content_type):
+    server.routes['/page'] = lambda request: respond(request, body, content_type=content_type)
+    assert 'café' in fetcher.download(server.url('/page')).text
+
+
+@pytest.mark.parametrize('body, content_type', [
+    (b'%PDF-1.4 binary', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'text/html'),
+])
+def test_binary_responses_are_rejected(server, fetcher, body, content_type):
+    server.routes['/file'] = lambda request: respond(request, body, content_type=content_type)
+    with pytest.raises(UnsupportedContent):
+        fetcher.download(server.url('/file'))
+
+
+def test_cached_pages_are_revalidated_with_a_conditional_get(server, tmp_path):
+    def page(request):
+        if request.headers.get('If-None-Match') == '"v1"':
+            request.send_response(304)
+            request.end_headers()
+        else:
+            respond(request, b'<p>first</p>', headers={'ETag': '"v1"'})
+
+    server.routes['/page'] = page
+    fetcher = Fetcher(cache=HttpCache(str(tmp_path), ttl=0))
+    try:
+        first = fetcher.download(server.url('/page'))
+        second = fetcher.download(server.url('/page'))
+    finally:
+        fetcher.close()
+    assert first.status == 200 and not first.from_cache
+    assert second.status == 304 and second.from_cache and second.text == '<p>first</p>'
+    assert server.seen[-1][1].get('If-None-Match') == '"v1"'
+
+
+def test_fresh_cache_entries_skip_the_network(server, tmp_path):
+    server.routes['/page'] = lambda request: respond(request, b'<p>cached</p>')
+    fetcher = Fetcher(cache=HttpCache(str(tmp_path), ttl=3600))
+    try:
+        fetcher.download(server.url('/page'))
+        result = fetcher.download(server.url('/page'))
+    finally:
+        fetcher.close()
+    assert result.from_cache and result.text == '<p>cached</p>'
+    assert server.hits('/page') == 1
+
+
+def test_poll_sends_validators_and_reports_not_modified(server, fetcher):
+    def feed(request):
+        if request.headers.get('If-Modified-Since') == 'Mon, 05 Oct 2026 10:00:00 GMT':
+            request.send_response(304)
+            request.end_headers()
+        else:
+            respond(request, b'<rss/>', content_type='application/rss+xml',
+                    headers={'Last-Modified': 'Mon, 05 Oct 2026 10:00:00 GMT'})
+
+    server.routes['/feed'] = feed
+    first = fetcher.poll(server.url('/feed'))
+    assert first.status == 200 and first.headers['Last-Modified']
+    second = fetcher.poll(server.url('/feed'), last_modified=first.headers['Last-Modified'])
+    assert second.status == 304 and second.text is None
+
+
+def test_client_errors_are_not_retried(server, fetcher):
+    server.routes['/missing'] = lambda request: respond(request, b'no', 404)
+    with pytest.raises(requests.HTTPError):
+        fetcher.download(server.url('/missing'))
+    assert server.hits('/missing') == 1
@@ -0,0 +1,122 @@
+"""Graph-based extractive summaries: TextRank over a sparse TF-IDF sentence graph
+
+Every candidate sentence becomes a TF-IDF vector (sublinear term
+frequency, smoothed inverse sentence frequency, stopwords dropped) and
+the cosine similarities between them, computed as sparse matrix
+products, weight the edges of a sentence graph. PageRank by power
+iteration over that graph ranks the sentences, and the best ones form
+the summary in reading order.
+
+Comparing every sentence with every other grows quadratically, so long
+articles are windowed: sentences are compared in blocks of ``window``
+with their own and the two neighbouring blocks only. Past
+``max_sentences`` candidates an evenly spaced sample of them is ranked.
+"""
+from collections import Counter
+
+from topics import STOPWORDS, TERM
+
+MIN_SENTENCE_LENGTH = 20  # characters, as for the keyword scorer's summary
+
+
+class TextRankSummarizer:
+    """Rank sentences by their centrality in a similarity graph"""
+
+    name = 'textrank'
+
+    def __init__(self, damping=0.85, window=100, max_sentences=2000, tolerance=1e-6,
+                 max_iterations=100):
+        self.damping = damping
+        self.window = window
+        self.max_sentences = max_sentences
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+
+    def tfidf(self, sentences):
+        """Sentence-term matrix (CSR) with L2-normalized TF-IDF rows"""
+        import numpy as np
+        from scipy import sparse
+
+        vocabulary = {}
+        rows, columns, counts = [], [], []
+        for row, sentence in enumerate(sentences):
+            terms = Counter(term for term in TERM.findall(sentence.lower())
+                            if term not in STOPWORDS)
+            for term, count in terms.items():
+                rows.append(row)
+                columns.append(vocabulary.setdefault(term, len(vocabulary)))
+                counts.append(count)
+
+        size = len(sentences)
+        rows = np.asarray(rows, dtype=np.int64)
+        columns = np.asarray(columns, dtype=np.int64)
+        document_frequency = np.bincount(columns, minlength=len(vocabulary))
+        idf = np.log((1 + size) / (1 + document_frequency)) + 1
+        weights = (1 + np.log(np.asarray(counts, dtype=float))) * idf[columns]
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=size))
+        weights /= norms[rows]
+        return sparse.csr_matrix((weights, (rows, columns)), shape=(size, len(vocabulary)))
+
+    def similarity(self, matrix):
+        """Cosine similarity graph without self-loops, windowed for long inputs"""
+        import numpy as np
+        from scipy import sparse
+
+        size = matrix.shape[0]
+        window = self.window or size
+        transposed = matrix.T.tocsc()
+        rows, columns, weights = [], [], []
+        for start in range(0, size, window):
+            stop = min(start + window, size)
+            low, high = max(0, start - window), min(size, stop + window)
+            block = (matrix[start:stop] @ transposed[:, low:high]).tocoo()
+            keep = block.row + start != block.col + low
+            rows.append(block.row[keep] + start)
+            columns.append(block.col[keep] + low)
+            weights.append(block.data[keep])
+        return sparse.csr_matrix((np.concatenate(weights),
+                                  (np.concatenate(rows), np.concatenate(columns))),
+                                 shape=(size, size))
+
+    def pagerank(self, graph):
+        """Stationary scores of a random walk over the weighted graph
+
+        Sentences sharing no terms with any other spread their score
+        evenly over all sentences.
+        """
+        import numpy as np
+        from scipy import sparse
+
+        size = graph.shape[0]
+        out = np.asarray(graph.sum(axis=1)).ravel()
+        dangling = out == 0
+        transition = (sparse.diags(1 / np.where(dangling, 1, out)) @ graph).T.tocsr()
+        rank = np.full(size, 1 / size)
+        teleport = (1 - self.damping) / size
+        for _ in range(self.max_iterations):
+            updated = self.damping * (transition @ rank + rank[dangling].sum() / size) + teleport
+            delta = np.abs(updated - rank).sum()
+            rank = updated
+            if delta < self.tolerance:
+                break
+        return rank
+
+    def rank(self, sentences):
+        """PageRank score of every sentence"""
+        return self.pagerank(self.similarity(self.tfidf(sentences)))
+
+    def summarize(self, sentences, num_sentences=5):
+        """The ``num_sentences`` most central sentences, in reading order"""
+        import numpy as np
+
+        candidates = [sentence for sentence in sentences if len(sentence) > MIN_SENTENCE_LENGTH]
+        if len(candidates) > self.max_sentences:
+            sample = np.linspace(0, len(candidates) - 1, self.max_sentences).round().astype(int)
+            candidates = [candidates[index] for index in np.unique(sample)]
+        if len(candidates) <= num_sentences:
+            return "\n\n".join(candidates)
+
+        scores = self.rank(candidates)
+        # A stable sort keeps the earlier sentence on ties
+        best = np.sort(np.argsort(-scores, kind='stable')[:num_sentences])
+        return "\n\n".join(candidates[index] for index in best)
@@ -0,0 +1,433 @@
+"""Named entities and incremental topic clustering for analyzed articles
+
+Entities are found with capitalization and context cues, so no language
+model has to be downloaded. Topics come from an online keyword model:
+document frequencies and topic centroids live in SQLite, are loaded once,
+and every batch of new articles updates them in place instead of
+refitting over the whole history.
+"""
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+
+from result_cache import content_key
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are aren't as at be because been
+before being below between both but by can can't could couldn't did didn't do does doesn't
+doing don't down during each few for from further had hadn't has hasn't have haven't having
+he he'd he'll he's her here here's hers herself him himself his how how's i i'd i'll i'm
+i've if in into is isn't it it's its itself let's me more most mustn't my myself no nor not
+of off on once only or other ought our ours ourselves out over own same shan't she she'd
+she'll she's should shouldn't so some such than that that's the their theirs them
+themselves then there there's these they they'd they'll they're they've this those through
+to too under until up very was wasn't we we'd we'll we're we've were weren't what what's
+when when's where where's which while who who's whom why why's will with won't would
+wouldn't you you'd you'll you're you've your yours yourself yourselves said says say told
+according just new one two three first last year years week weeks time times many much
+may might must also like well even back still get got made make since yet per mr mrs ms
+""".split())
+
+PERSON_TITLES = frozenset(['mr', 'mrs', 'ms', 'dr', 'prof', 'president', 'minister', 'senator',
+                           'judge', 'governor', 'chancellor', 'mayor', 'ceo', 'chief', 'director',
+                           'secretary', 'sir', 'lord', 'rep', 'gen', 'general', 'premier', 'king',
+                           'queen', 'prince', 'pope', 'coach', 'officer', 'spokesperson',
+                           'spokesman', 'spokeswoman'])
+SPEECH_VERBS = frozenset(['said', 'says', 'told', 'added', 'explained', 'wrote', 'argued',
+                          'noted', 'warned', 'announced', 'stated', 'insisted', 'claimed'])
+ORG_WORDS = frozenset(['inc', 'corp', 'corporation', 'ltd', 'llc', 'plc', 'company', 'co', 'bank',
+                       'group', 'council', 'ministry', 'department', 'agency', 'university',
+                       'college', 'committee', 'association', 'party', 'court', 'commission',
+                       'institute', 'fund', 'union', 'authority', 'service', 'police', 'office',
+                       'board', 'foundation', 'federation', 'organization', 'organisation',
+                       'parliament', 'congress', 'senate', 'hospital', 'school', 'club', 'team',
+                       'news', 'times', 'post', 'network', 'airlines', 'motors', 'systems',
+                       'technologies', 'holdings', 'partners', 'capital', 'reserve', 'bureau'])
+PLACE_CUES = frozenset(['in', 'at', 'from', 'near', 'across', 'to', 'outside', 'around'])
+PLACE_WORDS = frozenset(['city', 'county', 'state', 'province', 'river', 'island', 'valley',
+                         'street', 'avenue', 'square', 'harbour', 'harbor', 'airport', 'region',
+                         'republic', 'kingdom', 'mountains', 'lake', 'bay', 'coast'])
+CONNECTORS = frozenset(['of', 'the', 'de', 'del', 'la', 'van', 'von', 'der', 'for', 'and', '&'])
+CALENDAR = frozenset(['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday',
+                      'january', 'february', 'march', 'april', 'june', 'july', 'august',
+                      'september', 'october', 'november', 'december', 'however', 'meanwhile',
+                      'today', 'yesterday', 'tomorrow', 'instead', 'although', 'despite'])
+
+# Words with inner periods (U.S.) and abbreviated titles (Dr.) keep their
+# dots; any other period is a token of its own and ends the sentence
+TOKEN = re.compile(r"(?:Mr|Mrs|Ms|Dr|Prof|Gen|Rep|Sen|Gov|Lt|Col|St)\.|"
+                   r"[A-Za-zÀ-ɏ](?:[\w'’&-]|\.(?=\w))*|[.!?;:,\"()&]")
+TERM = re.compile(r"[a-z][a-z'-]+")
+MAX_ENTITIES = 15
+MAX_TERMS = 50
+MAX_KEYWORDS = 8
+CENTROID_TERMS = 100
+TOPIC_THRESHOLD = 0.2
+MAX_TOPICS = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS term_df (
+    term TEXT PRIMARY KEY,
+    df INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS topics (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    size INTEGER NOT NULL,
+    centroid TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS topic_docs (
+    key TEXT PRIMARY KEY,
+    topic_id INTEGER,
+    keywords TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _is_capitalized(token):
+    return token[0].isupper()
+
+
+def _entity_type(words, before, titled, speaks):
+    lower = [w.lower() for w in words]
+    if titled:
+        return 'Person'
+    if ORG_WORDS.intersection(lower) or (len(words) == 1 and words[0].isupper()
+                                          and 2 <= len(words[0]) <= 6):
+        return 'Organization'
+    if PLACE_WORDS.intersection(lower):
+        return 'Place'
+    if speaks and len(words) <= 3:
+        return 'Person'
+    if before in PLACE_CUES:
+        return 'Place'
+    return 'Other'
+
+
+def _candidates(tokens):
+    # (words, token before, token after, sentence start) for every run of
+    # capitalized words, with a leading "The" or title split off
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        if not _is_capitalized(token):
+            index += 1
+            continue
+        end = index + 1
+        while end < len(tokens):
+            if _is_capitalized(tokens[end]):
+                end += 1
+            elif (tokens[end] in CONNECTORS and end + 1 < len(tokens)
+                  and _is_capitalized(tokens[end + 1])):
+                end += 2
+            else:
+                break
+        words = [w.rstrip('.') for w in tokens[index:end]]
+        before = tokens[index - 1].lower() if index else '.'
+        after = tokens[end].lower() if end < len(tokens) else '.'
+        sentence_start = before in ('.', '!', '?', '"')
+        titled = False
+        while len(words) > 1 and (words[0].lower() in STOPWORDS or words[0].lower() in CALENDAR
+                                  or words[0].lower() in PERSON_TITLES):
+            titled = titled or words[0].lower() in PERSON_TITLES
+            before = words.pop(0).lower()
+            sentence_start = False
+        while len(words) > 1 and words[-1].lower() in CALENDAR:
+            words.pop()
+        yield words, before, after, sentence_start, titled
+        index = end
+
+
+def extract_entities(text, limit=MAX_ENTITIES):
+    """Most mentioned names in ``text`` as [{'text', 'type', 'count'}]
+
+    Runs of capitalized words (joined by "of", "de", "&" and the like)
+    are candidates. A lone capitalized word that opens a sentence only
+    counts when it never appears in lower case. The type comes from
+    titles ("Dr", "President"), organization and place words, speech
+    verbs and location prepositions. Surnames of known people are merged
+    into the full name.
+    """
+    candidates = list(_candidates(TOKEN.findall(text)))
+    # Single capitalized words seen mid-sentence are names wherever they appear
+    mid_sentence = {words[0] for words, _, _, start, _ in candidates
+                    if len(words) == 1 and not start}
+    mid_sentence.update(words[-1] for words, _, _, _, _ in candidates if len(words) > 1)
+    counts = Counter()
+    types = {}
+    speakers = set()
+
+    for words, before, after, sentence_start, titled in candidates:
+        if len(words) == 1:
+            word = words[0].lower()
+            if (word in STOPWORDS or word in CALENDAR or word in ORG_WORDS
+                    or word in PLACE_WORDS or word in PERSON_TITLES
+                    or sentence_start and words[0] not in mid_sentence and not titled):
+                continue
+        name = ' '.join(words)
+        counts[name] += 1
+        speaks = after in SPEECH_VERBS or before in SPEECH_VERBS
+        if speaks:
+            speakers.add(name)
+        kind = _entity_type(words, before, titled, speaks)
+        if kind != 'Other' or name not in types:
+            types[name] = kind
+
+    # "Lopez" after "Maria Lopez" is the same person
+    full_names = {}
+    for name, count in counts.most_common():
+        if ' ' in name and types[name] in ('Person', 'Other'):
+            full_names.setdefault(name.split()[-1], name)
+    for name in list(counts):
+        full = full_names.get(name)
+        if full:
+            counts[full] += counts.pop(name)
+            if name in speakers or types[name] == 'Person':
+                types[full] = 'Person'
+            del types[name]
+
+    return [{'text': name, 'type': types[name], 'count': count}
+            for name, count in counts.most_common(limit)]
+
+
+def term_counts(text, limit=MAX_TERMS):
+    """The ``limit`` most frequent content words as [[term, count], ...]"""
+    counts = Counter(t for t in TERM.findall(text.lower())
+                     if len(t) > 2 and t not in STOPWORDS and t not in CALENDAR)
+    return [[term, count] for term, count in counts.most_common(limit)]
+
+
+def article_terms(text):
+    """What TopicModel.update() needs from one article, computed with the analysis"""
+    return {'key': content_key(text, 'terms'), 'counts': term_counts(text)}
+
+
+def format_entities(entities):
+    """Group entities by type for the Analysis tab"""
+    groups = {}
+    for entity in entities or []:
+        groups.setdefault(entity['type'], []).append(
+            f"{entity['text']} ({entity['count']})" if entity['count'] > 1 else entity['text'])
+    order = ['Person', 'Organization', 'Place', 'Other']
+    lines = [f"{kind}: {', '.join(groups[kind])}" for kind in order if kind in groups]
+    return '\n'.join(lines) if lines else "No named entities found."
+
+
+def format_topic(result):
+    topic = result.get('topic')
+    keywords = result.get('keywords') or []
+    lines = []
+    if topic:
+        lines.append(f"Topic: {topic['label']} "
+                     f"({topic['size']} article{'s' if topic['size'] != 1 else ''}, "
+                     f"{topic['similarity']:.0%} match)")
+    if keywords:
+        lines.append(f"Keywords: {', '.join(keywords)}")
+    return '\n'.join(lines) if lines else "No topic information."
+
+
+class TopicModel:
+    """Online TF-IDF keyword clustering persisted in SQLite
+
+    Each article's top terms are weighted by TF-IDF against the document
+    frequencies seen so far and compared with every topic centroid by
+    cosine similarity. The article joins the closest topic, whose centroid
+    absorbs it, or founds a new one; once ``max_topics`` exist it joins the
+    closest one regardless. Only the touched terms and topics are written
+    back. Articles already seen, identified by a content hash, get their
+    earlier assignment back without being counted twice.
+
+    Several processes (the GUI and ingest.py) may share one file: every
+    batch runs in a write transaction that first catches up with the
+    others' changes, and topic ids are assigned by SQLite.
+    """
+
+    def __init__(self, path=os.path.join("saved_data", "topics.sqlite"),
+                 threshold=TOPIC_THRESHOLD, max_topics=MAX_TOPICS):
+        self.path = path
+        self.threshold = threshold
+        self.max_topics = max_topics
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self.df = {}
+        self._load()
+
+    def _meta(self, key):
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def _load(self):
+        # Every saved batch bumps the revision, so a changed one means
+        # another process (or connection) has updated the model
+        self.revision = self._meta('revision')
+        self.documents = self._meta('documents')
+        self.topics = {}
+        for topic_id, size, centroid in self._db.execute("SELECT id, size, centroid FROM topics"):
+            centroid = json.loads(centroid)
+            self.topics[topic_id] = {'size': size, 'centroid': centroid,
+                                     'norm': math.sqrt(sum(w * w for w in centroid.values()))}
+
+    def _weights(self, counts):
+        # L2-normalized TF-IDF vector of one article's top terms
+        weights = {}
+        for term, count in counts:
+            idf = math.log((self.documents + 1) / (self.df.get(term, 0) + 1)) + 1
+            weights[term] = (1 + math.log(count)) * idf
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        return {term: w / norm for term, w in weights.items()}
+
+    def _closest(self, vector):
+        best, best_similarity = None, 0.0
+        for topic_id, topic in self.topics.items():
+            centroid = topic['centroid']
+            dot = sum(w * centroid[t] for t, w in vector.items() if t in centroid)
+            if dot:
+                similarity = dot / (topic['norm'] or 1.0)
+                if similarity > best_similarity:
+                    best, best_similarity = topic_id, similarity
+        return best, best_similarity
+
+    def _absorb(self, topic_id, vector):
+        topic = self.topics[topic_id]
+        centroid = topic['centroid']
+        for term, weight in vector.items():
+            centroid[term] = centroid.get(term, 0.0) + weight
+        if len(centroid) > CENTROID_TERMS:
+            kept = sorted(centroid.items(), key=lambda item: -item[1])[:CENTROID_TERMS]
+            centroid = topic['centroid'] = dict(kept)
+        topic['size'] += 1
+        topic['norm'] = math.sqrt(sum(w * w for w in centroid.values()))
+
+    def label(self, topic_id):
+        centroid = self.topics[topic_id]['centroid']
+        return ' / '.join(term for term, _ in
+                          sorted(centroid.items(), key=lambda item: -item[1])[:3])
+
+    def _describe(self, topic_id, similarity):
+        if topic_id is None:
+            return None
+        return {'id': topic_id, 'label': self.label(topic_id),
+                'size': self.topics[topic_id]['size'], 'similarity': round(similarity, 3)}
+
+    def _refresh(self, articles):
+        # Inside the write transaction: catch up with other writers and
+        # read the current document frequencies of the batch's terms
+        if self._meta('revision') != self.revision:
+            self._load()
+        terms = list({term for article in articles for term, _ in article['counts']})
+        self.df = {}
+        for start in range(0, len(terms), 500):
+            chunk = terms[start:start + 500]
+            self.df.update(self._db.execute(
+                f"SELECT term, df FROM term_df WHERE term IN ({','.join('?' * len(chunk))})",
+                chunk))
+
+    def update(self, articles):
+        """Assign topics to a batch of article_terms() dicts, learning from them
+
+        Returns one {'keywords', 'topic'} dict per article.
+        """
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                results = self._update(articles)
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                self._load()
+                raise
+            return results
+
+    def _update(self, articles):
+        self._refresh(articles)
+        keys = [article['key'] for article in articles]
+        seen = {}
+        if keys:
+            seen = {key: (topic_id, json.loads(keywords)) for key, topic_id, keywords in
+                    self._db.execute(f"SELECT key, topic_id, keywords FROM topic_docs "
+                                     f"WHERE key IN ({','.join('?' * len(keys))})", keys)}
+
+        results = []
+        touched_terms, touched_topics, assigned = set(), set(), []
+        for article in articles:
+            if article['key'] in seen:
+                topic_id, keywords = seen[article['key']]
+                similarity = 0.0
+                if topic_id in self.topics:
+                    similarity = self._closest_to(topic_id, article['counts'])
+                results.append({'keywords': keywords,
+                                'topic': self._describe(topic_id if topic_id in self.topics
+                                                        else None, similarity)})
+                continue
+
+            self.documents += 1
+            for term, _ in article['counts']:
+                self.df[term] = self.df.get(term, 0) + 1
+                touched_terms.add(term)
+            vector = self._weights(article['counts'])
+            keywords = [term for term, _ in
+                        sorted(vector.items(), key=lambda item: -item[1])[:MAX_KEYWORDS]]
+
+            topic_id, similarity = (None, 0.0)
+            if vector:
+                topic_id, similarity = self._closest(vector)
+                if len(self.topics) < self.max_topics and (topic_id is None
+                                                           or similarity < self.threshold):
+                    topic_id = self._new_topic()
+                    similarity = 1.0
+                elif topic_id is None:
+                    # At the cap and sharing no term with any topic: the
+                    # largest one takes it rather than founding another
+                    topic_id = max(self.topics, key=lambda key: self.topics[key]['size'])
+                self._absorb(topic_id, vector)
+                touched_topics.add(topic_id)
+
+            seen[article['key']] = (topic_id, keywords)
+            assigned.append((article['key'], topic_id, json.dumps(keywords)))
+            results.append({'keywords': keywords,
+                            'topic': self._describe(topic_id, similarity)})
+
+        if assigned:
+            self._save(touched_terms, touched_topics, assigned)
+        return results
+
+    def _closest_to(self, topic_id, counts):
+        vector = self._weights(counts)
+        centroid = self.topics[topic_id]['centroid']
+        dot = sum(w * centroid[t] for t, w in vector.items() if t in centroid)
+        return dot / (self.topics[topic_id]['norm'] or 1.0)
+
+    def _new_topic(self):
+        topic_id = self._db.execute(
+            "INSERT INTO topics (size, centroid) VALUES (0, '{}')").lastrowid
+        self.topics[topic_id] = {'size': 0, 'centroid': {}, 'norm': 0.0}
+        return topic_id
+
+    def _save(self, terms, topic_ids, assigned):
+        self._db.executemany("INSERT OR REPLACE INTO term_df (term, df) VALUES (?, ?)",
+                             [(term, self.df[term]) for term in terms])
+        self._db.executemany("INSERT OR REPLACE INTO topics (id, size, centroid) VALUES (?, ?, ?)",
+                             [(topic_id, self.topics[topic_id]['size'],
+                               json.dumps(self.topics[topic_id]['centroid']))
+                              for topic_id in topic_ids])
+        self._db.executemany("INSERT OR REPLACE INTO topic_docs (key, topic_id, keywords) "
+                             "VALUES (?, ?, ?)", assigned)
+        self.revision += 1
+        self._db.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                             [('documents', str(self.documents)),
+                              ('revision', str(self.revision))])
+
+    def close(self):
+        with self._lock:
+            self._db.close()